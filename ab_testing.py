@@ -1,148 +1,1192 @@
-import random
-import sqlite3
-import uuid
-from datetime import datetime
-
-
-class ABTesting:
-    def __init__(self, db_path="ab_testing.db"):
-        self.db_path = db_path
-        self._create_tables()
-
-    def _create_tables(self):
-        """Create necessary tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-        CREATE TABLE IF NOT EXISTS ab_experiments (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            created_at TIMESTAMP
-        )
-        """
-        )
-
-        cursor.execute(
-            """
-        CREATE TABLE IF NOT EXISTS ab_variants (
-            id TEXT PRIMARY KEY,
-            experiment_id TEXT,
-            name TEXT,
-            content TEXT,
-            impressions INTEGER DEFAULT 0,
-            clicks INTEGER DEFAULT 0,
-            conversions INTEGER DEFAULT 0,
-            FOREIGN KEY (experiment_id) REFERENCES ab_experiments(id)
-        )
-        """
-        )
-
-        conn.commit()
-        conn.close()
-
-    def create_experiment(self, name, variants):
-        """Create a new A/B test experiment with variants"""
-        experiment_id = str(uuid.uuid4())
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "INSERT INTO ab_experiments (id, name, created_at) VALUES (?, ?, ?)",
-            (experiment_id, name, datetime.now()),
-        )
-
-        for variant_name, content in variants.items():
-            variant_id = str(uuid.uuid4())
-            cursor.execute(
-                "INSERT INTO ab_variants (id, experiment_id, name, content) VALUES (?, ?, ?, ?)",
-                (variant_id, experiment_id, variant_name, content),
-            )
-
-        conn.commit()
-        conn.close()
-        return experiment_id
-
-    def get_random_variant(self, experiment_id):
-        """Get a random variant from an experiment and increment impressions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT id, name, content FROM ab_variants WHERE experiment_id = ?", (experiment_id,)
-        )
-
-        variants = cursor.fetchall()
-        if not variants:
-            conn.close()
-            return None
-
-        variant = random.choice(variants)
-        variant_id, variant_name, content = variant
-
-        # Increment impressions
-        cursor.execute(
-            "UPDATE ab_variants SET impressions = impressions + 1 WHERE id = ?", (variant_id,)
-        )
-
-        conn.commit()
-        conn.close()
-
-        return {"id": variant_id, "name": variant_name, "content": content}
-
-    def record_click(self, variant_id):
-        """Record a click for a variant"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("UPDATE ab_variants SET clicks = clicks + 1 WHERE id = ?", (variant_id,))
-
-        conn.commit()
-        conn.close()
-
-    def record_conversion(self, variant_id):
-        """Record a conversion for a variant"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "UPDATE ab_variants SET conversions = conversions + 1 WHERE id = ?", (variant_id,)
-        )
-
-        conn.commit()
-        conn.close()
-
-    def get_experiment_results(self, experiment_id):
-        """Get the results of an experiment"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-        SELECT name, impressions, clicks, conversions
-        FROM ab_variants
-        WHERE experiment_id = ?
-        """,
-            (experiment_id,),
-        )
-
-        results = []
-        for row in cursor.fetchall():
-            name, impressions, clicks, conversions = row
-            ctr = (clicks / impressions) if impressions > 0 else 0
-            cvr = (conversions / clicks) if clicks > 0 else 0
-
-            results.append(
-                {
-                    "name": name,
-                    "impressions": impressions,
-                    "clicks": clicks,
-                    "conversions": conversions,
-                    "ctr": ctr,
-                    "cvr": cvr,
-                }
-            )
-
-        conn.close()
-        return results
+import glob
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from statistics import NormalDist
+
+import numpy as np
+
+try:
+    import redis
+except ImportError:  # Only needed for RedisBackend
+    redis = None
+
+# Column order of get_results_bulk(); every column holds one entry per variant
+RESULT_COLUMNS = (
+    "experiment_id",
+    "variant",
+    "is_control",
+    "impressions",
+    "clicks",
+    "conversions",
+    "ctr",
+    "ctr_ci_low",
+    "ctr_ci_high",
+    "cvr",
+    "cvr_ci_low",
+    "cvr_ci_high",
+    "z_score",
+    "p_value",
+    "prob_beat_control",
+)
+
+# Raw events are stored in buckets of this many seconds and rolled up per hour and day
+EVENT_BUCKET_SECONDS = 60
+ROLLUP_GRANULARITIES = {"hour": 3600, "day": 86400}
+
+# Event type -> ab_variants counter column (and Redis hash field)
+COUNTERS = {"impression": "impressions", "click": "clicks", "conversion": "conversions"}
+
+
+def _to_epoch(value):
+    """Accept a datetime or a Unix timestamp and return integer seconds"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _rollup_bucket(bucket, granularity):
+    return bucket - bucket % ROLLUP_GRANULARITIES[granularity]
+
+
+def _event_bucket(timestamp=None):
+    now = int(time.time() if timestamp is None else timestamp)
+    return now - now % EVENT_BUCKET_SECONDS
+
+
+def _create_schema(cursor, schema="main"):
+    """Create the A/B testing tables in `schema` (the hot database or an attached archive)"""
+    cursor.execute(
+        f"""
+    CREATE TABLE IF NOT EXISTS {schema}.ab_experiments (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        created_at TIMESTAMP,
+        status TEXT DEFAULT 'active',
+        concluded_at TIMESTAMP
+    )
+    """
+    )
+
+    # Databases created before experiments had a lifecycle
+    columns = {row[1] for row in cursor.execute(f"PRAGMA {schema}.table_info(ab_experiments)")}
+    if "status" not in columns:
+        cursor.execute(
+            f"ALTER TABLE {schema}.ab_experiments ADD COLUMN status TEXT DEFAULT 'active'"
+        )
+    if "concluded_at" not in columns:
+        cursor.execute(f"ALTER TABLE {schema}.ab_experiments ADD COLUMN concluded_at TIMESTAMP")
+
+    cursor.execute(
+        f"""
+    CREATE TABLE IF NOT EXISTS {schema}.ab_variants (
+        id TEXT PRIMARY KEY,
+        experiment_id TEXT,
+        name TEXT,
+        content TEXT,
+        impressions INTEGER DEFAULT 0,
+        clicks INTEGER DEFAULT 0,
+        conversions INTEGER DEFAULT 0,
+        FOREIGN KEY (experiment_id) REFERENCES ab_experiments(id)
+    )
+    """
+    )
+
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_ab_variants_experiment "
+        "ON ab_variants (experiment_id)"
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_ab_experiments_status "
+        "ON ab_experiments (status, concluded_at)"
+    )
+
+    # Append-only event log; compaction merges rows of the same bucket into one
+    cursor.execute(
+        f"""
+    CREATE TABLE IF NOT EXISTS {schema}.ab_events (
+        id INTEGER PRIMARY KEY,
+        variant_id TEXT,
+        event_type TEXT,
+        bucket INTEGER,
+        count INTEGER DEFAULT 1
+    )
+    """
+    )
+
+    cursor.execute(
+        f"""
+    CREATE TABLE IF NOT EXISTS {schema}.ab_rollups (
+        variant_id TEXT,
+        event_type TEXT,
+        granularity TEXT,
+        bucket INTEGER,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (variant_id, granularity, bucket, event_type)
+    ) WITHOUT ROWID
+    """
+    )
+
+    # Highest ab_events id already folded into ab_rollups
+    cursor.execute(
+        f"""
+    CREATE TABLE IF NOT EXISTS {schema}.ab_rollup_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER
+    )
+    """
+    )
+
+
+def _archive_path(archive_dir, month):
+    return os.path.join(archive_dir, f"ab_archive_{month}.db")
+
+
+def _normal_cdf(x):
+    """Standard normal CDF over a NumPy array (Abramowitz & Stegun 7.1.26 erf)"""
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (
+        0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429)))
+    )
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def _ratio(numerator, denominator):
+    """Element-wise numerator / denominator, 0 where the denominator is 0"""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0,
+    )
+
+
+def _wilson_interval(successes, trials, z):
+    """Wilson score interval for a vector of binomial proportions"""
+    n = np.maximum(trials, 1).astype(np.float64)
+    p = _ratio(successes, trials)
+    denom = 1.0 + z * z / n
+    center = (p + z * z / (2.0 * n)) / denom
+    margin = z * np.sqrt(p * (1.0 - p) / n + z * z / (4.0 * n * n)) / denom
+    low = np.where(trials > 0, center - margin, 0.0)
+    high = np.where(trials > 0, center + margin, 0.0)
+    return np.clip(low, 0.0, 1.0), np.clip(high, 0.0, 1.0)
+
+
+class ABTestingBackend:
+    """Storage interface behind ABTesting.
+
+    Variants of an experiment are returned in creation order, so the first one is the
+    control. Counters are "impressions", "clicks" and "conversions"; the matching event
+    types are "impression", "click" and "conversion".
+    """
+
+    def create_experiment(self, experiment_id, name, created_at, variants):
+        """Store an experiment; `variants` is a list of (variant_id, name, content)"""
+        raise NotImplementedError
+
+    def select_and_increment(self, experiment_id, choice):
+        """Atomically pick the variant at position floor(choice * n) and count an impression.
+
+        Returns (variant_id, name, content), or None if the experiment has no variants.
+        """
+        raise NotImplementedError
+
+    def record_events(self, events):
+        """Count a batch of (variant_id, event_type) events"""
+        raise NotImplementedError
+
+    def fetch_counters(self, experiment_ids):
+        """Rows of (experiment_id, name, impressions, clicks, conversions), grouped by
+        experiment with variants in creation order"""
+        raise NotImplementedError
+
+    def fetch_timeseries(self, experiment_id, granularity, start, end):
+        """Rows of (bucket, name, impressions, clicks, conversions) ordered by bucket"""
+        raise NotImplementedError
+
+    def rollup(self):
+        """Fold pending events into the time-bucketed aggregates"""
+        return 0
+
+    def compact_events(self, older_than=86400):
+        """Reclaim space used by raw events older than `older_than` seconds"""
+        return 0
+
+    def conclude_experiments(self, experiment_ids, concluded_at):
+        """Mark experiments as concluded so they stop serving variants"""
+        raise NotImplementedError
+
+    def conclude_stale(self, created_before, concluded_at):
+        """Conclude every active experiment created before `created_before`; returns the count"""
+        raise NotImplementedError
+
+    def archive_concluded(self, archive_dir, concluded_before):
+        """Move experiments concluded before `concluded_before` out of hot storage into one
+        archive partition per creation month. Returns {partition: experiments moved}"""
+        raise NotImplementedError
+
+    def fetch_archived_counters(self, archive_dir, experiment_ids):
+        """fetch_counters() for experiments that were archived"""
+        raise NotImplementedError
+
+    def vacuum(self):
+        """Give space freed by archival back to the OS; returns the number of bytes reclaimed"""
+        return 0
+
+
+class SQLiteBackend(ABTestingBackend):
+    def __init__(self, db_path="ab_testing.db"):
+        self.db_path = db_path
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create necessary tables if they don't exist"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        _create_schema(cursor)
+        conn.commit()
+        conn.close()
+
+    def create_experiment(self, experiment_id, name, created_at, variants):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "INSERT INTO ab_experiments (id, name, created_at) VALUES (?, ?, ?)",
+            (experiment_id, name, created_at),
+        )
+        cursor.executemany(
+            "INSERT INTO ab_variants (id, experiment_id, name, content) VALUES (?, ?, ?, ?)",
+            [
+                (variant_id, experiment_id, variant_name, content)
+                for variant_id, variant_name, content in variants
+            ],
+        )
+
+        conn.commit()
+        conn.close()
+
+    def select_and_increment(self, experiment_id, choice):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+        SELECT v.id, v.name, v.content
+        FROM ab_variants v
+        JOIN ab_experiments e ON e.id = v.experiment_id
+        WHERE v.experiment_id = ? AND e.status = 'active'
+        ORDER BY v.rowid
+        """,
+            (experiment_id,),
+        )
+
+        variants = cursor.fetchall()
+        if not variants:
+            conn.close()
+            return None
+
+        variant = variants[min(int(choice * len(variants)), len(variants) - 1)]
+        variant_id = variant[0]
+
+        # Increment impressions
+        cursor.execute(
+            "UPDATE ab_variants SET impressions = impressions + 1 WHERE id = ?", (variant_id,)
+        )
+        self._log_events(cursor, [(variant_id, "impression")])
+
+        conn.commit()
+        conn.close()
+
+        return variant
+
+    def _log_events(self, cursor, events):
+        """Append events to the log in the same transaction as the counter update"""
+        bucket = _event_bucket()
+        cursor.executemany(
+            "INSERT INTO ab_events (variant_id, event_type, bucket) VALUES (?, ?, ?)",
+            [(variant_id, event_type, bucket) for variant_id, event_type in events],
+        )
+
+    def record_events(self, events):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        for variant_id, event_type in events:
+            cursor.execute(
+                f"UPDATE ab_variants SET {COUNTERS[event_type]} = {COUNTERS[event_type]} + 1 "
+                "WHERE id = ?",
+                (variant_id,),
+            )
+        self._log_events(cursor, events)
+
+        conn.commit()
+        conn.close()
+
+    def fetch_counters(self, experiment_ids):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+        SELECT experiment_id, name, impressions, clicks, conversions
+        FROM ab_variants
+        WHERE experiment_id IN (SELECT value FROM json_each(?))
+        ORDER BY experiment_id, rowid
+        """,
+            (json.dumps(list(experiment_ids)),),
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def fetch_timeseries(self, experiment_id, granularity, start, end):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+        SELECT r.bucket, v.name,
+               SUM(CASE WHEN r.event_type = 'impression' THEN r.count ELSE 0 END),
+               SUM(CASE WHEN r.event_type = 'click' THEN r.count ELSE 0 END),
+               SUM(CASE WHEN r.event_type = 'conversion' THEN r.count ELSE 0 END)
+        FROM ab_variants v
+        JOIN ab_rollups r ON r.variant_id = v.id
+        WHERE v.experiment_id = ? AND r.granularity = ? AND r.bucket >= ? AND r.bucket < ?
+        GROUP BY r.bucket, v.id
+        ORDER BY r.bucket, v.rowid
+        """,
+            (experiment_id, granularity, start, end),
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def rollup(self):
+        """Fold events logged since the last rollup into the hourly and daily aggregates.
+
+        Returns the number of event rows that were rolled up.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT value FROM ab_rollup_state WHERE name = 'events'")
+            row = cursor.fetchone()
+            watermark = row[0] if row else 0
+            cursor.execute("SELECT MAX(id) FROM ab_events")
+            high = cursor.fetchone()[0]
+            if high is None or high <= watermark:
+                cursor.execute("COMMIT")
+                return 0
+
+            for granularity, seconds in ROLLUP_GRANULARITIES.items():
+                cursor.execute(
+                    """
+                INSERT INTO ab_rollups (variant_id, event_type, granularity, bucket, count)
+                SELECT variant_id, event_type, ?, bucket - bucket % ?, SUM(count)
+                FROM ab_events
+                WHERE id > ? AND id <= ?
+                GROUP BY variant_id, event_type, bucket - bucket % ?
+                ON CONFLICT (variant_id, granularity, bucket, event_type)
+                DO UPDATE SET count = count + excluded.count
+                """,
+                    (granularity, seconds, watermark, high, seconds),
+                )
+
+            cursor.execute(
+                "SELECT COUNT(*) FROM ab_events WHERE id > ? AND id <= ?", (watermark, high)
+            )
+            rolled_up = cursor.fetchone()[0]
+            cursor.execute(
+                "INSERT OR REPLACE INTO ab_rollup_state (name, value) VALUES ('events', ?)",
+                (high,),
+            )
+            cursor.execute("COMMIT")
+            return rolled_up
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def compact_events(self, older_than=86400):
+        """Merge rolled-up raw events older than `older_than` seconds into one row per bucket.
+
+        The merged row keeps the smallest id of the rows it replaces so it stays behind the
+        rollup watermark. Returns the number of rows removed.
+        """
+        cutoff = _event_bucket(time.time() - older_than)
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT value FROM ab_rollup_state WHERE name = 'events'")
+            row = cursor.fetchone()
+            watermark = row[0] if row else 0
+
+            cursor.execute(
+                """
+            CREATE TEMP TABLE compacted AS
+            SELECT MIN(id) AS id, variant_id, event_type, bucket, SUM(count) AS count,
+                   COUNT(*) AS merged
+            FROM ab_events
+            WHERE id <= ? AND bucket < ?
+            GROUP BY variant_id, event_type, bucket
+            HAVING COUNT(*) > 1
+            """,
+                (watermark, cutoff),
+            )
+            cursor.execute(
+                """
+            DELETE FROM ab_events
+            WHERE id <= ? AND bucket < ?
+              AND (variant_id, event_type, bucket) IN
+                  (SELECT variant_id, event_type, bucket FROM temp.compacted)
+            """,
+                (watermark, cutoff),
+            )
+            cursor.execute(
+                """
+            INSERT INTO ab_events (id, variant_id, event_type, bucket, count)
+            SELECT id, variant_id, event_type, bucket, count FROM temp.compacted
+            """
+            )
+            cursor.execute("SELECT COALESCE(SUM(merged - 1), 0) FROM temp.compacted")
+            removed = cursor.fetchone()[0]
+            cursor.execute("DROP TABLE temp.compacted")
+            cursor.execute("COMMIT")
+            return removed
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def conclude_experiments(self, experiment_ids, concluded_at):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany(
+            "UPDATE ab_experiments SET status = 'concluded', concluded_at = ? "
+            "WHERE id = ? AND status = 'active'",
+            [(concluded_at, experiment_id) for experiment_id in experiment_ids],
+        )
+        conn.commit()
+        conn.close()
+
+    def conclude_stale(self, created_before, concluded_at):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute(
+            "UPDATE ab_experiments SET status = 'concluded', concluded_at = ? "
+            "WHERE status = 'active' AND created_at < ?",
+            (concluded_at, created_before),
+        )
+        concluded = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return concluded
+
+    def archive_concluded(self, archive_dir, concluded_before):
+        # Archived experiments take their rollups with them, so fold pending events first
+        self.rollup()
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+        SELECT strftime('%Y_%m', created_at), id
+        FROM ab_experiments
+        WHERE status = 'concluded' AND concluded_at < ?
+        """,
+            (concluded_before,),
+        )
+        by_month = {}
+        for month, experiment_id in cursor.fetchall():
+            by_month.setdefault(month, []).append(experiment_id)
+
+        os.makedirs(archive_dir, exist_ok=True)
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archiving (id TEXT PRIMARY KEY)")
+        moved = {}
+        try:
+            for month, experiment_ids in sorted(by_month.items()):
+                path = _archive_path(archive_dir, month)
+                cursor.execute("ATTACH DATABASE ? AS archive", (path,))
+                try:
+                    _create_schema(cursor, "archive")
+                    cursor.execute("BEGIN IMMEDIATE")
+                    try:
+                        cursor.execute("DELETE FROM temp.archiving")
+                        cursor.executemany(
+                            "INSERT INTO temp.archiving (id) VALUES (?)",
+                            [(experiment_id,) for experiment_id in experiment_ids],
+                        )
+                        self._move_archiving(cursor)
+                        cursor.execute("COMMIT")
+                    except Exception:
+                        cursor.execute("ROLLBACK")
+                        raise
+                finally:
+                    cursor.execute("DETACH DATABASE archive")
+                moved[path] = len(experiment_ids)
+        finally:
+            conn.close()
+        return moved
+
+    def _move_archiving(self, cursor):
+        """Copy the experiments listed in temp.archiving to the attached archive and delete
+        them from the hot tables"""
+        variants = "SELECT id FROM main.ab_variants WHERE experiment_id IN temp.archiving"
+        cursor.execute(
+            "INSERT OR REPLACE INTO archive.ab_experiments "
+            "SELECT * FROM main.ab_experiments WHERE id IN temp.archiving"
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO archive.ab_variants "
+            "SELECT * FROM main.ab_variants WHERE experiment_id IN temp.archiving"
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO archive.ab_rollups "
+            f"SELECT * FROM main.ab_rollups WHERE variant_id IN ({variants})"
+        )
+        cursor.execute(
+            "INSERT INTO archive.ab_events (variant_id, event_type, bucket, count) "
+            "SELECT variant_id, event_type, bucket, count FROM main.ab_events "
+            f"WHERE variant_id IN ({variants})"
+        )
+        cursor.execute(f"DELETE FROM main.ab_events WHERE variant_id IN ({variants})")
+        cursor.execute(f"DELETE FROM main.ab_rollups WHERE variant_id IN ({variants})")
+        cursor.execute("DELETE FROM main.ab_variants WHERE experiment_id IN temp.archiving")
+        cursor.execute("DELETE FROM main.ab_experiments WHERE id IN temp.archiving")
+
+    def fetch_archived_counters(self, archive_dir, experiment_ids):
+        # Newest month first, so each experiment is read from one partition
+        rows = []
+        remaining = set(experiment_ids)
+        for path in sorted(glob.glob(_archive_path(archive_dir, "*")), reverse=True):
+            if not remaining:
+                break
+            found = SQLiteBackend(path).fetch_counters(remaining)
+            remaining -= {row[0] for row in found}
+            rows.extend(found)
+        return rows
+
+    def vacuum(self):
+        size_before = os.path.getsize(self.db_path)
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("VACUUM")
+        conn.close()
+        return size_before - os.path.getsize(self.db_path)
+
+
+# Picks a variant and counts the impression in one atomic step. KEYS are the experiment
+# hash followed by the counter, hourly and daily hashes of each variant in creation order;
+# ARGV holds the client-side random draw, the buckets and the variant ids.
+_SELECT_AND_INCREMENT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'active' then
+    return false
+end
+local count = (#KEYS - 1) / 3
+if count == 0 then
+    return false
+end
+local index = math.min(math.floor(tonumber(ARGV[1]) * count) + 1, count)
+local variant_key = KEYS[3 * index - 1]
+redis.call('HINCRBY', variant_key, 'impressions', 1)
+redis.call('HINCRBY', KEYS[3 * index], ARGV[2] .. ':impression', 1)
+redis.call('HINCRBY', KEYS[3 * index + 1], ARGV[3] .. ':impression', 1)
+local fields = redis.call('HMGET', variant_key, 'name', 'content')
+return {ARGV[3 + index], fields[1], fields[2]}
+"""
+
+# Counts a batch of events. KEYS are the counter, hourly and daily hashes of each event's
+# variant; ARGV holds the buckets and then the counter field and event type of each event.
+# Variants that do not exist (any more) are skipped, as the SQLite backend ignores them.
+_RECORD_EVENTS = """
+local recorded = 0
+for i = 1, #KEYS, 3 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        local n = (i - 1) / 3
+        redis.call('HINCRBY', KEYS[i], ARGV[3 + 2 * n], 1)
+        redis.call('HINCRBY', KEYS[i + 1], ARGV[1] .. ':' .. ARGV[4 + 2 * n], 1)
+        redis.call('HINCRBY', KEYS[i + 2], ARGV[2] .. ':' .. ARGV[4 + 2 * n], 1)
+        recorded = recorded + 1
+    end
+end
+return recorded
+"""
+
+# Moves a concluded experiment to the set of experiments being archived, unless another
+# archiver claimed it first. KEYS are the concluded and archiving sets; ARGV the experiment
+# id and the time of the claim.
+_CLAIM_FOR_ARCHIVE = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+return 1
+"""
+
+# Only one replica archives at a time; the lock expires should that replica die mid-run
+ARCHIVE_LOCK_SECONDS = 600
+
+# Variant ids of this many experiments are kept client-side; they never change once created
+VARIANT_ID_CACHE_SIZE = 4096
+
+
+class RedisBackend(ABTestingBackend):
+    """Experiments and counters in Redis hashes, shared by every seo-service replica.
+
+    Hourly and daily buckets are incremented together with the lifetime counters, so
+    there are no raw events to roll up or compact. Archived experiments stay in Redis as
+    one JSON document each, in a hash per creation month, so every replica can read them.
+    The scripts name every key they touch in KEYS; on Redis Cluster, give a prefix with a
+    hash tag such as "{ab}:" so that they all map to one slot.
+    """
+
+    def __init__(self, client, prefix="ab:"):
+        self.client = client
+        self.prefix = prefix
+        self._select_and_increment = client.register_script(_SELECT_AND_INCREMENT)
+        self._record_events = client.register_script(_RECORD_EVENTS)
+        self._claim_for_archive = client.register_script(_CLAIM_FOR_ARCHIVE)
+        # experiment id -> variant ids, least recently used first
+        self._variant_id_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, prefix="ab:"):
+        if redis is None:
+            raise RuntimeError("The redis package is required for RedisBackend")
+        return cls(redis.Redis.from_url(url), prefix=prefix)
+
+    def _experiment_key(self, experiment_id):
+        return f"{self.prefix}experiment:{experiment_id}"
+
+    def _variants_key(self, experiment_id):
+        return f"{self.prefix}experiment:{experiment_id}:variants"
+
+    def _variant_key(self, variant_id):
+        return f"{self.prefix}variant:{variant_id}"
+
+    def create_experiment(self, experiment_id, name, created_at, variants):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(
+            self._experiment_key(experiment_id),
+            mapping={"name": name, "created_at": created_at.isoformat(), "status": "active"},
+        )
+        # Active and concluded experiments are indexed by time for the lifecycle sweeps
+        pipe.zadd(f"{self.prefix}experiments:active", {experiment_id: created_at.timestamp()})
+        for variant_id, variant_name, content in variants:
+            pipe.hset(
+                self._variant_key(variant_id),
+                mapping={
+                    "experiment_id": experiment_id,
+                    "name": variant_name,
+                    "content": content,
+                    "impressions": 0,
+                    "clicks": 0,
+                    "conversions": 0,
+                },
+            )
+            pipe.rpush(self._variants_key(experiment_id), variant_id)
+        pipe.execute()
+
+    def _variant_keys(self, variant_id):
+        key = self._variant_key(variant_id)
+        return [key, f"{key}:hour", f"{key}:day"]
+
+    def _cached_variant_ids(self, experiment_id):
+        with self._cache_lock:
+            variant_ids = self._variant_id_cache.get(experiment_id)
+            if variant_ids is not None:
+                self._variant_id_cache.move_to_end(experiment_id)
+                return variant_ids
+        (variant_ids,) = self._variant_ids([experiment_id])
+        # An unknown experiment may still be created, so only known variants are kept
+        if variant_ids:
+            with self._cache_lock:
+                self._variant_id_cache[experiment_id] = variant_ids
+                if len(self._variant_id_cache) > VARIANT_ID_CACHE_SIZE:
+                    self._variant_id_cache.popitem(last=False)
+        return variant_ids
+
+    def select_and_increment(self, experiment_id, choice):
+        variant_ids = self._cached_variant_ids(experiment_id)
+        if not variant_ids:
+            return None
+        bucket = _event_bucket()
+        keys = [self._experiment_key(experiment_id)]
+        for variant_id in variant_ids:
+            keys.extend(self._variant_keys(variant_id))
+        result = self._select_and_increment(
+            keys=keys,
+            args=[
+                repr(choice),
+                _rollup_bucket(bucket, "hour"),
+                _rollup_bucket(bucket, "day"),
+                *variant_ids,
+            ],
+        )
+        if not result:
+            return None
+        return tuple(value.decode() for value in result)
+
+    def record_events(self, events):
+        if not events:
+            return
+        bucket = _event_bucket()
+        keys = []
+        args = [_rollup_bucket(bucket, "hour"), _rollup_bucket(bucket, "day")]
+        for variant_id, event_type in events:
+            keys.extend(self._variant_keys(variant_id))
+            args.extend((COUNTERS[event_type], event_type))
+        self._record_events(keys=keys, args=args)
+
+    def _variant_ids(self, experiment_ids):
+        pipe = self.client.pipeline(transaction=False)
+        for experiment_id in experiment_ids:
+            pipe.lrange(self._variants_key(experiment_id), 0, -1)
+        return [[v.decode() for v in ids] for ids in pipe.execute()]
+
+    def fetch_counters(self, experiment_ids):
+        experiment_ids = sorted(set(experiment_ids))
+        variant_ids = self._variant_ids(experiment_ids)
+
+        pipe = self.client.pipeline(transaction=False)
+        for ids in variant_ids:
+            for variant_id in ids:
+                pipe.hmget(self._variant_key(variant_id), "name", *COUNTERS.values())
+        values = iter(pipe.execute())
+
+        rows = []
+        for experiment_id, ids in zip(experiment_ids, variant_ids):
+            for _ in ids:
+                name, impressions, clicks, conversions = next(values)
+                if name is None:
+                    # Archived between the two reads
+                    continue
+                rows.append(
+                    (experiment_id, name.decode(), int(impressions), int(clicks), int(conversions))
+                )
+        return rows
+
+    def fetch_timeseries(self, experiment_id, granularity, start, end):
+        (variant_ids,) = self._variant_ids([experiment_id])
+
+        pipe = self.client.pipeline(transaction=False)
+        for variant_id in variant_ids:
+            pipe.hget(self._variant_key(variant_id), "name")
+            pipe.hgetall(f"{self._variant_key(variant_id)}:{granularity}")
+        replies = pipe.execute()
+
+        rows = []
+        for position, (name, buckets) in enumerate(zip(replies[::2], replies[1::2])):
+            if name is None:
+                continue
+            counts = {}
+            for field, count in buckets.items():
+                bucket, event_type = field.decode().split(":")
+                bucket = int(bucket)
+                if start <= bucket < end:
+                    counts.setdefault(bucket, dict.fromkeys(COUNTERS, 0))[event_type] = int(count)
+            for bucket, by_type in counts.items():
+                rows.append((bucket, position, name.decode(), *by_type.values()))
+        rows.sort()
+        return [(bucket, *counters) for bucket, _, *counters in rows]
+
+    def conclude_experiments(self, experiment_ids, concluded_at):
+        if not experiment_ids:
+            return
+        active = self.client.zmscore(f"{self.prefix}experiments:active", experiment_ids)
+        pipe = self.client.pipeline(transaction=True)
+        for experiment_id, score in zip(experiment_ids, active):
+            if score is None:
+                continue
+            pipe.hset(
+                self._experiment_key(experiment_id),
+                mapping={"status": "concluded", "concluded_at": concluded_at.isoformat()},
+            )
+            pipe.zrem(f"{self.prefix}experiments:active", experiment_id)
+            pipe.zadd(
+                f"{self.prefix}experiments:concluded", {experiment_id: concluded_at.timestamp()}
+            )
+        pipe.execute()
+
+    def conclude_stale(self, created_before, concluded_at):
+        stale = self.client.zrangebyscore(
+            f"{self.prefix}experiments:active", "-inf", f"({created_before.timestamp()}"
+        )
+        self.conclude_experiments([experiment_id.decode() for experiment_id in stale], concluded_at)
+        return len(stale)
+
+    def _archive_key(self, month):
+        return f"{self.prefix}archive:{month}"
+
+    def archive_concluded(self, archive_dir, concluded_before):
+        # Archives are kept in Redis, so `archive_dir` is not used
+        lock = self.client.lock(f"{self.prefix}archive:lock", timeout=ARCHIVE_LOCK_SECONDS)
+        if not lock.acquire(blocking=False):
+            return {}
+        try:
+            concluded_key = f"{self.prefix}experiments:concluded"
+            archiving_key = f"{self.prefix}experiments:archiving"
+            # Experiments claimed by an archiver that died are finished first
+            claimed = [
+                experiment_id.decode() for experiment_id in self.client.zrange(archiving_key, 0, -1)
+            ]
+            for experiment_id in self.client.zrangebyscore(
+                concluded_key, "-inf", f"({concluded_before.timestamp()}"
+            ):
+                if self._claim_for_archive(
+                    keys=[concluded_key, archiving_key], args=[experiment_id, time.time()]
+                ):
+                    claimed.append(experiment_id.decode())
+
+            moved = {}
+            for experiment_id in claimed:
+                archive_key = self._archive_experiment(experiment_id)
+                if archive_key is not None:
+                    moved[archive_key] = moved.get(archive_key, 0) + 1
+            return moved
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                # The lock expired during a long run
+                pass
+
+    def _archive_experiment(self, experiment_id):
+        """Copy a claimed experiment to its monthly archive hash and delete its hot keys in
+        one transaction, retried if a counter changes meanwhile. Returns the archive key,
+        or None if the experiment is already gone."""
+        experiment_key = self._experiment_key(experiment_id)
+        variants_key = self._variants_key(experiment_id)
+        archiving_key = f"{self.prefix}experiments:archiving"
+
+        def move(pipe):
+            experiment = {k.decode(): v.decode() for k, v in pipe.hgetall(experiment_key).items()}
+            variant_ids = [v.decode() for v in pipe.lrange(variants_key, 0, -1)]
+            if not experiment:
+                pipe.multi()
+                pipe.zrem(archiving_key, experiment_id)
+                return None
+
+            variant_keys = [self._variant_keys(variant_id) for variant_id in variant_ids]
+            pipe.watch(*(key for keys in variant_keys for key in keys))
+            variants = []
+            for variant_id, (key, hour_key, day_key) in zip(variant_ids, variant_keys):
+                variant = {k.decode(): v.decode() for k, v in pipe.hgetall(key).items()}
+                variants.append(
+                    {
+                        "id": variant_id,
+                        "name": variant["name"],
+                        "content": variant["content"],
+                        **{counter: int(variant[counter]) for counter in COUNTERS.values()},
+                        "hour": {k.decode(): int(v) for k, v in pipe.hgetall(hour_key).items()},
+                        "day": {k.decode(): int(v) for k, v in pipe.hgetall(day_key).items()},
+                    }
+                )
+            month = experiment["created_at"][:7].replace("-", "_")
+            archive_key = self._archive_key(month)
+
+            pipe.multi()
+            pipe.hset(archive_key, experiment_id, json.dumps({**experiment, "variants": variants}))
+            pipe.sadd(f"{self.prefix}archive:months", month)
+            pipe.delete(
+                experiment_key, variants_key, *(key for keys in variant_keys for key in keys)
+            )
+            pipe.zrem(archiving_key, experiment_id)
+            return archive_key
+
+        return self.client.transaction(move, experiment_key, variants_key, value_from_callable=True)
+
+    def fetch_archived_counters(self, archive_dir, experiment_ids):
+        rows = []
+        remaining = sorted(set(experiment_ids))
+        months = sorted(
+            (month.decode() for month in self.client.smembers(f"{self.prefix}archive:months")),
+            reverse=True,
+        )
+        for month in months:
+            if not remaining:
+                break
+            found = self.client.hmget(self._archive_key(month), remaining)
+            for experiment_id, document in zip(remaining, found):
+                if document is not None:
+                    for variant in json.loads(document)["variants"]:
+                        rows.append(
+                            (
+                                experiment_id,
+                                variant["name"],
+                                *(variant[counter] for counter in COUNTERS.values()),
+                            )
+                        )
+            remaining = [
+                experiment_id
+                for experiment_id, document in zip(remaining, found)
+                if document is None
+            ]
+        return rows
+
+
+class ABTesting:
+    def __init__(self, db_path="ab_testing.db", backend=None, archive_dir=None):
+        self.db_path = db_path
+        self.backend = backend if backend is not None else SQLiteBackend(db_path)
+        # The SQLite backend moves concluded experiments to one database per month in here
+        self.archive_dir = archive_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), "ab_archive"
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Use Redis when AB_TESTING_BACKEND=redis (REDIS_URL), otherwise the SQLite file"""
+        if os.environ.get("AB_TESTING_BACKEND", "sqlite") == "redis":
+            return cls(backend=RedisBackend.from_url(os.environ["REDIS_URL"]))
+        return cls(
+            db_path=os.environ.get("AB_TESTING_DB", "ab_testing.db"),
+            archive_dir=os.environ.get("AB_ARCHIVE_DIR"),
+        )
+
+    def create_experiment(self, name, variants):
+        """Create a new A/B test experiment with variants"""
+        experiment_id = str(uuid.uuid4())
+        self.backend.create_experiment(
+            experiment_id,
+            name,
+            datetime.now(),
+            [
+                (str(uuid.uuid4()), variant_name, content)
+                for variant_name, content in variants.items()
+            ],
+        )
+        return experiment_id
+
+    def get_random_variant(self, experiment_id):
+        """Get a random variant from an experiment and increment impressions"""
+        variant = self.backend.select_and_increment(experiment_id, random.random())
+        if variant is None:
+            return None
+
+        variant_id, variant_name, content = variant
+        return {"id": variant_id, "name": variant_name, "content": content}
+
+    def record_click(self, variant_id):
+        """Record a click for a variant"""
+        self.backend.record_events([(variant_id, "click")])
+
+    def record_conversion(self, variant_id):
+        """Record a conversion for a variant"""
+        self.backend.record_events([(variant_id, "conversion")])
+
+    def get_experiment_results(self, experiment_id):
+        """Get the results of an experiment"""
+        results = []
+        for row in self.backend.fetch_counters([experiment_id]):
+            _, name, impressions, clicks, conversions = row
+            ctr = (clicks / impressions) if impressions > 0 else 0
+            cvr = (conversions / clicks) if clicks > 0 else 0
+
+            results.append(
+                {
+                    "name": name,
+                    "impressions": impressions,
+                    "clicks": clicks,
+                    "conversions": conversions,
+                    "ctr": ctr,
+                    "cvr": cvr,
+                }
+            )
+
+        return results
+
+    def get_results_bulk(self, experiment_ids, confidence=0.95, include_archived=False):
+        """Get results for many experiments at once as columns of equal length.
+
+        Each row is one variant. The first variant created for an experiment is its control;
+        every variant is compared against it with a two-proportion z-test on CTR and a
+        Beta-posterior approximation of the probability that its CTR beats the control's.
+        Archived experiments are only looked up when `include_archived` is set.
+        """
+        rows = self.backend.fetch_counters(experiment_ids)
+        if include_archived:
+            missing = set(experiment_ids) - {row[0] for row in rows}
+            if missing:
+                # The sort is stable, so variants stay in creation order
+                rows = sorted(
+                    rows + self.backend.fetch_archived_counters(self.archive_dir, missing),
+                    key=lambda row: row[0],
+                )
+
+        if not rows:
+            results = {column: [] for column in RESULT_COLUMNS}
+            results["confidence"] = confidence
+            return results
+
+        experiments, names, impressions, clicks, conversions = zip(*rows)
+        experiments = np.array(experiments)
+        impressions = np.array(impressions, dtype=np.int64)
+        clicks = np.array(clicks, dtype=np.int64)
+        conversions = np.array(conversions, dtype=np.int64)
+
+        # Rows are grouped by experiment, so the control is the first row of each group
+        group_start = np.r_[True, experiments[1:] != experiments[:-1]]
+        starts = np.flatnonzero(group_start)
+        control = starts[np.cumsum(group_start) - 1]
+        is_control = np.arange(len(experiments)) == control
+
+        z_crit = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+        ctr = _ratio(clicks, impressions)
+        cvr = _ratio(conversions, clicks)
+        ctr_low, ctr_high = _wilson_interval(clicks, impressions, z_crit)
+        cvr_low, cvr_high = _wilson_interval(conversions, clicks, z_crit)
+
+        # Two-proportion z-test of each variant's CTR against its control
+        ones = np.ones(len(impressions), dtype=np.float64)
+        pooled = _ratio(clicks[control] + clicks, impressions[control] + impressions)
+        inverse_n = _ratio(ones, impressions[control]) + _ratio(ones, impressions)
+        se = np.sqrt(pooled * (1.0 - pooled) * inverse_n)
+        valid = (se > 0) & (impressions[control] > 0) & (impressions > 0) & ~is_control
+        z_score = np.divide(ctr - ctr[control], se, out=np.zeros_like(se), where=valid)
+        p_value = np.where(valid, 2.0 * (1.0 - _normal_cdf(np.abs(z_score))), 1.0)
+
+        # Normal approximation to P(CTR_variant > CTR_control) under Beta(1 + clicks, 1 + misses)
+        alpha = clicks + 1.0
+        beta = (impressions - clicks) + 1.0
+        mean = alpha / (alpha + beta)
+        var = alpha * beta / ((alpha + beta) ** 2 * (alpha + beta + 1.0))
+        spread = np.sqrt(var + var[control])
+        prob_beat_control = np.where(is_control, 0.5, _normal_cdf((mean - mean[control]) / spread))
+
+        return {
+            "experiment_id": experiments.tolist(),
+            "variant": list(names),
+            "is_control": is_control.tolist(),
+            "impressions": impressions.tolist(),
+            "clicks": clicks.tolist(),
+            "conversions": conversions.tolist(),
+            "ctr": ctr.tolist(),
+            "ctr_ci_low": ctr_low.tolist(),
+            "ctr_ci_high": ctr_high.tolist(),
+            "cvr": cvr.tolist(),
+            "cvr_ci_low": cvr_low.tolist(),
+            "cvr_ci_high": cvr_high.tolist(),
+            "z_score": z_score.tolist(),
+            "p_value": p_value.tolist(),
+            "prob_beat_control": prob_beat_control.tolist(),
+            "confidence": confidence,
+        }
+
+    def conclude_experiment(self, experiment_id):
+        """Stop serving an experiment; its results stay queryable until it is archived"""
+        self.backend.conclude_experiments([experiment_id], datetime.now())
+
+    def conclude_stale(self, older_than):
+        """Conclude active experiments created more than `older_than` seconds ago"""
+        now = datetime.now()
+        return self.backend.conclude_stale(now - timedelta(seconds=older_than), now)
+
+    def archive_concluded(self, older_than=0, vacuum=True):
+        """Move experiments concluded more than `older_than` seconds ago into the monthly
+        archive partitions, then vacuum the hot store. Returns a report of what moved and how
+        many bytes were reclaimed."""
+        start_time = time.time()
+        moved = self.backend.archive_concluded(
+            self.archive_dir, datetime.now() - timedelta(seconds=older_than)
+        )
+        reclaimed = self.backend.vacuum() if vacuum and moved else 0
+        return {
+            "archived": sum(moved.values()),
+            "partitions": {os.path.basename(path): count for path, count in moved.items()},
+            "bytes_reclaimed": reclaimed,
+            "duration": time.time() - start_time,
+        }
+
+    def rollup(self):
+        """Fold events logged since the last rollup into the hourly and daily aggregates.
+
+        Returns the number of event rows that were rolled up.
+        """
+        return self.backend.rollup()
+
+    def compact_events(self, older_than=86400):
+        """Merge rolled-up raw events older than `older_than` seconds into one row per bucket.
+
+        Returns the number of rows removed.
+        """
+        return self.backend.compact_events(older_than=older_than)
+
+    def get_timeseries(self, experiment_id, start, end, granularity="hour"):
+        """Per-bucket results for an experiment between `start` (inclusive) and `end`.
+
+        Reads only the rollups, so events logged since the last rollup() are not included.
+        Returns columns of equal length, one entry per bucket and variant.
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {sorted(ROLLUP_GRANULARITIES)}")
+
+        rows = self.backend.fetch_timeseries(
+            experiment_id, granularity, _to_epoch(start), _to_epoch(end)
+        )
+
+        series = {
+            "bucket": [],
+            "variant": [],
+            "impressions": [],
+            "clicks": [],
+            "conversions": [],
+            "ctr": [],
+            "cvr": [],
+        }
+        for bucket, name, impressions, clicks, conversions in rows:
+            series["bucket"].append(bucket)
+            series["variant"].append(name)
+            series["impressions"].append(impressions)
+            series["clicks"].append(clicks)
+            series["conversions"].append(conversions)
+            series["ctr"].append((clicks / impressions) if impressions > 0 else 0)
+            series["cvr"].append((conversions / clicks) if clicks > 0 else 0)
+        series["granularity"] = granularity
+        return series
+
+    def start_maintenance_worker(
+        self,
+        interval=60,
+        compact_interval=3600,
+        retention=86400,
+        experiment_ttl=None,
+        archive_after=0,
+    ):
+        """Run rollup() every `interval` seconds in a daemon thread.
+
+        Every `compact_interval` seconds it also compacts raw events older than `retention`
+        and, when `experiment_ttl` is set, concludes experiments older than that and archives
+        those concluded more than `archive_after` seconds ago, which keeps the hot tables
+        bounded. Returns an Event that stops the worker when set.
+        """
+        stop = threading.Event()
+
+        def run():
+            last_compaction = time.time()
+            while not stop.wait(interval):
+                try:
+                    self.rollup()
+                    if time.time() - last_compaction >= compact_interval:
+                        self.compact_events(older_than=retention)
+                        if experiment_ttl is not None:
+                            self.conclude_stale(experiment_ttl)
+                            self.archive_concluded(older_than=archive_after)
+                        last_compaction = time.time()
+                except Exception as e:
+                    print(f"Error maintaining A/B testing data: {e}")
+
+        threading.Thread(target=run, name="ab-maintenance", daemon=True).start()
+        return stop
@@ -0,0 +1,21 @@
+from flask import jsonify
+
+
+def handle_bad_request(e):
+    return jsonify({"error": "Bad request"}), 400
+
+
+def handle_not_found(e):
+    return jsonify({"error": "Not found"}), 404
+
+
+def handle_internal_server_error(e):
+    return jsonify({"error": "Internal server error"}), 500
+
+
+def handle_service_unavailable(e):
+    return jsonify({"error": "Service unavailable"}), 503
+
+
+def handle_timeout(e):
+    return jsonify({"error": "Gateway timeout"}), 504
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from app import app  # noqa: E402
+
+
+@pytest.fixture
+def test_client():
+    return app.test_client()
@@ -0,0 +1,69 @@
+"""Compare A/B testing event throughput of the SQLite and Redis backends.
+
+Usage:
+    python benchmarks/bench_ab_backends.py --events 20000 --redis-url redis://localhost:6379/15
+
+Without --redis-url the Redis backend runs against fakeredis, which measures the client
+side only and is not representative of a real server.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ab_testing import ABTesting, RedisBackend, SQLiteBackend  # noqa: E402
+
+
+def run(ab_testing, events, experiments):
+    experiment_ids = [
+        ab_testing.create_experiment(
+            f"bench-{i}", {"Original Title": "a", "Alternative Title": "b"}
+        )
+        for i in range(experiments)
+    ]
+
+    start = time.perf_counter()
+    for i in range(events):
+        variant = ab_testing.get_random_variant(experiment_ids[i % experiments])
+        if i % 10 == 0:
+            ab_testing.record_click(variant["id"])
+    elapsed = time.perf_counter() - start
+    # Every tenth impression also records a click
+    return (events + events // 10) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--experiments", type=int, default=100)
+    parser.add_argument("--redis-url", default=os.environ.get("REDIS_URL"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_backend = SQLiteBackend(os.path.join(tmp, "ab_testing.db"))
+        rate = run(ABTesting(backend=sqlite_backend), args.events, args.experiments)
+        print(f"sqlite: {rate:,.0f} events/sec")
+
+    if args.redis_url:
+        backend = RedisBackend.from_url(args.redis_url, prefix="ab-bench:")
+        label = "redis"
+    else:
+        import fakeredis
+
+        backend = RedisBackend(fakeredis.FakeRedis(), prefix="ab-bench:")
+        label = "redis (fakeredis)"
+    try:
+        rate = run(ABTesting(backend=backend), args.events, args.experiments)
+        print(f"{label}: {rate:,.0f} events/sec")
+    finally:
+        keys = list(backend.client.scan_iter(match="ab-bench:*"))
+        if keys:
+            backend.client.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
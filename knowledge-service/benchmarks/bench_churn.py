@@ -0,0 +1,123 @@
+"""Measure update throughput and query latency under sustained updates and deletes.
+
+Usage:
+    python benchmarks/bench_churn.py --size 100000 [--seconds 60] [--batch 100] [--deletes 0.2]
+
+A writer replaces or deletes random documents in batches as fast as it can while a reader
+runs ranked queries and the background merger compacts segments. Every interval prints
+the writer's throughput, the reader's latency and how many segments and tombstones the
+index holds; both should stay flat rather than degrade as tombstones pile up.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_query import make_document, make_queries  # noqa: E402
+from segments import SegmentedIndex  # noqa: E402
+from vectors import HashingEmbedder, document_text  # noqa: E402
+
+
+def publish(index, embedder, documents):
+    batch = {document["id"]: document for document in documents}
+    units = {doc_id: [(doc_id, document)] for doc_id, document in batch.items()}
+    vectors = embedder.embed([document_text(document) for document in batch.values()])
+    return index.publish(batch, units, vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--interval", type=float, default=5)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--deletes", type=float, default=0.2, help="share of deletes")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(args.size)
+    embedder = HashingEmbedder(dim=64)
+    index = SegmentedIndex(embedder.dim)
+    documents = [make_document(rng, i) for i in range(args.size)]
+    start = time.perf_counter()
+    for first in range(0, args.size, 10000):
+        last = first + 10000
+        publish(index, embedder, documents[first:last])
+    index.merge()
+    print(f"loaded {args.size} docs in {time.perf_counter() - start:.1f}s")
+
+    queries = make_queries(rng, documents, 1000)
+    idle = []
+    for query in queries:
+        begin = time.perf_counter()
+        index.view.search_ranked(query, top_k=args.top_k)
+        idle.append(time.perf_counter() - begin)
+    idle.sort()
+    print(
+        f"without churn: query p50 {statistics.median(idle) * 1000:.2f}ms  "
+        f"p99 {idle[int(len(idle) * 0.99) - 1] * 1000:.2f}ms"
+    )
+    stop_merger = index.start_merger()
+    done = threading.Event()
+    lock = threading.Lock()
+    counts = {"updates": 0, "deletes": 0}
+    latencies = []
+
+    def write():
+        writer_rng = random.Random(1)
+        while not done.is_set():
+            ids = writer_rng.sample(range(args.size), args.batch)
+            deletes = int(len(ids) * args.deletes)
+            index.delete([str(i) for i in ids[:deletes]])
+            publish(index, embedder, [make_document(writer_rng, i) for i in ids[deletes:]])
+            with lock:
+                counts["deletes"] += deletes
+                counts["updates"] += len(ids) - deletes
+
+    def read():
+        reader_rng = random.Random(2)
+        while not done.is_set():
+            query = reader_rng.choice(queries)
+            begin = time.perf_counter()
+            index.view.search_ranked(query, top_k=args.top_k)
+            elapsed = time.perf_counter() - begin
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=write), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    print(
+        f"{'time':>6} {'writes/s':>9} {'query p50':>10} {'p99':>8} "
+        f"{'segments':>9} {'tombstones':>11}"
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.seconds:
+        time.sleep(args.interval)
+        with lock:
+            writes = counts["updates"] + counts["deletes"]
+            counts["updates"] = counts["deletes"] = 0
+            window = sorted(latencies)
+            latencies.clear()
+        view = index.view
+        p50 = statistics.median(window) if window else 0.0
+        p99 = window[int(len(window) * 0.99) - 1] if window else 0.0
+        print(
+            f"{time.perf_counter() - started:6.0f} {writes / args.interval:9.0f} "
+            f"{p50 * 1000:8.2f}ms {p99 * 1000:6.2f}ms {len(view.segments):9} {view.tombstones:11}"
+        )
+    done.set()
+    stop_merger.set()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measure bytes per document held by the knowledge service on a synthetic corpus.
+
+Usage:
+    python benchmarks/bench_memory.py --size 100000 [--seed 7]
+
+Compares documents kept as plain dicts with the compressed DocumentStore segments use,
+for zlib and, when the zstandard package is installed, zstd.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import docstore  # noqa: E402
+from bench_query import make_document  # noqa: E402
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = [(str(i), make_document(rng, i)) for i in range(args.size)]
+
+    # A JSON round trip gives the dicts their own strings, as documents parsed from requests
+    _, baseline, elapsed = measure(
+        lambda: {doc_id: json.loads(json.dumps(document)) for doc_id, document in rows}
+    )
+    print(f"{'dict':>6}: {baseline / args.size:8.1f} bytes/doc  build {elapsed:6.2f}s")
+
+    methods = ["zlib"] + (["zstd"] if docstore.zstandard is not None else [])
+    for method in methods:
+        codec = docstore.Codec(method)
+        store, size, elapsed = measure(lambda: docstore.DocumentStore.from_documents(codec, rows))
+        start = time.perf_counter()
+        for doc_id, _ in rows[:10000]:
+            store[doc_id]
+        per_get = (time.perf_counter() - start) / min(len(rows), 10000)
+        print(
+            f"{method:>6}: {size / args.size:8.1f} bytes/doc  build {elapsed:6.2f}s  "
+            f"get {per_get * 1e6:5.1f}us  ({baseline / size:.1f}x smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measure /query latency of the inverted index on a synthetic corpus.
+
+Usage:
+    python benchmarks/bench_query.py --sizes 10000 100000 1000000 [--top-k 10] [--scan]
+
+--scan also times the old json.dumps() substring scan for comparison.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from index import InvertedIndex  # noqa: E402
+
+VOCABULARY = [f"term{i}" for i in range(20000)]
+# Zipf-like weights so a few terms are common and most are rare
+WEIGHTS = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def make_document(rng, doc_id):
+    words = rng.choices(VOCABULARY, weights=WEIGHTS, k=60)
+    return {
+        "id": str(doc_id),
+        "title": " ".join(words[:8]),
+        "body": " ".join(words[8:]),
+        "tags": words[:3],
+    }
+
+
+def make_queries(rng, documents, count):
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents)["body"].split()
+        kind = rng.randrange(3)
+        if kind == 0:
+            queries.append(words[0])
+        elif kind == 1:
+            queries.append(f"{words[0]} {words[5]}")
+        else:
+            queries.append(f'"{words[2]} {words[3]}"')
+    return queries
+
+
+def time_queries(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--scan", action="store_true")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rng = random.Random(size)
+        documents = [make_document(rng, i) for i in range(size)]
+        index = InvertedIndex()
+        start = time.perf_counter()
+        for document in documents:
+            index.add(document["id"], document)
+        build = time.perf_counter() - start
+
+        queries = make_queries(rng, documents, args.queries)
+        mean, p99 = time_queries(index.search, queries)
+        print(
+            f"{size:>9} docs  build {build:7.1f}s  "
+            f"index mean {mean * 1000:8.3f}ms  p99 {p99 * 1000:8.3f}ms"
+        )
+        mean, p99 = time_queries(lambda q: index.search_ranked(q, top_k=args.top_k), queries)
+        print(f"{'':>9}      top-{args.top_k} mean {mean * 1000:8.3f}ms  p99 {p99 * 1000:8.3f}ms")
+
+        if args.scan:
+            store = {document["id"]: document for document in documents}
+
+            def scan(query):
+                return [
+                    item for item in store.values() if query.lower() in json.dumps(item).lower()
+                ]
+
+            mean, p99 = time_queries(scan, queries[:10])
+            print(f"{'':>9}       scan mean {mean * 1000:8.3f}ms  p99 {p99 * 1000:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
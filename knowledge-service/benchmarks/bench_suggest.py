@@ -0,0 +1,79 @@
+"""Measure suggestion latency of the trigram term index on a synthetic vocabulary.
+
+Usage:
+    python benchmarks/bench_suggest.py --terms 1000000 [--queries 1000]
+
+Terms are random pronounceable words with Zipf-like frequencies; queries are prefixes
+of vocabulary terms and terms with one or two random typos.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from suggest import TermIndex, suggest  # noqa: E402
+
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwyz" for v in "aeiou"] + ["th", "st", "ng", "er"]
+
+
+def make_vocabulary(rng, count):
+    frequencies = {}
+    while len(frequencies) < count:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 5)))
+        frequencies[word] = int(1_000_000 / (len(frequencies) + 1)) + 1
+    return frequencies
+
+
+def typo(rng, word):
+    i = rng.randrange(len(word))
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1 :] if len(word) > 4 else word
+    if kind == 1:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1 :]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+
+
+def time_calls(call, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    frequencies = make_vocabulary(rng, args.terms)
+    start = time.perf_counter()
+    terms = TermIndex(frequencies)
+    print(f"built index of {len(terms)} terms in {time.perf_counter() - start:.1f}s")
+
+    words = rng.sample(terms.terms, args.queries)
+    workloads = {
+        "prefix": [word[: rng.randint(1, len(word))] for word in words],
+        "1 typo": [typo(rng, word) for word in words],
+        "2 typos": [typo(rng, typo(rng, word)) for word in words],
+        "phrase": [f"{typo(rng, a)} {b[:3]}" for a, b in zip(words, reversed(words))],
+    }
+    for name, queries in workloads.items():
+        p50, p99 = time_calls(lambda query: suggest([terms], query), queries)
+        print(f"{name:>8}: p50 {p50 * 1000:6.2f}ms  p99 {p99 * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
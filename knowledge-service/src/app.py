@@ -1,77 +1,504 @@
-import json
-import time
-
-from flask import Flask, Response, jsonify, request
-from flask_cors import CORS
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
-
-app = Flask(__name__)
-CORS(app)
-
-# Define metrics
-KNOWLEDGE_REQUESTS = Counter("knowledge_requests_total", "Total knowledge requests", ["endpoint"])
-KNOWLEDGE_LATENCY = Histogram(
-    "knowledge_request_duration_seconds", "Knowledge request latency", ["endpoint"]
-)
-
-knowledge_data = {}
-
-
-@app.route("/metrics")
-def metrics():
-    """Expose metrics for Prometheus"""
-    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
-
-
-@app.route("/ingest", methods=["POST"])
-def ingest_knowledge():
-    """Endpoint to ingest knowledge data"""
-    start_time = time.time()
-    try:
-        data = request.json
-        if not isinstance(data, dict):
-            return jsonify({"error": "Invalid knowledge data format. Must be a JSON object."}), 400
-        knowledge_id = data.get("id")
-        if not knowledge_id:
-            return jsonify({"error": "Knowledge data must have an 'id' field."}), 400
-        knowledge_data[knowledge_id] = data
-        result = jsonify(
-            {
-                "status": "success",
-                "message": f"Knowledge ingested with id: {knowledge_id}",
-                "knowledge_ids": list(knowledge_data.keys()),
-            }
-        )
-        KNOWLEDGE_REQUESTS.labels(endpoint="/ingest").inc()
-        return result
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        latency = time.time() - start_time
-        KNOWLEDGE_LATENCY.labels(endpoint="/ingest").observe(latency)
-
-
-@app.route("/query", methods=["POST"])
-def query_knowledge():
-    """Endpoint to query knowledge data"""
-    start_time = time.time()
-    try:
-        query = request.json.get("query")
-        if not query:
-            return jsonify({"error": "Query text is required."}), 400
-        results = []
-        for knowledge_item in knowledge_data.values():
-            if query.lower() in json.dumps(knowledge_item).lower():  # Simple keyword search
-                results.append(knowledge_item)
-        result = jsonify({"status": "success", "query": query, "response": results})
-        KNOWLEDGE_REQUESTS.labels(endpoint="/query").inc()
-        return result
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        latency = time.time() - start_time
-        KNOWLEDGE_LATENCY.labels(endpoint="/query").observe(latency)
-
-
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5002)
+import json
+import math
+import os
+import threading
+import time
+
+from chunking import chunk_document, id_error
+from docstore import Codec
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from segments import SegmentedIndex
+from store import KnowledgeStore
+from vectors import document_text, hybrid_search, load_embedder
+
+app = Flask(__name__)
+CORS(app)
+
+# Define metrics
+KNOWLEDGE_REQUESTS = Counter("knowledge_requests_total", "Total knowledge requests", ["endpoint"])
+KNOWLEDGE_LATENCY = Histogram(
+    "knowledge_request_duration_seconds", "Knowledge request latency", ["endpoint"]
+)
+KNOWLEDGE_BULK_LINES = Counter(
+    "knowledge_bulk_lines_total", "NDJSON lines processed by bulk ingest", ["outcome"]
+)
+
+# Upper bound on results per /query, however broad the query is
+MAX_TOP_K = 100
+DEFAULT_TOP_K = 10
+
+SEARCH_MODES = ("keyword", "semantic", "hybrid")
+
+# /ingest/bulk embeds, logs and indexes this many documents at a time
+BULK_BATCH_SIZE = int(os.environ.get("KNOWLEDGE_BULK_BATCH_SIZE", "500"))
+# Per-line errors listed in a bulk response; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Long text fields are indexed as passages of this many words, overlapping consecutively
+CHUNK_TOKENS = int(os.environ.get("KNOWLEDGE_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.environ.get("KNOWLEDGE_CHUNK_OVERLAP", "40"))
+
+# Page size bounds for GET /items
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Suggestions per GET /suggest
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+embedder = load_embedder(
+    os.environ.get("KNOWLEDGE_EMBEDDER"), dim=int(os.environ.get("KNOWLEDGE_EMBEDDING_DIM", "256"))
+)
+# Documents, keyword index and vectors; requests read knowledge.view without locking
+knowledge = SegmentedIndex(
+    embedder.dim,
+    ivf_threshold=int(os.environ.get("KNOWLEDGE_IVF_THRESHOLD", "50000")),
+    codec=Codec(os.environ.get("KNOWLEDGE_COMPRESSION", "zlib")),
+)
+# Orders log appends with publishes so a snapshot sees exactly the logged writes
+knowledge_lock = threading.Lock()
+# Set when KNOWLEDGE_DATA_DIR is configured; otherwise knowledge lives in memory only
+knowledge_store = None
+
+
+def keyed(documents):
+    """Documents by string id, so ids can be paged through and addressed in URLs.
+
+    A later document with the same id replaces an earlier one.
+    """
+    return {str(data["id"]): data for data in documents}
+
+
+def search_units(documents):
+    """Chunk documents into search units; returns the units and the texts to embed"""
+    units = {
+        knowledge_id: chunk_document(knowledge_id, data, CHUNK_TOKENS, CHUNK_OVERLAP)
+        for knowledge_id, data in documents.items()
+    }
+    texts = [document_text(unit) for parts in units.values() for _, unit in parts]
+    return units, texts
+
+
+def ingest_documents(documents):
+    """Chunk, embed, log and publish a batch as one segment with one log write.
+
+    Returns how many of the documents were new.
+    """
+    batch = keyed(documents)
+    units, texts = search_units(batch)
+    vectors = embedder.embed(texts)
+    with knowledge_lock:
+        if knowledge_store is not None:
+            knowledge_store.append([{"op": "put", "document": data} for data in batch.values()])
+        return knowledge.publish(batch, units, vectors)
+
+
+def valid_boosts(boosts):
+    """Whether every boost is a finite positive number.
+
+    Ranked search bounds each term's score by its boosted weight to stop early, which only
+    holds for positive weights.
+    """
+    return isinstance(boosts, dict) and all(
+        isinstance(weight, (int, float))
+        and not isinstance(weight, bool)
+        and math.isfinite(weight)
+        and weight > 0
+        for weight in boosts.values()
+    )
+
+
+def delete_documents(knowledge_ids):
+    """Log and tombstone the live documents among `knowledge_ids`; returns how many"""
+    with knowledge_lock:
+        view = knowledge.view
+        live = [
+            knowledge_id for knowledge_id in dict.fromkeys(knowledge_ids) if knowledge_id in view
+        ]
+        if live and knowledge_store is not None:
+            knowledge_store.append([{"op": "delete", "id": knowledge_id} for knowledge_id in live])
+        return knowledge.delete(live)
+
+
+def restore_knowledge():
+    """Rebuild in-memory state from the latest snapshot plus the log tail"""
+    snapshot, tail = knowledge_store.recover()
+    documents = keyed(snapshot.documents.values())
+    if documents:
+        units, texts = search_units(documents)
+        vectors = snapshot.vectors
+        # Re-embed if the embedder or the chunking changed since the snapshot
+        if vectors is None or vectors.shape != (len(texts), embedder.dim):
+            vectors = embedder.embed(texts)
+        knowledge.publish(documents, units, vectors)
+    replay(tail)
+    knowledge.merge()
+    return len(documents), len(tail)
+
+
+def replay(records):
+    """Apply logged puts and deletes in log order, publishing consecutive puts together"""
+    puts = []
+    for record in records:
+        if record["op"] == "put":
+            puts.append(record["document"])
+            continue
+        if puts:
+            publish_replayed(puts)
+            puts = []
+        knowledge.delete([record["id"]])
+    if puts:
+        publish_replayed(puts)
+
+
+def publish_replayed(documents):
+    replayed = keyed(documents)
+    units, texts = search_units(replayed)
+    knowledge.publish(replayed, units, embedder.embed(texts))
+
+
+def snapshot_knowledge():
+    """Write a compacted snapshot and drop the log segments it covers"""
+    with knowledge_lock:
+        lsn = knowledge_store.rotate()
+        view = knowledge.view
+    ids, vectors = view.live_vectors()
+    knowledge_store.write_snapshot(
+        lsn, {knowledge_id: view[knowledge_id] for knowledge_id in ids}, vectors
+    )
+    return lsn
+
+
+def start_snapshot_worker(interval=60, min_records=10000):
+    """Snapshot every `interval` seconds once `min_records` changes have been logged.
+
+    Returns an Event that stops the worker when set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                if knowledge_store.records_since_snapshot >= min_records:
+                    snapshot_knowledge()
+            except Exception as e:
+                print(f"Error writing knowledge snapshot: {e}")
+
+    threading.Thread(target=run, name="knowledge-snapshots", daemon=True).start()
+    return stop
+
+
+@app.route("/metrics")
+def metrics():
+    """Expose metrics for Prometheus"""
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+@app.route("/ingest", methods=["POST"])
+def ingest_knowledge():
+    """Endpoint to ingest knowledge data"""
+    start_time = time.time()
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid knowledge data format. Must be a JSON object."}), 400
+        knowledge_id = data.get("id")
+        if not knowledge_id:
+            return jsonify({"error": "Knowledge data must have an 'id' field."}), 400
+        invalid = id_error(knowledge_id)
+        if invalid:
+            return jsonify({"error": invalid}), 400
+        created = ingest_documents([data])
+        result = jsonify(
+            {
+                "status": "success",
+                "message": f"Knowledge ingested with id: {knowledge_id}",
+                "knowledge_id": str(knowledge_id),
+                "created": bool(created),
+            }
+        )
+        KNOWLEDGE_REQUESTS.labels(endpoint="/ingest").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/ingest").observe(latency)
+
+
+@app.route("/ingest/bulk", methods=["POST"])
+def ingest_knowledge_bulk():
+    """Endpoint to ingest newline-delimited JSON documents streamed in the request body.
+
+    Lines are parsed as they arrive and applied in batches of BULK_BATCH_SIZE. Invalid lines
+    are reported by line number and skipped; the rest of the stream is still ingested.
+    """
+    start_time = time.time()
+    try:
+        ingested = 0
+        created = 0
+        failed = 0
+        errors = []
+        batch = []
+        for line_number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("Invalid knowledge data format. Must be a JSON object.")
+                if not data.get("id"):
+                    raise ValueError("Knowledge data must have an 'id' field.")
+                invalid = id_error(data["id"])
+                if invalid:
+                    raise ValueError(invalid)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            batch.append(data)
+            if len(batch) >= BULK_BATCH_SIZE:
+                created += ingest_documents(batch)
+                ingested += len(batch)
+                batch = []
+        if batch:
+            created += ingest_documents(batch)
+            ingested += len(batch)
+
+        KNOWLEDGE_BULK_LINES.labels(outcome="ingested").inc(ingested)
+        KNOWLEDGE_BULK_LINES.labels(outcome="failed").inc(failed)
+        duration = time.time() - start_time
+        result = jsonify(
+            {
+                "status": "success" if not failed else "partial",
+                "ingested": ingested,
+                "created": created,
+                "failed": failed,
+                "errors": errors,
+                "duration_seconds": round(duration, 3),
+                "documents_per_second": round(ingested / duration, 1) if duration > 0 else None,
+            }
+        )
+        KNOWLEDGE_REQUESTS.labels(endpoint="/ingest/bulk").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/ingest/bulk").observe(latency)
+
+
+@app.route("/items", methods=["GET"])
+def list_knowledge():
+    """Endpoint to page through knowledge items in id order.
+
+    `cursor` is the last id of the previous page, `limit` the page size (at most
+    MAX_PAGE_SIZE) and `fields` an optional comma-separated list of top-level fields to
+    return besides the id.
+    """
+    start_time = time.time()
+    try:
+        cursor = request.args.get("cursor")
+        try:
+            limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer."}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}."}), 400
+        fields = request.args.get("fields")
+        fields = [field for field in fields.split(",") if field] if fields else None
+
+        view = knowledge.view
+        # One extra key tells whether another page follows
+        keys = view.ids_after(cursor, limit + 1)
+        items = [view[key] for key in keys[:limit]]
+        total = len(view)
+        if fields is not None:
+            items = [
+                {"id": item["id"], **{field: item[field] for field in fields if field in item}}
+                for item in items
+            ]
+        result = jsonify(
+            {
+                "status": "success",
+                "items": items,
+                "next_cursor": keys[limit - 1] if len(keys) > limit else None,
+                "total": total,
+            }
+        )
+        KNOWLEDGE_REQUESTS.labels(endpoint="/items").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/items").observe(latency)
+
+
+@app.route("/items/<knowledge_id>", methods=["PUT"])
+def put_knowledge(knowledge_id):
+    """Endpoint to create or replace the knowledge item with this id"""
+    start_time = time.time()
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid knowledge data format. Must be a JSON object."}), 400
+        if str(data.get("id", knowledge_id)) != knowledge_id:
+            return jsonify({"error": "The 'id' field must match the id in the URL."}), 400
+        invalid = id_error(knowledge_id)
+        if invalid:
+            return jsonify({"error": invalid}), 400
+        created = ingest_documents([{**data, "id": knowledge_id}])
+        result = jsonify(
+            {"status": "success", "knowledge_id": knowledge_id, "created": bool(created)}
+        )
+        KNOWLEDGE_REQUESTS.labels(endpoint="/items/<id>").inc()
+        return result, 201 if created else 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/items/<id>").observe(latency)
+
+
+@app.route("/items/<knowledge_id>", methods=["DELETE"])
+def delete_knowledge(knowledge_id):
+    """Endpoint to delete the knowledge item with this id.
+
+    The item disappears from reads at once; the space it held is reclaimed when the
+    background merger rewrites its segment.
+    """
+    start_time = time.time()
+    try:
+        if not delete_documents([knowledge_id]):
+            return jsonify({"error": f"No knowledge item with id: {knowledge_id}"}), 404
+        result = jsonify({"status": "success", "knowledge_id": knowledge_id, "deleted": True})
+        KNOWLEDGE_REQUESTS.labels(endpoint="/items/<id>").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/items/<id>").observe(latency)
+
+
+@app.route("/query", methods=["POST"])
+def query_knowledge():
+    """Endpoint to query knowledge data.
+
+    Long documents are answered with their best passages, each carrying a `parent_id`;
+    `full_documents` returns the whole documents instead.
+    """
+    start_time = time.time()
+    try:
+        query = request.json.get("query")
+        if not query:
+            return jsonify({"error": "Query text is required."}), 400
+        try:
+            top_k = min(int(request.json.get("top_k", DEFAULT_TOP_K)), MAX_TOP_K)
+        except (TypeError, ValueError):
+            return jsonify({"error": "top_k must be an integer."}), 400
+        if top_k < 1:
+            return jsonify({"error": "top_k must be at least 1."}), 400
+        try:
+            alpha = float(request.json.get("alpha", 0.5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "alpha must be a number."}), 400
+        if not 0 <= alpha <= 1:
+            return jsonify({"error": "alpha must be between 0 and 1."}), 400
+        boosts = request.json.get("boosts")
+        if boosts is not None and not valid_boosts(boosts):
+            return jsonify({"error": "boosts must map field names to positive weights."}), 400
+        full_documents = bool(request.json.get("full_documents", False))
+        mode = request.json.get("mode", "keyword")
+        if mode not in SEARCH_MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(SEARCH_MODES)}."}), 400
+        view = knowledge.view
+        if mode == "keyword":
+            hits = view.search_ranked(query, top_k=top_k, boosts=boosts)
+        elif mode == "semantic":
+            hits = view.search_vectors(embedder.embed([query])[0], top_k=top_k)
+        else:
+            hits = hybrid_search(
+                view,
+                view.semantic,
+                embedder.embed([query])[0],
+                query,
+                top_k=top_k,
+                alpha=alpha,
+                boosts=boosts,
+            )
+        if full_documents:
+            # Each document once, at the rank of its best passage
+            best = {}
+            for unit_id, score in hits:
+                best.setdefault(view.parent_of(unit_id), score)
+            response = [view[knowledge_id] for knowledge_id in best]
+            scores = list(best.values())
+        else:
+            response = [view.passage(unit_id) for unit_id, _ in hits]
+            scores = [score for _, score in hits]
+        result = jsonify(
+            {
+                "status": "success",
+                "query": query,
+                "mode": mode,
+                "response": response,
+                "scores": scores,
+            }
+        )
+        KNOWLEDGE_REQUESTS.labels(endpoint="/query").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/query").observe(latency)
+
+
+@app.route("/suggest", methods=["GET"])
+def suggest_knowledge():
+    """Endpoint to autocomplete and correct a partially typed query.
+
+    `q` is the text typed so far and `limit` the number of suggestions. The last word is
+    completed by prefix, falling back to fuzzy matches, and earlier words are corrected.
+    """
+    start_time = time.time()
+    try:
+        text = request.args.get("q", "")
+        if not text.strip():
+            return jsonify({"error": "q is required."}), 400
+        try:
+            limit = int(request.args.get("limit", DEFAULT_SUGGESTIONS))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer."}), 400
+        if not 1 <= limit <= MAX_SUGGESTIONS:
+            return jsonify({"error": f"limit must be between 1 and {MAX_SUGGESTIONS}."}), 400
+        suggestions = knowledge.view.suggest(text, limit)
+        result = jsonify({"status": "success", "query": text, "suggestions": suggestions})
+        KNOWLEDGE_REQUESTS.labels(endpoint="/suggest").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        KNOWLEDGE_LATENCY.labels(endpoint="/suggest").observe(latency)
+
+
+if __name__ == "__main__":
+    knowledge.start_merger()
+    data_dir = os.environ.get("KNOWLEDGE_DATA_DIR")
+    if data_dir:
+        knowledge_store = KnowledgeStore(
+            data_dir, fsync=os.environ.get("KNOWLEDGE_WAL_FSYNC", "1") == "1"
+        )
+        restored, replayed = restore_knowledge()
+        print(f"Restored {restored} knowledge items from snapshot, replayed {replayed} from log")
+        start_snapshot_worker(
+            interval=int(os.environ.get("KNOWLEDGE_SNAPSHOT_INTERVAL", "60")),
+            min_records=int(os.environ.get("KNOWLEDGE_SNAPSHOT_RECORDS", "10000")),
+        )
+    app.run(host="0.0.0.0", port=int(os.environ.get("KNOWLEDGE_PORT", "5002")))
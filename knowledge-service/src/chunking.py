@@ -0,0 +1,82 @@
+import re
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Passage size in words, and words shared by consecutive passages of the same field
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 40
+# Joins a document id and a passage number into a unit id; document ids may not contain it
+UNIT_SEPARATOR = "#"
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_RE.split(text.strip()) if sentence]
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Split text into passages of at most `max_tokens` words.
+
+    Passages end on sentence boundaries where possible and start with the trailing
+    sentences of the previous passage that fit in `overlap` words. Sentences longer than a
+    passage (unpunctuated transcripts) are cut into windows that overlap by `overlap` words.
+    """
+    pieces = []
+    for sentence in split_sentences(text):
+        words = sentence.split()
+        step = max(1, max_tokens - overlap)
+        for start in range(0, len(words), step):
+            end = start + max_tokens
+            pieces.append(words[start:end])
+            if end >= len(words):
+                break
+
+    passages = []
+    current, size = [], 0
+    for piece in pieces:
+        if current and size + len(piece) > max_tokens:
+            passages.append(current)
+            carried, carried_size = [], 0
+            for previous in reversed(current):
+                if carried_size + len(previous) > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous)
+            current, size = (
+                (carried, carried_size) if carried_size + len(piece) <= max_tokens else ([], 0)
+            )
+        current.append(piece)
+        size += len(piece)
+    if current:
+        passages.append(current)
+    return [" ".join(word for piece in passage for word in piece) for passage in passages]
+
+
+def id_error(doc_id):
+    """Why `doc_id` cannot identify a document, or None if it can"""
+    if UNIT_SEPARATOR in str(doc_id):
+        return f"Knowledge ids may not contain '{UNIT_SEPARATOR}'."
+    return None
+
+
+def chunk_document(doc_id, document, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Search units of a document as a list of (unit id, unit).
+
+    A document whose top-level text fields all fit in one passage is its own unit. Otherwise
+    every long field is chunked, and each passage becomes a unit "<doc_id>#<n>" holding the
+    passage, the document's short fields (title, tags, ...) and a `parent_id` back-reference.
+    """
+    long_fields = [
+        field
+        for field, value in document.items()
+        if isinstance(value, str) and len(value.split()) > max_tokens
+    ]
+    if not long_fields:
+        return [(doc_id, document)]
+
+    context = {field: value for field, value in document.items() if field not in long_fields}
+    units = []
+    for field in long_fields:
+        for passage in chunk_text(document[field], max_tokens, overlap):
+            unit_id = f"{doc_id}{UNIT_SEPARATOR}{len(units)}"
+            units.append((unit_id, {**context, "id": unit_id, "parent_id": doc_id, field: passage}))
+    return units
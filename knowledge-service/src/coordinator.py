@@ -0,0 +1,265 @@
+"""Knowledge-service coordinator for a sharded corpus.
+
+Run one plain knowledge-service per shard and point KNOWLEDGE_SHARDS at them; the
+coordinator serves the same API on KNOWLEDGE_PORT (5002), so the gateway needs no changes:
+
+    KNOWLEDGE_PORT=5102 python src/app.py &
+    KNOWLEDGE_PORT=5103 python src/app.py &
+    KNOWLEDGE_SHARDS=http://localhost:5102,http://localhost:5103 python src/coordinator.py
+"""
+
+import json
+import os
+import time
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sharding import ShardedKnowledge
+
+app = Flask(__name__)
+CORS(app)
+
+# Define metrics
+COORDINATOR_REQUESTS = Counter(
+    "knowledge_coordinator_requests_total", "Total knowledge coordinator requests", ["endpoint"]
+)
+COORDINATOR_LATENCY = Histogram(
+    "knowledge_coordinator_request_duration_seconds",
+    "Knowledge coordinator request latency",
+    ["endpoint"],
+)
+SHARD_FAILURES = Counter(
+    "knowledge_shard_failures_total",
+    "Shard requests that failed or missed their deadline",
+    ["shard"],
+)
+
+MAX_TOP_K = 100
+DEFAULT_TOP_K = 10
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+# Documents buffered from a bulk stream before they are routed to their shards
+BULK_BATCH_SIZE = int(os.environ.get("KNOWLEDGE_BULK_BATCH_SIZE", "500"))
+MAX_REPORTED_ERRORS = 100
+# Reads return whatever the shards answered within this budget
+QUERY_DEADLINE = float(os.environ.get("KNOWLEDGE_QUERY_DEADLINE_MS", "500")) / 1000
+INGEST_TIMEOUT = float(os.environ.get("KNOWLEDGE_INGEST_TIMEOUT", "30"))
+
+sharded = None
+if os.environ.get("KNOWLEDGE_SHARDS"):
+    sharded = ShardedKnowledge(
+        [shard.strip() for shard in os.environ["KNOWLEDGE_SHARDS"].split(",") if shard.strip()],
+        timeout=QUERY_DEADLINE,
+    )
+
+
+def record_failures(failures):
+    for shard in failures:
+        SHARD_FAILURES.labels(shard=shard).inc()
+
+
+def route_documents(documents, line_numbers, totals, errors):
+    """Ingest a batch across shards, adding to the bulk totals and per-line errors"""
+    results, failures, batches = sharded.ingest(documents, timeout=INGEST_TIMEOUT)
+    record_failures(failures)
+    for result in results.values():
+        totals["ingested"] += result["ingested"]
+        totals["created"] += result.get("created", 0)
+    lines = {id(document): line for document, line in zip(documents, line_numbers)}
+    for shard, error in failures.items():
+        for document in batches[shard]:
+            totals["failed"] += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": lines[id(document)], "error": f"{shard}: {error}"})
+
+
+@app.route("/metrics")
+def metrics():
+    """Expose metrics for Prometheus"""
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+@app.route("/ingest", methods=["POST"])
+def ingest_knowledge():
+    """Endpoint to ingest knowledge data on the shard that owns its id"""
+    start_time = time.time()
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid knowledge data format. Must be a JSON object."}), 400
+        knowledge_id = data.get("id")
+        if not knowledge_id:
+            return jsonify({"error": "Knowledge data must have an 'id' field."}), 400
+        shard = sharded.shard_for(knowledge_id)
+        response = sharded.session.post(f"{shard}/ingest", json=data, timeout=INGEST_TIMEOUT)
+        COORDINATOR_REQUESTS.labels(endpoint="/ingest").inc()
+        return jsonify({**response.json(), "shard": shard}), response.status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/ingest").observe(latency)
+
+
+@app.route("/ingest/bulk", methods=["POST"])
+def ingest_knowledge_bulk():
+    """Endpoint to stream NDJSON documents to their shards in batches"""
+    start_time = time.time()
+    try:
+        totals = {"ingested": 0, "created": 0, "failed": 0}
+        errors = []
+        batch, line_numbers = [], []
+        for line_number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("Invalid knowledge data format. Must be a JSON object.")
+                if not data.get("id"):
+                    raise ValueError("Knowledge data must have an 'id' field.")
+            except ValueError as e:
+                totals["failed"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            batch.append(data)
+            line_numbers.append(line_number)
+            if len(batch) >= BULK_BATCH_SIZE:
+                route_documents(batch, line_numbers, totals, errors)
+                batch, line_numbers = [], []
+        if batch:
+            route_documents(batch, line_numbers, totals, errors)
+
+        duration = time.time() - start_time
+        result = jsonify(
+            {
+                "status": "success" if not totals["failed"] else "partial",
+                **totals,
+                "errors": errors,
+                "duration_seconds": round(duration, 3),
+                "documents_per_second": (
+                    round(totals["ingested"] / duration, 1) if duration > 0 else None
+                ),
+            }
+        )
+        COORDINATOR_REQUESTS.labels(endpoint="/ingest/bulk").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/ingest/bulk").observe(latency)
+
+
+@app.route("/items", methods=["GET"])
+def list_knowledge():
+    """Endpoint to page through knowledge items of all shards in id order"""
+    start_time = time.time()
+    try:
+        try:
+            limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer."}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}."}), 400
+        page = sharded.items(request.args.get("cursor"), limit, request.args.get("fields"))
+        record_failures(failure["shard"] for failure in page["shards"]["failed"])
+        COORDINATOR_REQUESTS.labels(endpoint="/items").inc()
+        return jsonify({"status": "success", **page})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/items").observe(latency)
+
+
+@app.route("/items/<knowledge_id>", methods=["PUT", "DELETE"])
+def forward_knowledge_item(knowledge_id):
+    """Endpoint to create, replace or delete an item on the shard that owns its id"""
+    start_time = time.time()
+    try:
+        shard = sharded.shard_for(knowledge_id)
+        response = sharded.session.request(
+            request.method,
+            f"{shard}/items/{knowledge_id}",
+            json=request.json if request.method == "PUT" else None,
+            timeout=INGEST_TIMEOUT,
+        )
+        COORDINATOR_REQUESTS.labels(endpoint="/items/<id>").inc()
+        return jsonify({**response.json(), "shard": shard}), response.status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/items/<id>").observe(latency)
+
+
+@app.route("/query", methods=["POST"])
+def query_knowledge():
+    """Endpoint to query every shard in parallel and merge the top results.
+
+    `deadline_ms` (default KNOWLEDGE_QUERY_DEADLINE_MS) bounds the wait; shards that miss it
+    are listed under "shards" and the response is marked partial.
+    """
+    start_time = time.time()
+    try:
+        payload = request.json
+        query = payload.get("query")
+        if not query:
+            return jsonify({"error": "Query text is required."}), 400
+        try:
+            top_k = min(int(payload.get("top_k", DEFAULT_TOP_K)), MAX_TOP_K)
+            deadline = float(payload.pop("deadline_ms", QUERY_DEADLINE * 1000)) / 1000
+        except (TypeError, ValueError):
+            return jsonify({"error": "top_k and deadline_ms must be numbers."}), 400
+        if top_k < 1:
+            return jsonify({"error": "top_k must be at least 1."}), 400
+        merged = sharded.query({**payload, "top_k": top_k}, top_k, timeout=deadline)
+        record_failures(failure["shard"] for failure in merged["shards"]["failed"])
+        if not merged["shards"]["responded"]:
+            return jsonify({"error": "No knowledge shard responded in time.", **merged}), 504
+        result = jsonify(
+            {"status": "success", "query": query, "mode": payload.get("mode", "keyword"), **merged}
+        )
+        COORDINATOR_REQUESTS.labels(endpoint="/query").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/query").observe(latency)
+
+
+@app.route("/suggest", methods=["GET"])
+def suggest_knowledge():
+    """Endpoint to merge the suggestions of every shard for a partially typed query"""
+    start_time = time.time()
+    try:
+        text = request.args.get("q", "")
+        if not text.strip():
+            return jsonify({"error": "q is required."}), 400
+        try:
+            limit = int(request.args.get("limit", DEFAULT_SUGGESTIONS))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer."}), 400
+        if not 1 <= limit <= MAX_SUGGESTIONS:
+            return jsonify({"error": f"limit must be between 1 and {MAX_SUGGESTIONS}."}), 400
+        merged = sharded.suggest(text, limit)
+        record_failures(failure["shard"] for failure in merged["shards"]["failed"])
+        COORDINATOR_REQUESTS.labels(endpoint="/suggest").inc()
+        return jsonify({"status": "success", "query": text, **merged})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        COORDINATOR_LATENCY.labels(endpoint="/suggest").observe(latency)
+
+
+if __name__ == "__main__":
+    if sharded is None:
+        raise SystemExit("KNOWLEDGE_SHARDS must list the shard URLs, separated by commas.")
+    app.run(host="0.0.0.0", port=int(os.environ.get("KNOWLEDGE_PORT", "5002")))
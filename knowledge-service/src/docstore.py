@@ -0,0 +1,148 @@
+import json
+import threading
+import zlib
+from array import array
+
+try:
+    import zstandard
+except ImportError:  # Only needed for Codec("zstd")
+    zstandard = None
+
+# Serialized documents sampled to build the shared compression dictionary
+DICTIONARY_SAMPLES = 1000
+DICTIONARY_SIZE = 32768
+
+PLAIN = 0
+WITH_DICTIONARY = 1
+
+
+class Codec:
+    """Compresses JSON documents with zlib or zstd and a shared preset dictionary.
+
+    Small documents barely compress on their own, but mostly repeat the same field names
+    and common values. The first DICTIONARY_SAMPLES documents are compressed plainly and
+    sampled; after that a raw-content dictionary built from the samples primes every
+    compression. A leading flag byte tells decode() which way a blob was written, so
+    blobs stay valid, and can be copied between stores sharing the codec, forever.
+    """
+
+    def __init__(self, method="zlib", level=6):
+        if method == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        if method not in ("zlib", "zstd"):
+            raise ValueError(f"Unknown compression method {method!r}")
+        self.method = method
+        self.level = level
+        self._samples = []
+        self._dictionary = None
+        self._zstd_dictionary = None
+        self._lock = threading.Lock()
+
+    def _build_dictionary(self):
+        # zlib matches best against the end of the dictionary, so keep the latest samples
+        dictionary = b"".join(self._samples)[-DICTIONARY_SIZE:]
+        if self.method == "zstd":
+            self._zstd_dictionary = zstandard.ZstdCompressionDict(
+                dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT
+            )
+        self._dictionary = dictionary
+        self._samples = None
+
+    def encode(self, document):
+        raw = json.dumps(document, separators=(",", ":")).encode()
+        if self._dictionary is None:
+            with self._lock:
+                if self._samples is not None:
+                    self._samples.append(raw)
+                    if len(self._samples) >= DICTIONARY_SAMPLES:
+                        self._build_dictionary()
+        if self._dictionary is None:
+            return bytes([PLAIN]) + self._compress(raw, None)
+        return bytes([WITH_DICTIONARY]) + self._compress(raw, self._dictionary)
+
+    def _compress(self, raw, dictionary):
+        if self.method == "zstd":
+            dict_data = self._zstd_dictionary if dictionary is not None else None
+            return zstandard.ZstdCompressor(level=self.level, dict_data=dict_data).compress(raw)
+        if dictionary is None:
+            return zlib.compress(raw, self.level)
+        compressor = zlib.compressobj(self.level, zdict=dictionary)
+        return compressor.compress(raw) + compressor.flush()
+
+    def decode(self, blob):
+        flag, payload = blob[0], blob[1:]
+        if self.method == "zstd":
+            dict_data = self._zstd_dictionary if flag == WITH_DICTIONARY else None
+            raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+        elif flag == WITH_DICTIONARY:
+            raw = zlib.decompressobj(zdict=self._dictionary).decompress(payload)
+        else:
+            raw = zlib.decompress(payload)
+        return json.loads(raw)
+
+
+class DocumentStore:
+    """Immutable id -> document mapping holding compressed blobs in one buffer.
+
+    Blobs are concatenated into a single bytes object with an array of offsets, so a
+    document costs its compressed size, 8 bytes of offset and an id entry, instead of a
+    tree of Python dicts, lists and strings. Documents are decoded on access.
+    """
+
+    def __init__(self, codec, ids, blobs):
+        self.codec = codec
+        self._rows = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._offsets = array("Q", [0])
+        position = 0
+        for blob in blobs:
+            position += len(blob)
+            self._offsets.append(position)
+        self._data = b"".join(blobs)
+
+    @classmethod
+    def from_documents(cls, codec, documents):
+        """Build from (id, document) pairs"""
+        ids, blobs = [], []
+        for doc_id, document in documents:
+            ids.append(doc_id)
+            blobs.append(codec.encode(document))
+        return cls(codec, ids, blobs)
+
+    @classmethod
+    def from_stores(cls, codec, parts):
+        """Build from (store, ids) pairs, copying the compressed blobs as they are"""
+        ids, blobs = [], []
+        for store, doc_ids in parts:
+            for doc_id in doc_ids:
+                ids.append(doc_id)
+                blobs.append(store.blob(doc_id))
+        return cls(codec, ids, blobs)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def blob(self, doc_id):
+        row = self._rows[doc_id]
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._data[start:end]
+
+    def __getitem__(self, doc_id):
+        return self.codec.decode(self.blob(doc_id))
+
+    def get(self, doc_id, default=None):
+        return self[doc_id] if doc_id in self._rows else default
+
+    def items(self):
+        for doc_id in self._rows:
+            yield doc_id, self[doc_id]
+
+    @property
+    def nbytes(self):
+        """Compressed bytes plus offsets, excluding the id map"""
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
@@ -0,0 +1,264 @@
+import heapq
+import math
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+# BM25 parameters and per-field weights; fields not listed have weight 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_FIELD_BOOSTS = {"title": 3.0, "tags": 2.0, "keywords": 2.0}
+
+
+def tokenize(text):
+    """Lowercase word tokens of a piece of text"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def iter_fields(document, prefix=""):
+    """Yield (field path, text) for every string or number value in a nested document.
+
+    Keys are used only to name the field, so they are never matched themselves. Items of a
+    list share the field path of the list.
+    """
+    for key, value in document.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        yield from _iter_value(path, value)
+
+
+def _iter_value(path, value):
+    if isinstance(value, dict):
+        yield from iter_fields(value, path)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_value(path, item)
+    elif isinstance(value, str):
+        yield path, value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, str(value)
+
+
+def parse_query(query):
+    """Split a query into loose terms and "quoted phrases" (each a list of terms)"""
+    phrases = [tokenize(phrase) for phrase in PHRASE_RE.findall(query)]
+    terms = tokenize(PHRASE_RE.sub(" ", query))
+    return terms, [phrase for phrase in phrases if phrase]
+
+
+class CorpusStats:
+    """Collection-wide BM25 statistics summed over one or more indexes.
+
+    Scoring every segment of a segmented index against the same statistics keeps scores
+    comparable across segments.
+    """
+
+    def __init__(self, indexes):
+        self._indexes = list(indexes)
+        self.doc_count = sum(len(index) for index in self._indexes)
+        self._field_totals = {}
+        for index in self._indexes:
+            for field, total in index._field_totals.items():
+                self._field_totals[field] = self._field_totals.get(field, 0) + total
+
+    def document_frequency(self, term):
+        return sum(len(index.postings(term)) for index in self._indexes)
+
+    def average_length(self, field):
+        return self._field_totals[field] / self.doc_count
+
+
+class InvertedIndex:
+    """Positional inverted index over the text fields of JSON documents.
+
+    Postings map term -> {doc_id: {field: [positions]}}. A forward map of each document's
+    terms lets re-ingesting an id remove its old postings without a scan.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._doc_terms = {}
+        self._field_lengths = {}
+        self._field_totals = {}
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id, document):
+        """Index a document, replacing any previous version with the same id"""
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+
+        field_positions = {}
+        lengths = {}
+        next_position = {}
+        for field, text in iter_fields(document):
+            tokens = tokenize(text)
+            # Leave a gap between separate values so phrases never span them
+            offset = next_position.get(field, 0)
+            for position, term in enumerate(tokens, start=offset):
+                field_positions.setdefault(term, {}).setdefault(field, []).append(position)
+            next_position[field] = offset + len(tokens) + 1
+            lengths[field] = lengths.get(field, 0) + len(tokens)
+
+        for term, fields in field_positions.items():
+            self._postings.setdefault(term, {})[doc_id] = fields
+        self._doc_terms[doc_id] = tuple(field_positions)
+        self._field_lengths[doc_id] = lengths
+        for field, length in lengths.items():
+            self._field_totals[field] = self._field_totals.get(field, 0) + length
+
+    def remove(self, doc_id):
+        """Drop a document's postings; returns False if it was not indexed"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        for field, length in self._field_lengths.pop(doc_id).items():
+            self._field_totals[field] -= length
+        return True
+
+    def postings(self, term):
+        return self._postings.get(term, {})
+
+    def document_frequencies(self):
+        """term -> number of documents containing it"""
+        return {term: len(postings) for term, postings in self._postings.items()}
+
+    def update_from(self, other, exclude=()):
+        """Copy another index's documents, except ids in `exclude`, without re-tokenizing.
+
+        Per-document position lists are shared, not copied; neither index mutates them.
+        """
+        for doc_id, terms in other._doc_terms.items():
+            if doc_id in exclude:
+                continue
+            if doc_id in self._doc_terms:
+                self.remove(doc_id)
+            for term in terms:
+                self._postings.setdefault(term, {})[doc_id] = other._postings[term][doc_id]
+            self._doc_terms[doc_id] = terms
+            lengths = other._field_lengths[doc_id]
+            self._field_lengths[doc_id] = lengths
+            for field, length in lengths.items():
+                self._field_totals[field] = self._field_totals.get(field, 0) + length
+
+    def search(self, query):
+        """Ids of documents containing every term and "quoted phrase" of the query.
+
+        Posting lists are intersected smallest first, so the cost is bounded by the rarest
+        term rather than the size of the store. Results keep the order in which documents
+        were indexed.
+        """
+        terms, phrases = parse_query(query)
+        required = set(terms)
+        for phrase in phrases:
+            required.update(phrase)
+        if not required:
+            return []
+
+        lists = sorted((self.postings(term) for term in required), key=len)
+        candidates = list(lists[0])
+        for postings in lists[1:]:
+            if not candidates:
+                break
+            candidates = [doc_id for doc_id in candidates if doc_id in postings]
+
+        for phrase in phrases:
+            candidates = [doc_id for doc_id in candidates if self._has_phrase(doc_id, phrase)]
+        return candidates
+
+    def _has_phrase(self, doc_id, phrase):
+        first = self._postings[phrase[0]][doc_id]
+        rest = [self._postings[term][doc_id] for term in phrase[1:]]
+        for field, starts in first.items():
+            following = [set(fields.get(field, ())) for fields in rest]
+            if any(
+                all(start + i + 1 in positions for i, positions in enumerate(following))
+                for start in starts
+            ):
+                return True
+        return False
+
+    def search_ranked(self, query, top_k=10, boosts=None, stats=None, exclude=(), floor=0.0):
+        """The `top_k` best (doc_id, score) pairs for a query under BM25F.
+
+        Loose terms are optional and only affect the score; "quoted phrases" must match.
+        Terms are visited from the highest to the lowest score upper bound, and the scan
+        stops as soon as a document that only contains the remaining terms could not beat
+        the current k-th best score, or `floor` when the caller already holds k hits that good.
+        `stats` defaults to this index's own statistics; documents in `exclude` are skipped.
+        """
+        terms, phrases = parse_query(query)
+        scoring_terms = set(terms)
+        for phrase in phrases:
+            scoring_terms.update(phrase)
+        if not scoring_terms or top_k <= 0:
+            return []
+
+        boosts = DEFAULT_FIELD_BOOSTS if boosts is None else boosts
+        stats = CorpusStats([self]) if stats is None else stats
+        idf = {term: self._idf(term, stats) for term in scoring_terms if self.postings(term)}
+        if phrases:
+            # Phrase matches are few; score them all
+            candidates = self.search(" ".join(f'"{" ".join(phrase)}"' for phrase in phrases))
+            return heapq.nlargest(
+                top_k,
+                (
+                    (doc_id, self._score(doc_id, idf, boosts, stats))
+                    for doc_id in candidates
+                    if doc_id not in exclude
+                ),
+                key=lambda hit: hit[1],
+            )
+
+        # A term adds at most idf * (k1 + 1) to a document's score
+        ordered = sorted(idf, key=idf.get, reverse=True)
+        remaining_bound = [0.0] * (len(ordered) + 1)
+        for i in range(len(ordered) - 1, -1, -1):
+            remaining_bound[i] = remaining_bound[i + 1] + idf[ordered[i]] * (BM25_K1 + 1)
+
+        heap = []
+        seen = set()
+        for i, term in enumerate(ordered):
+            # Documents first seen from here on contain none of the earlier terms
+            if remaining_bound[i] <= floor:
+                break
+            if len(heap) == top_k and remaining_bound[i] <= heap[0][0]:
+                break
+            for doc_id in self._postings[term]:
+                if doc_id in seen or doc_id in exclude:
+                    continue
+                seen.add(doc_id)
+                score = self._score(doc_id, idf, boosts, stats)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, doc_id))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, doc_id))
+        return [(doc_id, score) for score, doc_id in sorted(heap, reverse=True)]
+
+    def _idf(self, term, stats):
+        df = stats.document_frequency(term)
+        return math.log(1.0 + (stats.doc_count - df + 0.5) / (df + 0.5))
+
+    def _score(self, doc_id, idf, boosts, stats):
+        lengths = self._field_lengths[doc_id]
+        score = 0.0
+        for term, term_idf in idf.items():
+            fields = self._postings[term].get(doc_id)
+            if fields is None:
+                continue
+            weighted_tf = 0.0
+            for field, positions in fields.items():
+                average = stats.average_length(field)
+                norm = 1.0 - BM25_B + BM25_B * lengths[field] / average
+                weighted_tf += boosts.get(field, 1.0) * len(positions) / norm
+            score += term_idf * weighted_tf * (BM25_K1 + 1) / (BM25_K1 + weighted_tf)
+        return score
@@ -0,0 +1,440 @@
+import heapq
+import threading
+from bisect import bisect_right
+from functools import cached_property
+
+import numpy as np
+from docstore import Codec, DocumentStore
+from index import CorpusStats, InvertedIndex
+from suggest import TermIndex, suggest
+from vectors import VectorIndex
+
+# A run of segments is merged into the segment before it once the run holds at least as
+# many live documents, which keeps O(log n) segments
+MERGE_RATIO = 1.0
+# A segment is rewritten on its own once more than this share of it is deleted
+MAX_DELETED_RATIO = 0.2
+
+
+class Segment:
+    """Immutable batch of documents with its own keyword index, vectors and sorted ids.
+
+    Documents are stored whole, but indexed as search units: the document itself, or the
+    passages it was chunked into. Only chunked documents appear in `units_of`, and only
+    their passages in `passages`. Both stores hold compressed blobs.
+    """
+
+    def __init__(self, documents, passages, units_of, index, vectors):
+        self.documents = documents
+        self.passages = passages
+        self.units_of = units_of
+        self.parents = {
+            unit_id: doc_id for doc_id, unit_ids in units_of.items() for unit_id in unit_ids
+        }
+        self.index = index
+        self.vectors = vectors
+        self.ids = sorted(documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def unit_ids(self, doc_ids):
+        return [unit_id for doc_id in doc_ids for unit_id in self.units_of.get(doc_id, (doc_id,))]
+
+    def has_unit(self, unit_id):
+        return unit_id in self.parents or unit_id in self.documents
+
+    def parent_of(self, unit_id):
+        return self.parents.get(unit_id, unit_id)
+
+    def unit(self, unit_id):
+        if unit_id in self.parents:
+            return self.passages[unit_id]
+        return self.documents[unit_id]
+
+    @cached_property
+    def terms(self):
+        """Trigram-indexed vocabulary for suggestions, built on first use"""
+        return TermIndex(self.index.document_frequencies())
+
+    @classmethod
+    def build(cls, codec, documents, units, vectors, dim, ivf_threshold=50000):
+        """Index `documents` (id -> document) through their `units` (id -> [(unit id, unit)]).
+
+        `vectors` has one row per unit, in the order the units are listed.
+        """
+        index = InvertedIndex()
+        unit_ids = []
+        for parts in units.values():
+            for unit_id, unit in parts:
+                index.add(unit_id, unit)
+                unit_ids.append(unit_id)
+        vector_index = VectorIndex(dim, capacity=max(1, len(unit_ids)), ivf_threshold=ivf_threshold)
+        vector_index.add_batch(unit_ids, vectors)
+
+        units_of = {
+            doc_id: tuple(unit_id for unit_id, _ in parts)
+            for doc_id, parts in units.items()
+            if parts[0][0] != doc_id
+        }
+        passages = DocumentStore.from_documents(
+            codec, (part for doc_id in units_of for part in units[doc_id])
+        )
+        return cls(
+            DocumentStore.from_documents(codec, documents.items()),
+            passages,
+            units_of,
+            index,
+            vector_index,
+        )
+
+    @classmethod
+    def merge(cls, codec, segments, deleted, dim, ivf_threshold=50000):
+        """Combine segments (oldest first), dropping ids in the matching `deleted` sets.
+
+        Postings and compressed blobs are copied as they are, so nothing is re-tokenized
+        or recompressed.
+        """
+        document_parts = []
+        passage_parts = []
+        units_of = {}
+        index = InvertedIndex()
+        blocks = []
+        for segment, dead in zip(segments, deleted):
+            live = [doc_id for doc_id in segment.documents if doc_id not in dead]
+            chunked = [doc_id for doc_id in live if doc_id in segment.units_of]
+            units_of.update((doc_id, segment.units_of[doc_id]) for doc_id in chunked)
+            document_parts.append((segment.documents, live))
+            passage_parts.append((segment.passages, segment.unit_ids(chunked)))
+            index.update_from(segment.index, exclude=DeadUnits(segment, dead))
+            live_units = segment.unit_ids(live)
+            blocks.append((live_units, segment.vectors.vectors(live_units)))
+        total = sum(len(unit_ids) for unit_ids, _ in blocks)
+        vector_index = VectorIndex(dim, capacity=max(1, total), ivf_threshold=ivf_threshold)
+        for unit_ids, vectors in blocks:
+            vector_index.add_batch(unit_ids, vectors)
+        return cls(
+            DocumentStore.from_stores(codec, document_parts),
+            DocumentStore.from_stores(codec, passage_parts),
+            units_of,
+            index,
+            vector_index,
+        )
+
+
+class DeadUnits:
+    """Container of the units of a segment whose documents are deleted"""
+
+    def __init__(self, segment, dead):
+        self._segment = segment
+        self._parents = segment.parents
+        self._dead = dead
+
+    def __contains__(self, unit_id):
+        return bool(self._dead) and self._parents.get(unit_id, unit_id) in self._dead
+
+    @cached_property
+    def count(self):
+        return len(self._segment.unit_ids(self._dead))
+
+
+class IndexView:
+    """Immutable snapshot of a segmented index that readers use without locking.
+
+    `deleted[i]` holds the ids of `segments[i]` that were overwritten by a newer segment,
+    so every id is live in at most one segment. BM25 statistics still count deleted
+    documents until their segment is merged. Searches return unit ids; `passage()` and
+    `parent_of()` resolve them.
+    """
+
+    def __init__(self, segments=(), deleted=()):
+        self.segments = tuple(segments)
+        self.deleted = tuple(deleted)
+        self._stats = None
+
+    def __len__(self):
+        return sum(len(segment) - len(dead) for segment, dead in zip(self.segments, self.deleted))
+
+    def __contains__(self, doc_id):
+        return self._locate(doc_id) is not None
+
+    def _locate(self, doc_id):
+        for segment, dead in zip(reversed(self.segments), reversed(self.deleted)):
+            if doc_id in segment.documents:
+                return None if doc_id in dead else segment
+        return None
+
+    def _locate_unit(self, unit_id):
+        for segment, dead in zip(reversed(self.segments), reversed(self.deleted)):
+            if segment.has_unit(unit_id) and segment.parent_of(unit_id) not in dead:
+                return segment
+        return None
+
+    def get(self, doc_id, default=None):
+        segment = self._locate(doc_id)
+        return default if segment is None else segment.documents[doc_id]
+
+    def __getitem__(self, doc_id):
+        segment = self._locate(doc_id)
+        if segment is None:
+            raise KeyError(doc_id)
+        return segment.documents[doc_id]
+
+    def passage(self, unit_id):
+        """The search unit: a whole document, or one passage with a `parent_id`"""
+        return self._locate_unit(unit_id).unit(unit_id)
+
+    def parent_of(self, unit_id):
+        return self._locate_unit(unit_id).parent_of(unit_id)
+
+    def items(self):
+        """Live (id, document) pairs, segment by segment"""
+        for segment, dead in zip(self.segments, self.deleted):
+            for doc_id, document in segment.documents.items():
+                if doc_id not in dead:
+                    yield doc_id, document
+
+    def live_vectors(self):
+        """Live document ids in the order of items(), and their unit vectors as one matrix"""
+        ids = []
+        blocks = []
+        for segment, dead in zip(self.segments, self.deleted):
+            live = [doc_id for doc_id in segment.documents if doc_id not in dead]
+            ids.extend(live)
+            blocks.append(segment.vectors.vectors(segment.unit_ids(live)))
+        if not blocks:
+            return ids, None
+        return ids, np.concatenate(blocks)
+
+    def ids_after(self, cursor=None, limit=50):
+        """Up to `limit` live ids in sorted order, strictly after `cursor`"""
+        runs = [
+            _live_ids_after(segment, dead, cursor)
+            for segment, dead in zip(self.segments, self.deleted)
+        ]
+        ids = []
+        for doc_id in heapq.merge(*runs):
+            if len(ids) == limit:
+                break
+            ids.append(doc_id)
+        return ids
+
+    @property
+    def semantic(self):
+        """VectorIndex-like search() and similarity() over the view, for hybrid_search"""
+        return _ViewVectors(self)
+
+    @property
+    def tombstones(self):
+        """Deleted or overwritten documents still held by segments"""
+        return sum(len(dead) for dead in self.deleted)
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            self._stats = CorpusStats(segment.index for segment in self.segments)
+        return self._stats
+
+    def search_ranked(self, query, top_k=10, boosts=None):
+        """BM25F top-k over all segments, scored against collection-wide statistics"""
+        if not self.segments:
+            return []
+        hits = []
+        floor = 0.0
+        # Largest segments first; the k-th best score so far lets the rest stop early
+        for segment, dead in sorted(
+            zip(self.segments, self.deleted), key=lambda pair: len(pair[0]), reverse=True
+        ):
+            exclude = DeadUnits(segment, dead)
+            hits.extend(
+                segment.index.search_ranked(query, top_k, boosts, self.stats, exclude, floor)
+            )
+            hits = heapq.nlargest(top_k, hits, key=lambda hit: hit[1])
+            if len(hits) == top_k:
+                floor = hits[-1][1]
+        return hits
+
+    def suggest(self, text, limit=10):
+        """Completions and corrections of a typed query from the indexed vocabulary.
+
+        Frequencies count deleted documents until their segment is merged away.
+        """
+        return suggest((segment.terms for segment in self.segments), text, limit)
+
+    def search_vectors(self, query_vector, top_k=10):
+        """Nearest live units to a normalized vector across all segments"""
+        hits = []
+        for segment, dead in zip(self.segments, self.deleted):
+            exclude = DeadUnits(segment, dead)
+            # Over-fetch so deleted rows cannot crowd out live ones
+            for unit_id, score in segment.vectors.search(query_vector, top_k + exclude.count):
+                if unit_id not in exclude:
+                    hits.append((unit_id, score))
+        return heapq.nlargest(top_k, hits, key=lambda hit: hit[1])
+
+    def similarity(self, query_vector, unit_ids):
+        return np.array(
+            [
+                self._locate_unit(unit_id).vectors.similarity(query_vector, [unit_id])[0]
+                for unit_id in unit_ids
+            ],
+            dtype=np.float32,
+        )
+
+
+def _live_ids_after(segment, dead, cursor):
+    start = 0 if cursor is None else bisect_right(segment.ids, cursor)
+    for doc_id in segment.ids[start:]:
+        if doc_id not in dead:
+            yield doc_id
+
+
+class _ViewVectors:
+    """VectorIndex-shaped adapter over a view, for hybrid_search"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def search(self, query_vector, top_k=10):
+        return self._view.search_vectors(query_vector, top_k)
+
+    def similarity(self, query_vector, doc_ids):
+        return self._view.similarity(query_vector, doc_ids)
+
+
+class SegmentedIndex:
+    """Copy-on-write segmented knowledge index.
+
+    Each write builds a new segment and publishes a new IndexView with one attribute
+    assignment; readers take `view` once per request and never lock or observe a partial
+    write. Writers serialize on an internal lock, held only to compute tombstones and swap
+    the view. A background merger combines small segments off the write path.
+    """
+
+    def __init__(self, dim, ivf_threshold=50000, codec=None):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.codec = codec or Codec()
+        self.view = IndexView()
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merge_wanted = threading.Event()
+
+    def publish(self, documents, units, vectors):
+        """Add or replace documents (id -> document); returns how many ids were new.
+
+        `units` and `vectors` are the documents' search units and their vectors, as taken
+        by Segment.build().
+        """
+        segment = Segment.build(self.codec, documents, units, vectors, self.dim, self.ivf_threshold)
+        with self._lock:
+            view = self.view
+            deleted, replaced = self._tombstones(view, documents)
+            self.view = IndexView(view.segments + (segment,), deleted + [frozenset()])
+        self._merge_wanted.set()
+        return len(documents) - replaced
+
+    def delete(self, doc_ids):
+        """Tombstone documents; returns how many of the ids were live.
+
+        Their postings, vectors and blobs stay in place, skipped by every read, until the
+        merger rewrites the segment.
+        """
+        with self._lock:
+            view = self.view
+            deleted, removed = self._tombstones(view, doc_ids)
+            if removed:
+                self.view = IndexView(view.segments, deleted)
+        if removed:
+            self._merge_wanted.set()
+        return removed
+
+    @staticmethod
+    def _tombstones(view, doc_ids):
+        """Deleted sets of `view` with the live copies of `doc_ids` added, and their count"""
+        added = {}
+        for doc_id in doc_ids:
+            for i in range(len(view.segments) - 1, -1, -1):
+                if doc_id in view.segments[i].documents:
+                    if doc_id not in view.deleted[i]:
+                        added.setdefault(i, set()).add(doc_id)
+                    break
+        deleted = list(view.deleted)
+        for i, doc_ids in added.items():
+            deleted[i] = deleted[i] | doc_ids
+        return deleted, sum(len(doc_ids) for doc_ids in added.values())
+
+    def _pick_merge(self, view):
+        """Slice of segments to merge next, or None"""
+        sizes = [len(segment) - len(dead) for segment, dead in zip(view.segments, view.deleted)]
+        for i, (segment, dead) in enumerate(zip(view.segments, view.deleted)):
+            if len(dead) > MAX_DELETED_RATIO * len(segment):
+                return i, i + 1
+        # Newest runs first: they are the smallest and cheapest to merge
+        for end in range(len(sizes), 1, -1):
+            start = end - 1
+            total = sizes[start]
+            while start > 0 and sizes[start - 1] <= MERGE_RATIO * total:
+                start -= 1
+                total += sizes[start]
+            if end - start > 1:
+                return start, end
+        return None
+
+    def merge_once(self):
+        """Run one merge step; returns False when the policy finds nothing to merge"""
+        with self._merge_lock:
+            view = self.view
+            picked = self._pick_merge(view)
+            if picked is None:
+                return False
+            start, end = picked
+            merged = Segment.merge(
+                self.codec,
+                view.segments[start:end],
+                view.deleted[start:end],
+                self.dim,
+                self.ivf_threshold,
+            )
+            # Build the vocabulary here rather than in the first request to /suggest
+            merged.terms
+            with self._lock:
+                # Writers only append, so the merged segments are still at start:end.
+                # Ids overwritten while merging become tombstones of the merged segment.
+                current = self.view
+                dead = frozenset()
+                for before, after in zip(view.deleted[start:end], current.deleted[start:end]):
+                    dead |= after - before
+                # A fully overwritten run leaves nothing behind
+                segments, deleted = ((merged,), (dead,)) if len(merged) else ((), ())
+                self.view = IndexView(
+                    current.segments[:start] + segments + current.segments[end:],
+                    current.deleted[:start] + deleted + current.deleted[end:],
+                )
+            return True
+
+    def merge(self):
+        """Merge until the policy is satisfied"""
+        while self.merge_once():
+            pass
+
+    def start_merger(self):
+        """Merge in a daemon thread whenever a write publishes a new segment.
+
+        Returns an Event that stops the merger when set.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                self._merge_wanted.wait(1.0)
+                if not self._merge_wanted.is_set():
+                    continue
+                self._merge_wanted.clear()
+                try:
+                    self.merge()
+                except Exception as e:
+                    print(f"Error merging knowledge segments: {e}")
+
+        threading.Thread(target=run, name="knowledge-merger", daemon=True).start()
+        return stop
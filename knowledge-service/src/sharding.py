@@ -0,0 +1,171 @@
+import hashlib
+import heapq
+import json
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+# Virtual nodes per shard; more points even out the share of ids each shard owns
+RING_REPLICAS = 64
+
+
+def _ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping document ids to shard URLs.
+
+    Adding or removing a shard only moves the ids on its arcs of the ring, about 1/n of
+    the corpus, instead of reshuffling everything the way `hash(id) % n` would.
+    """
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(nodes)
+        points = sorted(
+            (_ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key):
+        i = bisect_right(self._hashes, _ring_hash(str(key))) % len(self._hashes)
+        return self._owners[i]
+
+
+class ShardedKnowledge:
+    """Routes writes to the shard owning each id and scatters reads to every shard.
+
+    Each shard is a plain knowledge-service. Requests to shards run in parallel on a
+    shared thread pool and are bounded by a deadline; shards that fail or miss it are
+    reported, and the answer is built from the shards that did respond.
+    """
+
+    def __init__(self, shards, timeout=0.5, session=None):
+        self.ring = HashRing(shards)
+        self.shards = self.ring.nodes
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._pool = ThreadPoolExecutor(
+            max_workers=4 * len(self.shards), thread_name_prefix="knowledge-shard"
+        )
+
+    def shard_for(self, doc_id):
+        return self.ring.node_for(doc_id)
+
+    def _scatter(self, calls, timeout):
+        """Run {shard: (method, path, kwargs)} in parallel.
+
+        Returns ({shard: response json}, {shard: error message}).
+        """
+        deadline = time.monotonic() + timeout
+
+        def call(shard, method, path, kwargs):
+            response = self.session.request(method, f"{shard}{path}", timeout=timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+        futures = {
+            self._pool.submit(call, shard, method, path, kwargs): shard
+            for shard, (method, path, kwargs) in calls.items()
+        }
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        results, failures = {}, {}
+        for future, shard in futures.items():
+            if future not in done:
+                future.cancel()
+                failures[shard] = "deadline exceeded"
+            elif future.exception() is not None:
+                failures[shard] = str(future.exception())
+            else:
+                results[shard] = future.result()
+        return results, failures
+
+    @staticmethod
+    def _summary(calls, failures):
+        return {
+            "total": len(calls),
+            "responded": len(calls) - len(failures),
+            "failed": [{"shard": shard, "error": error} for shard, error in failures.items()],
+        }
+
+    def query(self, payload, top_k, timeout=None):
+        """Ask every shard for its top_k and merge the hits by score"""
+        calls = {shard: ("POST", "/query", {"json": payload}) for shard in self.shards}
+        results, failures = self._scatter(calls, timeout or self.timeout)
+        hits = []
+        for result in results.values():
+            hits.extend(zip(result.get("scores", []), result.get("response", [])))
+        best = heapq.nlargest(top_k, hits, key=lambda hit: hit[0])
+        return {
+            "response": [item for _, item in best],
+            "scores": [score for score, _ in best],
+            "partial": bool(failures),
+            "shards": self._summary(calls, failures),
+        }
+
+    def suggest(self, text, limit, timeout=None):
+        """Merge each shard's suggestions, adding up the frequencies of identical ones"""
+        params = {"q": text, "limit": limit}
+        calls = {shard: ("GET", "/suggest", {"params": params}) for shard in self.shards}
+        results, failures = self._scatter(calls, timeout or self.timeout)
+        merged = {}
+        for result in results.values():
+            for suggestion in result["suggestions"]:
+                known = merged.setdefault(suggestion["text"], {**suggestion, "frequency": 0})
+                known["frequency"] += suggestion["frequency"]
+        ranked = sorted(merged.values(), key=lambda s: (s["distance"], -s["frequency"], s["text"]))
+        return {
+            "suggestions": ranked[:limit],
+            "partial": bool(failures),
+            "shards": self._summary(calls, failures),
+        }
+
+    def ingest(self, documents, timeout=None):
+        """Send each document to its owning shard, one NDJSON bulk request per shard.
+
+        Returns ({shard: bulk summary}, {shard: error message}, {shard: documents}).
+        """
+        batches = {}
+        for document in documents:
+            batches.setdefault(self.shard_for(document["id"]), []).append(document)
+        calls = {
+            shard: (
+                "POST",
+                "/ingest/bulk",
+                {
+                    "data": "\n".join(json.dumps(document) for document in batch).encode(),
+                    "headers": {"Content-Type": "application/x-ndjson"},
+                },
+            )
+            for shard, batch in batches.items()
+        }
+        results, failures = self._scatter(calls, timeout or self.timeout)
+        return results, failures, batches
+
+    def items(self, cursor, limit, fields=None, timeout=None):
+        """Merge each shard's next page into one page of ids in sorted order"""
+        params = {"limit": limit}
+        if cursor is not None:
+            params["cursor"] = cursor
+        if fields:
+            params["fields"] = fields
+        calls = {shard: ("GET", "/items", {"params": params}) for shard in self.shards}
+        results, failures = self._scatter(calls, timeout or self.timeout)
+        merged = heapq.merge(
+            *(result["items"] for result in results.values()), key=lambda item: str(item["id"])
+        )
+        items = [item for _, item in zip(range(limit + 1), merged)]
+        more = len(items) > limit or any(r.get("next_cursor") for r in results.values())
+        items = items[:limit]
+        return {
+            "items": items,
+            "next_cursor": str(items[-1]["id"]) if items and more else None,
+            "total": sum(result["total"] for result in results.values()),
+            "partial": bool(failures),
+            "shards": self._summary(calls, failures),
+        }
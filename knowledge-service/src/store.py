@@ -0,0 +1,191 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+WAL_RECORD = struct.Struct("<QII")  # lsn, payload length, crc32 of payload
+SNAPSHOT_MAGIC = b"KNOWSNP2"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQQ")  # magic, lsn, documents, vector rows, vector dim
+SNAPSHOT_FILE = "snapshot.bin"
+
+
+def _wal_name(first_lsn):
+    return f"wal-{first_lsn:020d}.log"
+
+
+class Snapshot:
+    """Documents (in snapshot order) and their vectors as of log sequence number `lsn`"""
+
+    def __init__(self, lsn=0, documents=None, vectors=None):
+        self.lsn = lsn
+        self.documents = documents if documents is not None else {}
+        self.vectors = vectors
+
+
+class KnowledgeStore:
+    """Write-ahead log plus compacted binary snapshots for the knowledge service.
+
+    Every change is appended to the current log segment as a length-prefixed, checksummed
+    JSON record before it is applied in memory. A snapshot rotates the log, writes all
+    documents and their vectors as of that point to a temporary file and renames it into
+    place; segments it covers are then deleted, so startup only replays the log tail.
+
+    Snapshot layout: a 40-byte header, `count + 1` uint64 offsets into the document area,
+    `rows * dim` float32 vectors, then the JSON documents back to back. Vector rows belong
+    to the documents' search units, so there can be more rows than documents.
+    """
+
+    def __init__(self, data_dir, fsync=True):
+        self.data_dir = data_dir
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._wal = None
+        self._next_lsn = 1
+        self.records_since_snapshot = 0
+        os.makedirs(data_dir, exist_ok=True)
+
+    def _segments(self):
+        names = sorted(
+            name
+            for name in os.listdir(self.data_dir)
+            if name.startswith("wal-") and name.endswith(".log")
+        )
+        return [(int(name[4:-4]), os.path.join(self.data_dir, name)) for name in names]
+
+    def recover(self):
+        """Load the latest snapshot and the log records written after it.
+
+        Returns (snapshot, tail) where tail is a list of records in log order. A torn record
+        at the end of a segment (from a crash mid-write) ends that segment and is truncated
+        away, so records appended to the segment later are not hidden behind it. Appends
+        after recovery go to a fresh segment.
+        """
+        snapshot = self.read_snapshot()
+        tail = []
+        last_lsn = snapshot.lsn
+        for _, path in self._segments():
+            valid = 0
+            for lsn, record, valid in self._read_segment(path):
+                if lsn > snapshot.lsn:
+                    tail.append(record)
+                    last_lsn = max(last_lsn, lsn)
+            if valid < os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+                    os.fsync(f.fileno())
+        with self._lock:
+            self._next_lsn = last_lsn + 1
+            self.records_since_snapshot = len(tail)
+            self._open_segment()
+        return snapshot, tail
+
+    def read_snapshot(self):
+        path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        if not os.path.exists(path) or os.path.getsize(path) < SNAPSHOT_HEADER.size:
+            return Snapshot()
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, lsn, count, rows, dim = SNAPSHOT_HEADER.unpack_from(view, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a knowledge snapshot")
+            offsets_at = SNAPSHOT_HEADER.size
+            vectors_at = offsets_at + 8 * (count + 1)
+            data_at = vectors_at + 4 * rows * dim
+            offsets = np.frombuffer(view, dtype="<u8", count=count + 1, offset=offsets_at).tolist()
+            vectors = None
+            if dim:
+                vectors = np.frombuffer(view, dtype="<f4", count=rows * dim, offset=vectors_at)
+                vectors = vectors.reshape(rows, dim).copy()
+            documents = {}
+            for start, end in zip(offsets, offsets[1:]):
+                start, end = data_at + start, data_at + end
+                document = json.loads(view[start:end])
+                documents[document["id"]] = document
+        return Snapshot(lsn, documents, vectors)
+
+    def _read_segment(self, path):
+        """Yields (lsn, record, end offset of the record) up to the first torn record"""
+        with open(path, "rb") as f:
+            data = f.read()
+        position = 0
+        while position + WAL_RECORD.size <= len(data):
+            lsn, length, checksum = WAL_RECORD.unpack_from(data, position)
+            start = position + WAL_RECORD.size
+            end = start + length
+            payload = data[start:end]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            position += WAL_RECORD.size + length
+            yield lsn, json.loads(payload), position
+
+    def _open_segment(self):
+        if self._wal is not None:
+            self._wal.close()
+        self._wal = open(os.path.join(self.data_dir, _wal_name(self._next_lsn)), "ab")
+
+    def append(self, records):
+        """Durably log a batch of records with one write (and one fsync); returns the last lsn"""
+        with self._lock:
+            if self._wal is None:
+                self._open_segment()
+            chunks = []
+            for record in records:
+                payload = json.dumps(record, separators=(",", ":")).encode()
+                chunks.append(WAL_RECORD.pack(self._next_lsn, len(payload), zlib.crc32(payload)))
+                chunks.append(payload)
+                self._next_lsn += 1
+                self.records_since_snapshot += 1
+            self._wal.write(b"".join(chunks))
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            return self._next_lsn - 1
+
+    def rotate(self):
+        """Start a new log segment; returns the last lsn covered by the previous ones.
+
+        Call with in-memory writes paused, then capture the state to snapshot before
+        resuming them.
+        """
+        with self._lock:
+            self._open_segment()
+            self.records_since_snapshot = 0
+            return self._next_lsn - 1
+
+    def write_snapshot(self, lsn, documents, vectors=None):
+        """Persist `documents` (id -> document) and their vector rows as of `lsn`.
+
+        Log segments fully covered by the snapshot are removed afterwards.
+        """
+        blobs = [
+            json.dumps(document, separators=(",", ":")).encode() for document in documents.values()
+        ]
+        offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+        np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+        rows, dim = (0, 0) if vectors is None else vectors.shape
+
+        path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, lsn, len(blobs), rows, dim))
+            f.write(offsets.tobytes())
+            if dim:
+                f.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+        for first_lsn, segment in self._segments():
+            if first_lsn <= lsn:
+                os.remove(segment)
+
+    def close(self):
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
@@ -0,0 +1,205 @@
+import heapq
+from bisect import bisect_left
+
+import numpy as np
+from index import tokenize
+
+# Fuzzy matches a term longer than this many characters may be this many edits away;
+# shorter terms are only matched exactly, since almost everything is one edit from them
+FUZZY_LENGTHS = ((7, 2), (4, 1))
+# Fuzzy candidates verified with the edit distance, highest trigram overlap first
+MAX_FUZZY_CANDIDATES = 500
+PAD = "$"
+
+
+def trigrams(term):
+    """Distinct character trigrams of a term padded with two PADs in front and one behind"""
+    padded = f"{PAD}{PAD}{term}{PAD}"
+    return {"".join(gram) for gram in zip(padded, padded[1:], padded[2:])}
+
+
+def max_distance(term):
+    for length, distance in FUZZY_LENGTHS:
+        if len(term) >= length:
+            return distance
+    return 0
+
+
+def pattern_masks(pattern):
+    """char -> bit mask of its positions in `pattern`, for bounded_levenshtein()"""
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | 1 << i
+    return masks
+
+
+def bounded_levenshtein(a, b, limit, masks=None):
+    """Edit distance between a and b, or None as soon as it must exceed `limit`.
+
+    Uses Myers' bit-parallel algorithm: one column of the DP matrix is a pair of bit
+    vectors over the positions of `a`, updated with a handful of integer operations per
+    character of `b`. Pass `masks=pattern_masks(a)` when comparing `a` to many terms.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if not a:
+        return len(b)
+    masks = pattern_masks(a) if masks is None else masks
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative = full, 0
+    score = len(a)
+    remaining = len(b)
+    for char in b:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | ~(horizontal | positive)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            score += 1
+        elif horizontal_negative & last:
+            score -= 1
+        remaining -= 1
+        # Each remaining character lowers the score by at most one
+        if score - remaining > limit:
+            return None
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative <<= 1
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & full
+        negative = horizontal_positive & vertical & full
+    return score if score <= limit else None
+
+
+class TermIndex:
+    """Vocabulary of an inverted index with prefix and fuzzy lookups.
+
+    Terms are kept sorted, so the completions of a prefix are one contiguous range, and
+    each trigram maps to the rows of the terms containing it. An edit changes at most three
+    trigrams of a term, so a term within distance d of the query shares at least
+    len(trigrams(query)) - 3d of them; counting shared trigrams prunes the vocabulary to a
+    few candidates before the edit distance is computed.
+    """
+
+    def __init__(self, frequencies):
+        self.terms = sorted(frequencies)
+        self.frequencies = np.array([frequencies[term] for term in self.terms], dtype=np.int64)
+        # Trigram postings hold positions in this length-major order, so the terms of a
+        # length band are a contiguous range of positions
+        self._by_length = np.array(
+            sorted(range(len(self.terms)), key=lambda row: len(self.terms[row])), dtype=np.int32
+        )
+        self._length_starts = np.searchsorted(
+            np.array([len(self.terms[row]) for row in self._by_length], dtype=np.int32),
+            np.arange(max(map(len, self.terms), default=0) + 2),
+        )
+        positions = {}
+        for position, row in enumerate(self._by_length):
+            for gram in trigrams(self.terms[row]):
+                positions.setdefault(gram, []).append(position)
+        self._trigrams = {gram: np.array(ids, dtype=np.int32) for gram, ids in positions.items()}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def frequency(self, term):
+        row = bisect_left(self.terms, term)
+        if row < len(self.terms) and self.terms[row] == term:
+            return int(self.frequencies[row])
+        return 0
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` of the most frequent (term, frequency) starting with `prefix`"""
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + "\U0010ffff")
+        rows = np.arange(start, end)
+        if end - start > limit:
+            rows = start + np.argpartition(-self.frequencies[start:end], limit)[:limit]
+        return [(self.terms[row], int(self.frequencies[row])) for row in rows]
+
+    def fuzzy(self, term, distance=None):
+        """(term, edit distance, frequency) of vocabulary terms within `distance` edits"""
+        distance = max_distance(term) if distance is None else distance
+        grams = trigrams(term)
+        needed = len(grams) - 3 * distance
+        if needed < 1:
+            frequency = self.frequency(term)
+            return [(term, 0, frequency)] if frequency else []
+        postings = [self._trigrams[gram] for gram in grams if gram in self._trigrams]
+        if len(postings) < needed:
+            return []
+        longest = len(self._length_starts) - 1
+        low = self._length_starts[min(max(0, len(term) - distance), longest)]
+        high = self._length_starts[min(len(term) + distance + 1, longest)]
+        if low == high:
+            return []
+        band = []
+        for posting in postings:
+            first, last = np.searchsorted(posting, (low, high))
+            band.append(posting[first:last])
+        counts = np.bincount(np.concatenate(band) - low, minlength=high - low)
+        positions = np.flatnonzero(counts >= needed)
+        if len(positions) > MAX_FUZZY_CANDIDATES:
+            positions = positions[np.argpartition(-counts[positions], MAX_FUZZY_CANDIDATES)]
+            positions = positions[:MAX_FUZZY_CANDIDATES]
+        rows = self._by_length[positions + low]
+        masks = pattern_masks(term)
+        matches = []
+        for row in rows:
+            edits = bounded_levenshtein(term, self.terms[row], distance, masks)
+            if edits is not None:
+                matches.append((self.terms[row], edits, int(self.frequencies[row])))
+        return matches
+
+
+def complete(term_indexes, prefix, limit=10):
+    """Most frequent completions of `prefix` across indexes, as [(term, frequency)]"""
+    totals = {}
+    for terms in term_indexes:
+        for term, frequency in terms.complete(prefix, limit):
+            totals[term] = totals.get(term, 0) + frequency
+    return heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], item[0]))
+
+
+def fuzzy(term_indexes, term, limit=10):
+    """Closest, then most frequent, matches across indexes, as [(term, distance, frequency)]"""
+    matches = {}
+    for terms in term_indexes:
+        for match, distance, frequency in terms.fuzzy(term):
+            _, total = matches.get(match, (distance, 0))
+            matches[match] = (distance, total + frequency)
+    ranked = sorted(matches.items(), key=lambda item: (item[1][0], -item[1][1], item[0]))
+    return [(match, distance, frequency) for match, (distance, frequency) in ranked[:limit]]
+
+
+def suggest(term_indexes, text, limit=10):
+    """Suggestions for a partially typed, possibly misspelled query.
+
+    Every word but the last is replaced by its closest vocabulary term; the last word is
+    completed by prefix, then, if that leaves room, by fuzzy matches of the whole word.
+    Returns [{"text", "term", "distance", "frequency"}] best first.
+    """
+    words = tokenize(text)
+    if not words:
+        return []
+    term_indexes = list(term_indexes)
+    head = []
+    for word in words[:-1]:
+        matches = fuzzy(term_indexes, word, limit=1)
+        head.append(matches[0][0] if matches else word)
+
+    last = words[-1]
+    candidates = {term: (0, frequency) for term, frequency in complete(term_indexes, last, limit)}
+    if len(candidates) < limit:
+        for term, distance, frequency in fuzzy(term_indexes, last, limit):
+            candidates.setdefault(term, (distance, frequency))
+    ranked = sorted(candidates.items(), key=lambda item: (item[1][0], -item[1][1], item[0]))
+    return [
+        {
+            "text": " ".join(head + [term]),
+            "term": term,
+            "distance": distance,
+            "frequency": frequency,
+        }
+        for term, (distance, frequency) in ranked[:limit]
+    ]
@@ -0,0 +1,219 @@
+import importlib
+import math
+import zlib
+
+import numpy as np
+from index import iter_fields, tokenize
+
+
+def document_text(document):
+    """All searchable text of a document except its id, for embedding"""
+    return " ".join(text for field, text in iter_fields(document) if field != "id")
+
+
+class HashingEmbedder:
+    """CPU-only embedder that needs no model download or network access.
+
+    Word unigrams, word bigrams and character trigrams are hashed into `dim` signed buckets
+    with sublinear term weights, then L2-normalized. Character trigrams let inflections and
+    typos ("video"/"videos", "youtub") land close together. Any object with `dim` and
+    `embed(texts) -> float32 array of shape (len(texts), dim)` can replace it.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _features(self, text):
+        words = tokenize(text)
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                # crc32 is stable across processes, unlike hash()
+                digest = zlib.crc32(feature.encode())
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def load_embedder(spec=None, dim=256):
+    """Build the embedder named by "module:Class", or the hashing embedder by default"""
+    if not spec:
+        return HashingEmbedder(dim)
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class VectorIndex:
+    """Document vectors in one contiguous float32 matrix, searched with matrix products.
+
+    Rows are kept dense: removing a document moves the last row into its slot. Once the
+    index holds `ivf_threshold` vectors, a k-means coarse quantizer is trained and queries
+    only score the rows assigned to the `nprobe` closest centroids.
+    """
+
+    def __init__(self, dim, capacity=1024, ivf_threshold=50000, nlist=None, nprobe=8):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self.ivf_threshold = ivf_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._centroids = None
+        self._assignments = np.zeros(capacity, dtype=np.int32)
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    @property
+    def matrix(self):
+        return self._matrix[: len(self._ids)]
+
+    @property
+    def ids(self):
+        """Document ids in row order of `matrix`"""
+        return list(self._ids)
+
+    def add(self, doc_id, vector):
+        row = self._rows.get(doc_id)
+        if row is None:
+            row = len(self._ids)
+            if row == len(self._matrix):
+                self._grow()
+            self._ids.append(doc_id)
+            self._rows[doc_id] = row
+        self._matrix[row] = vector
+        if self._centroids is not None:
+            self._assignments[row] = int(np.argmax(self._centroids @ vector))
+        if len(self._ids) >= max(self.ivf_threshold, 2 * self._trained_size):
+            self.train()
+
+    def add_batch(self, doc_ids, vectors):
+        """Add or replace many vectors with one block copy; the last duplicate id wins"""
+        sources = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        fresh = [doc_id for doc_id in sources if doc_id not in self._rows]
+        while len(self._ids) + len(fresh) > len(self._matrix):
+            self._grow()
+        for doc_id in fresh:
+            self._rows[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+        targets = [self._rows[doc_id] for doc_id in sources]
+        block = vectors[list(sources.values())]
+        self._matrix[targets] = block
+        if self._centroids is not None:
+            self._assignments[targets] = np.argmax(block @ self._centroids.T, axis=1)
+        if self._ids and len(self._ids) >= max(self.ivf_threshold, 2 * self._trained_size):
+            self.train()
+
+    def remove(self, doc_id):
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._assignments[row] = self._assignments[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+        return True
+
+    def _grow(self):
+        capacity = 2 * len(self._matrix)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[: len(self._matrix)] = self._matrix
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[: len(self._assignments)] = self._assignments
+        self._matrix, self._assignments = matrix, assignments
+
+    def train(self, iterations=10, seed=0):
+        """Fit the coarse quantizer with spherical k-means over the stored vectors"""
+        vectors = self.matrix
+        nlist = min(self.nlist or max(1, int(math.sqrt(len(vectors)))), len(vectors))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self._centroids = centroids
+        self._assignments[: len(vectors)] = np.argmax(vectors @ centroids.T, axis=1)
+        self._trained_size = len(vectors)
+
+    def search(self, query_vector, top_k=10):
+        """The `top_k` (doc_id, cosine similarity) pairs closest to a normalized vector"""
+        return self.search_batch(query_vector[np.newaxis, :], top_k)[0]
+
+    def search_batch(self, query_vectors, top_k=10):
+        """Nearest neighbours for each row of `query_vectors`, as one list per query"""
+        if not self._ids or top_k <= 0:
+            return [[] for _ in query_vectors]
+        matrix = self.matrix
+        if self._centroids is None:
+            return [self._top_k(np.arange(len(matrix)), s, top_k) for s in query_vectors @ matrix.T]
+
+        probes = np.argsort(-(query_vectors @ self._centroids.T), axis=1)[:, : self.nprobe]
+        results = []
+        for query, probe in zip(query_vectors, probes):
+            rows = np.flatnonzero(np.isin(self._assignments[: len(matrix)], probe))
+            results.append(self._top_k(rows, matrix[rows] @ query, top_k))
+        return results
+
+    def vectors(self, doc_ids):
+        """Copy of the stored vectors of specific documents, one row each"""
+        return self._matrix[[self._rows[doc_id] for doc_id in doc_ids]]
+
+    def similarity(self, query_vector, doc_ids):
+        """Cosine similarity of a normalized vector to specific documents"""
+        rows = [self._rows[doc_id] for doc_id in doc_ids]
+        return self._matrix[rows] @ query_vector
+
+    def _top_k(self, rows, scores, top_k):
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+
+def hybrid_search(index, vectors, query_vector, query, top_k=10, alpha=0.5, boosts=None):
+    """Blend BM25 and cosine similarity: alpha * bm25 / max(bm25) + (1 - alpha) * cosine.
+
+    Candidates are the union of the keyword and vector top `3 * top_k`. Cosine similarity is
+    computed for every candidate; keyword-only scores are 0 outside the keyword top list.
+    """
+    pool = 3 * top_k
+    keyword = dict(index.search_ranked(query, top_k=pool, boosts=boosts))
+    semantic = dict(vectors.search(query_vector, top_k=pool))
+    candidates = list(keyword.keys() | semantic.keys())
+    if not candidates:
+        return []
+
+    best_keyword = max(keyword.values(), default=0.0) or 1.0
+    cosine = vectors.similarity(query_vector, candidates)
+    scores = {
+        doc_id: alpha * keyword.get(doc_id, 0.0) / best_keyword + (1 - alpha) * float(similarity)
+        for doc_id, similarity in zip(candidates, cosine)
+    }
+    return sorted(scores.items(), key=lambda hit: hit[1], reverse=True)[:top_k]
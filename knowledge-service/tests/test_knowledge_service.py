@@ -1,2 +1,524 @@
-def test_knowledge_service_basic():
-    assert True
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import app as knowledge_app  # noqa: E402
+import coordinator  # noqa: E402
+import docstore  # noqa: E402
+from chunking import chunk_document, chunk_text  # noqa: E402
+from index import InvertedIndex  # noqa: E402
+from segments import SegmentedIndex  # noqa: E402
+from sharding import HashRing, ShardedKnowledge  # noqa: E402
+from store import KnowledgeStore  # noqa: E402
+from suggest import TermIndex, bounded_levenshtein  # noqa: E402
+from vectors import HashingEmbedder, VectorIndex  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    knowledge_app.knowledge = SegmentedIndex(knowledge_app.embedder.dim)
+    knowledge_app.knowledge_store = None
+    return knowledge_app.app.test_client()
+
+
+def test_knowledge_service_basic():
+    assert True
+
+
+def test_inverted_index_terms_and_phrases():
+    index = InvertedIndex()
+    index.add("a", {"id": "a", "title": "YouTube SEO tips", "tags": ["seo", "video tips"]})
+    index.add("b", {"id": "b", "title": "SEO for video", "body": {"text": "tips video seo"}})
+
+    assert index.search("SEO") == ["a", "b"]
+    assert index.search("video tips") == ["a", "b"]
+    assert index.search('"video tips"') == ["a"]
+    assert index.search('"tips video"') == ["b"]
+    # Field names and punctuation are not searchable
+    assert index.search("title") == []
+    assert index.search('"seo video"') == []
+
+
+def test_inverted_index_reingest_replaces_postings():
+    index = InvertedIndex()
+    index.add("a", {"id": "a", "title": "YouTube SEO"})
+    index.add("a", {"id": "a", "title": "cooking"})
+
+    assert index.search("youtube") == []
+    assert index.search("cooking") == ["a"]
+    assert index.postings("youtube") == {}
+
+
+def test_search_ranked_orders_by_bm25_and_boosts():
+    index = InvertedIndex()
+    index.add("body", {"id": "body", "title": "cooking", "body": "seo seo for video"})
+    index.add("title", {"id": "title", "title": "seo guide", "body": "video"})
+    index.add("other", {"id": "other", "title": "pasta", "body": "recipes"})
+
+    hits = index.search_ranked("seo")
+    assert [doc_id for doc_id, _ in hits] == ["title", "body"]
+    hits = index.search_ranked("seo", boosts={"body": 5.0})
+    assert [doc_id for doc_id, _ in hits] == ["body", "title"]
+    assert index.search_ranked("seo video", top_k=1)[0][0] == "title"
+    assert [doc_id for doc_id, _ in index.search_ranked('"seo for"')] == ["body"]
+
+
+def test_search_ranked_top_k_matches_exhaustive_scoring():
+    index = InvertedIndex()
+    words = ["seo", "video", "tips", "rank", "youtube", "growth", "views"]
+    for i in range(200):
+        text = " ".join(words[(i * j) % len(words)] for j in range(1, 2 + i % 5))
+        index.add(str(i), {"id": str(i), "title": text, "body": words[i % len(words)]})
+
+    for query in ("seo", "seo video", "rank growth views", "youtube tips"):
+        top = index.search_ranked(query, top_k=5)
+        everything = index.search_ranked(query, top_k=1000)
+        assert len(top) == 5
+        assert [score for _, score in top] == pytest.approx([s for _, s in everything[:5]])
+
+
+def test_ingest_and_query(client):
+    client.post("/ingest", json={"id": "1", "title": "YouTube SEO tips"})
+    client.post("/ingest", json={"id": "2", "title": "Cooking pasta"})
+
+    response = client.post("/query", json={"query": "seo"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()["response"]] == ["1"]
+
+
+def test_query_limits_results_to_top_k(client):
+    for i in range(30):
+        client.post("/ingest", json={"id": str(i), "title": f"seo tips {i}"})
+
+    body = client.post("/query", json={"query": "seo", "top_k": 5}).get_json()
+    assert len(body["response"]) == len(body["scores"]) == 5
+    body = client.post("/query", json={"query": "seo", "top_k": 10000}).get_json()
+    assert len(body["response"]) == 30
+    assert client.post("/query", json={"query": "seo", "top_k": "x"}).status_code == 400
+    assert client.post("/query", json={"query": "seo", "top_k": 0}).status_code == 400
+    assert client.post("/query", json={"query": "seo", "top_k": -3}).status_code == 400
+    for boosts in ({"title": "x"}, {"title": 0}, {"title": -2.0}, {"title": True}, ["title"]):
+        response = client.post("/query", json={"query": "seo", "boosts": boosts})
+        assert response.status_code == 400
+    body = client.post("/query", json={"query": "seo", "boosts": {"title": 2.5}}).get_json()
+    assert body["status"] == "success"
+    for alpha in ("abc", None, 5, -1, "nan"):
+        response = client.post("/query", json={"query": "seo", "mode": "hybrid", "alpha": alpha})
+        assert response.status_code == 400
+    body = client.post("/query", json={"query": "seo", "mode": "hybrid", "alpha": 1}).get_json()
+    assert body["status"] == "success"
+
+
+def test_vector_index_exact_and_ivf_search_agree_on_nearest():
+    embedder = HashingEmbedder(dim=64)
+    texts = [f"youtube seo ranking tips {i}" if i % 2 else f"pasta recipe {i}" for i in range(300)]
+    vectors = embedder.embed(texts)
+    exact = VectorIndex(64, capacity=8, ivf_threshold=10**9)
+    ivf = VectorIndex(64, capacity=8, ivf_threshold=100, nprobe=4)
+    for i, vector in enumerate(vectors):
+        exact.add(str(i), vector)
+        ivf.add(str(i), vector)
+
+    query = embedder.embed(["youtub seo tips"])[0]
+    assert ivf.search(query, 1)[0] == exact.search(query, 1)[0]
+    assert int(exact.search(query, 1)[0][0]) % 2 == 1
+
+    exact.remove("1")
+    assert "1" not in exact and len(exact) == 299
+    assert "1" not in [doc_id for doc_id, _ in exact.search(query, 300)]
+
+
+def test_query_semantic_and_hybrid_modes(client):
+    client.post("/ingest", json={"id": "seo", "title": "Ranking videos on YouTube"})
+    client.post("/ingest", json={"id": "food", "title": "Cooking pasta at home"})
+
+    body = client.post("/query", json={"query": "rank youtube video", "mode": "semantic"})
+    assert body.get_json()["response"][0]["id"] == "seo"
+    body = client.post("/query", json={"query": "videos", "mode": "hybrid", "top_k": 1})
+    assert [item["id"] for item in body.get_json()["response"]] == ["seo"]
+    assert client.post("/query", json={"query": "x", "mode": "fuzzy"}).status_code == 400
+
+
+def test_store_replays_only_the_log_tail_after_a_snapshot(tmp_path):
+    store = KnowledgeStore(str(tmp_path), fsync=False)
+    store.recover()
+    store.append([{"op": "put", "document": {"id": str(i), "n": i}} for i in range(3)])
+    lsn = store.rotate()
+    store.write_snapshot(lsn, {"0": {"id": "0", "n": 0}}, vectors=np.ones((1, 4), np.float32))
+    store.append([{"op": "put", "document": {"id": "3", "n": 3}}])
+    store.close()
+    # A torn record from a crash mid-write is ignored
+    with open(next(tmp_path.glob("wal-*.log")), "ab") as f:
+        f.write(b"\x09\x00\x00")
+
+    snapshot, tail = KnowledgeStore(str(tmp_path)).recover()
+    assert snapshot.lsn == 3 and list(snapshot.documents) == ["0"]
+    assert snapshot.vectors.shape == (1, 4)
+    assert [record["document"]["id"] for record in tail] == ["3"]
+
+
+def test_store_truncates_a_torn_record_before_appending_after_it(tmp_path):
+    store = KnowledgeStore(str(tmp_path), fsync=False)
+    store.recover()
+    store.append([{"op": "put", "document": {"id": "0"}}])
+    store.close()
+    # The torn record is at the start of the segment the next recovery appends to
+    with open(tmp_path / "wal-00000000000000000002.log", "wb") as f:
+        f.write(b"\x02\x00\x00\x00\x00")
+
+    store = KnowledgeStore(str(tmp_path), fsync=False)
+    _, tail = store.recover()
+    assert [record["document"]["id"] for record in tail] == ["0"]
+    store.append([{"op": "put", "document": {"id": "1"}}])
+    store.close()
+
+    for _ in range(2):
+        store = KnowledgeStore(str(tmp_path), fsync=False)
+        _, tail = store.recover()
+        store.close()
+        assert [record["document"]["id"] for record in tail] == ["0", "1"]
+
+
+def test_restore_rebuilds_indexes_from_snapshot_and_log(client, tmp_path):
+    knowledge_app.knowledge_store = KnowledgeStore(str(tmp_path), fsync=False)
+    knowledge_app.restore_knowledge()
+    client.post("/ingest", json={"id": "a", "title": "YouTube SEO tips"})
+    knowledge_app.snapshot_knowledge()
+    client.post("/ingest", json={"id": "b", "title": "Video editing tips"})
+    knowledge_app.knowledge_store.close()
+
+    client = knowledge_app.app.test_client()
+    knowledge_app.knowledge = SegmentedIndex(knowledge_app.embedder.dim)
+    knowledge_app.knowledge_store = KnowledgeStore(str(tmp_path), fsync=False)
+    assert knowledge_app.restore_knowledge() == (1, 1)
+
+    body = client.post("/query", json={"query": "tips", "mode": "hybrid"}).get_json()
+    assert sorted(item["id"] for item in body["response"]) == ["a", "b"]
+
+
+def test_put_and_delete_items_survive_compaction_and_restore(client, tmp_path):
+    knowledge_app.knowledge_store = KnowledgeStore(str(tmp_path), fsync=False)
+    knowledge_app.restore_knowledge()
+    assert client.put("/items/a", json={"title": "SEO tips"}).status_code == 201
+    assert client.put("/items/b", json={"id": "b", "title": "Editing tips"}).status_code == 201
+    response = client.put("/items/a", json={"title": "Thumbnail tips"})
+    assert response.status_code == 200 and response.get_json()["created"] is False
+    assert client.put("/items/a", json={"id": "b"}).status_code == 400
+
+    assert client.delete("/items/a").get_json()["deleted"] is True
+    assert client.delete("/items/a").status_code == 404
+    body = client.post("/query", json={"query": "tips"}).get_json()
+    assert [item["id"] for item in body["response"]] == ["b"]
+    view = knowledge_app.knowledge.view
+    assert view.tombstones == 2 and "a" not in view
+
+    knowledge_app.knowledge.merge()
+    view = knowledge_app.knowledge.view
+    assert view.tombstones == 0 and len(view.segments) == 1
+    assert client.get("/items").get_json()["total"] == 1
+    knowledge_app.knowledge_store.close()
+
+    knowledge_app.knowledge = SegmentedIndex(knowledge_app.embedder.dim)
+    knowledge_app.knowledge_store = KnowledgeStore(str(tmp_path), fsync=False)
+    knowledge_app.restore_knowledge()
+    assert list(knowledge_app.knowledge.view.ids_after()) == ["b"]
+    assert client.put("/items/a", json={"title": "Back again"}).status_code == 201
+
+
+def test_bulk_ingest_reports_bad_lines_and_ingests_the_rest(client, monkeypatch):
+    monkeypatch.setattr(knowledge_app, "BULK_BATCH_SIZE", 2)
+    lines = [
+        json.dumps({"id": "a", "title": "YouTube SEO tips"}),
+        "{not json",
+        "",
+        json.dumps({"title": "no id"}),
+        json.dumps({"id": "b", "title": "Video editing tips"}),
+        json.dumps({"id": "c", "title": "Thumbnail tips"}),
+    ]
+    response = client.post(
+        "/ingest/bulk", data="\n".join(lines), content_type="application/x-ndjson"
+    )
+    body = response.get_json()
+    assert body["status"] == "partial"
+    assert (body["ingested"], body["failed"]) == (3, 2)
+    assert [error["line"] for error in body["errors"]] == [2, 4]
+    assert "documents_per_second" in body
+
+    body = client.post("/query", json={"query": "tips"}).get_json()
+    assert sorted(item["id"] for item in body["response"]) == ["a", "b", "c"]
+
+
+def test_ingest_returns_only_its_id_and_items_are_paginated(client):
+    body = client.post("/ingest", json={"id": "b", "title": "B", "body": "x"}).get_json()
+    assert body["knowledge_id"] == "b" and body["created"] is True
+    assert "knowledge_ids" not in body
+    assert client.post("/ingest", json={"id": "b", "title": "B2"}).get_json()["created"] is False
+    for knowledge_id in ("c", "a", "d"):
+        client.post("/ingest", json={"id": knowledge_id, "title": knowledge_id.upper()})
+
+    page = client.get("/items?limit=3&fields=title").get_json()
+    assert page["items"] == [
+        {"id": "a", "title": "A"},
+        {"id": "b", "title": "B2"},
+        {"id": "c", "title": "C"},
+    ]
+    assert page["next_cursor"] == "c" and page["total"] == 4
+    page = client.get(f"/items?limit=3&cursor={page['next_cursor']}").get_json()
+    assert [item["id"] for item in page["items"]] == ["d"] and page["next_cursor"] is None
+    assert client.get("/items?limit=5000").status_code == 400
+
+
+def test_segmented_index_overwrites_merges_and_serves_concurrent_readers():
+    embedder = HashingEmbedder(dim=32)
+    segmented = SegmentedIndex(32)
+
+    def publish(start, stop, title):
+        documents = {str(i): {"id": str(i), "title": f"{title} {i}"} for i in range(start, stop)}
+        texts = [document["title"] for document in documents.values()]
+        units = {doc_id: [(doc_id, document)] for doc_id, document in documents.items()}
+        return segmented.publish(documents, units, embedder.embed(texts))
+
+    errors = []
+
+    def read():
+        while not done.is_set():
+            try:
+                view = segmented.view
+                for doc_id, _ in view.search_ranked("tips", top_k=20):
+                    view[doc_id]
+                view.ids_after(None, 50)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    done = threading.Event()
+    reader = threading.Thread(target=read)
+    reader.start()
+    assert publish(0, 40, "seo tips") == 40
+    for i in range(0, 40, 4):
+        publish(i, i + 4, "editing tips")
+        segmented.merge_once()
+    done.set()
+    reader.join()
+    assert not errors
+
+    before = segmented.view
+    assert publish(10, 12, "thumbnail advice") == 0
+    segmented.merge()
+    view = segmented.view
+    assert len(view) == 40 and len(view.segments) <= 5
+    assert before["10"]["title"] == "editing tips 10"
+    assert view["10"]["title"] == "thumbnail advice 10"
+    assert {doc_id for doc_id, _ in view.search_ranked("advice", top_k=5)} == {"10", "11"}
+    assert view.ids_after("37", 5) == ["38", "39", "4", "5", "6"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def shard_urls():
+    """Two local knowledge-service processes"""
+    processes, urls = [], []
+    for _ in range(2):
+        port = _free_port()
+        env = {**os.environ, "KNOWLEDGE_PORT": str(port)}
+        env.pop("KNOWLEDGE_DATA_DIR", None)
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, os.path.join(SRC_DIR, "app.py")],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+        urls.append(f"http://127.0.0.1:{port}")
+    try:
+        for url in urls:
+            for _ in range(100):
+                try:
+                    requests.get(f"{url}/items", timeout=0.5)
+                    break
+                except requests.exceptions.ConnectionError:
+                    time.sleep(0.1)
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def test_hash_ring_is_stable_when_a_shard_is_added():
+    ids = [f"doc-{i}" for i in range(2000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [doc_id for doc_id in ids if before.node_for(doc_id) != after.node_for(doc_id)]
+    assert all(after.node_for(doc_id) == "d" for doc_id in moved)
+    assert 0.1 < len(moved) / len(ids) < 0.4
+
+
+def test_coordinator_scatters_queries_and_tolerates_a_dead_shard(shard_urls, monkeypatch):
+    sharded = ShardedKnowledge(shard_urls, timeout=5)
+    monkeypatch.setattr(coordinator, "sharded", sharded)
+    client = coordinator.app.test_client()
+    documents = [{"id": f"doc-{i}", "title": f"video tips {i}"} for i in range(20)]
+    documents.append({"id": "best", "title": "video tips video tips"})
+    body = client.post(
+        "/ingest/bulk",
+        data="\n".join(json.dumps(document) for document in documents),
+        content_type="application/x-ndjson",
+    ).get_json()
+    assert (body["ingested"], body["failed"]) == (21, 0)
+
+    body = client.post("/query", json={"query": "video tips", "top_k": 5}).get_json()
+    assert len(body["response"]) == 5 and body["partial"] is False
+    assert client.post("/query", json={"query": "video tips", "top_k": 0}).status_code == 400
+    assert body["scores"] == sorted(body["scores"], reverse=True)
+    page = client.get("/items?limit=15").get_json()
+    assert [item["id"] for item in page["items"]] == sorted(d["id"] for d in documents)[:15]
+    page = client.get(f"/items?limit=15&cursor={page['next_cursor']}").get_json()
+    assert len(page["items"]) == 6 and page["next_cursor"] is None and page["total"] == 21
+    body = client.get("/suggest?q=vide").get_json()
+    assert body["suggestions"][0] == {
+        "text": "video",
+        "term": "video",
+        "distance": 0,
+        "frequency": 21,
+    }
+    assert client.delete("/items/doc-3").status_code == 200
+    assert client.delete("/items/doc-3").status_code == 404
+    assert client.get("/items?limit=50").get_json()["total"] == 20
+    assert client.put("/items/doc-3", json={"title": "video tips 3"}).status_code == 201
+
+    dead = f"http://127.0.0.1:{_free_port()}"
+    monkeypatch.setattr(coordinator, "sharded", ShardedKnowledge(shard_urls + [dead], timeout=5))
+    body = client.post("/query", json={"query": "video tips", "top_k": 50}).get_json()
+    assert body["partial"] is True and len(body["response"]) == 21
+    assert [failure["shard"] for failure in body["shards"]["failed"]] == [dead]
+
+
+def test_chunk_text_keeps_sentences_and_overlaps():
+    text = " ".join(f"Sentence number {i} is here." for i in range(30))
+    passages = chunk_text(text, max_tokens=20, overlap=5)
+    assert all(len(passage.split()) <= 20 for passage in passages)
+    assert all(passage.endswith(".") for passage in passages)
+    # Each passage starts with the last sentence of the previous one
+    for previous, passage in zip(passages, passages[1:]):
+        assert passage.startswith(previous.split(". ")[-1])
+
+    unpunctuated = " ".join(f"w{i}" for i in range(50))
+    windows = chunk_text(unpunctuated, max_tokens=20, overlap=5)
+    assert [window.split()[0] for window in windows] == ["w0", "w15", "w30"]
+
+
+def test_long_documents_are_answered_with_passages(client, monkeypatch):
+    monkeypatch.setattr(knowledge_app, "CHUNK_TOKENS", 30)
+    monkeypatch.setattr(knowledge_app, "CHUNK_OVERLAP", 5)
+    filler = " ".join(f"Filler sentence {i} about nothing much." for i in range(40))
+    transcript = f"{filler} Thumbnails with faces raise click rates. {filler}"
+    client.post("/ingest", json={"id": "talk", "title": "Creator talk", "transcript": transcript})
+    units = chunk_document("talk", {"id": "talk", "transcript": transcript}, 30, 5)
+    assert len(units) > 10 and units[1][1]["parent_id"] == "talk"
+
+    body = client.post("/query", json={"query": "thumbnails faces", "top_k": 1}).get_json()
+    passage = body["response"][0]
+    assert passage["parent_id"] == "talk" and passage["title"] == "Creator talk"
+    assert "Thumbnails with faces" in passage["transcript"]
+    assert len(passage["transcript"]) < len(transcript) / 5
+
+    body = client.post(
+        "/query", json={"query": "thumbnails faces", "top_k": 3, "full_documents": True}
+    ).get_json()
+    assert body["response"] == [knowledge_app.knowledge.view["talk"]]
+
+
+def test_ids_that_could_collide_with_passage_ids_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(knowledge_app, "CHUNK_TOKENS", 30)
+    monkeypatch.setattr(knowledge_app, "CHUNK_OVERLAP", 5)
+    transcript = " ".join(f"Sentence {i} about thumbnails." for i in range(40))
+    client.post("/ingest", json={"id": "talk", "transcript": transcript})
+    passages = len(knowledge_app.knowledge.view.search_ranked("thumbnails", top_k=100))
+
+    response = client.post("/ingest", json={"id": "talk#0", "transcript": "other"})
+    assert response.status_code == 400 and "#" in response.get_json()["error"]
+    assert client.put("/items/talk%230", json={"title": "other"}).status_code == 400
+    body = client.post(
+        "/ingest/bulk", data='{"id": "talk#1", "title": "other"}\n{"id": "fine"}\n'
+    ).get_json()
+    assert (body["ingested"], body["failed"]) == (1, 1)
+    assert body["errors"][0]["line"] == 1
+
+    assert "talk#0" not in knowledge_app.knowledge.view
+    hits = knowledge_app.knowledge.view.search_ranked("thumbnails", top_k=100)
+    assert len(hits) == passages > 1
+
+
+def test_document_store_round_trips_before_and_after_the_dictionary(monkeypatch):
+    monkeypatch.setattr(docstore, "DICTIONARY_SAMPLES", 5)
+    codec = docstore.Codec("zlib")
+    documents = [
+        (str(i), {"id": str(i), "title": f"Video {i}", "tags": ["seo", "growth"], "views": i})
+        for i in range(20)
+    ]
+    first = docstore.DocumentStore.from_documents(codec, documents[:3])
+    second = docstore.DocumentStore.from_documents(codec, documents[3:])
+    assert codec.encode(documents[0][1])[0] == docstore.WITH_DICTIONARY
+    assert first.blob("0")[0] == docstore.PLAIN
+
+    merged = docstore.DocumentStore.from_stores(codec, [(first, ["0", "2"]), (second, ["19"])])
+    assert list(merged.items()) == [documents[0], documents[2], documents[19]]
+    assert merged.blob("19") == second.blob("19")
+    assert "1" not in merged and merged.get("1") is None
+    assert dict(second.items()) == dict(documents[3:])
+
+
+def test_term_index_completes_prefixes_and_matches_typos():
+    terms = TermIndex({"youtube": 50, "youtuber": 20, "you": 90, "yoga": 5, "tube": 7})
+    assert sorted(terms.complete("yout")) == [("youtube", 50), ("youtuber", 20)]
+    assert terms.complete("you", limit=1) == [("you", 90)]
+    assert terms.complete("zebra") == []
+    assert terms.fuzzy("youtbe") == [("youtube", 1, 50)]
+    assert sorted(terms.fuzzy("youtubr")) == [("youtube", 1, 50), ("youtuber", 1, 20)]
+    # Too short for a typo to be told apart from another word
+    assert terms.fuzzy("yuo") == []
+
+    assert bounded_levenshtein("kitten", "sitting", 3) == 3
+    assert bounded_levenshtein("kitten", "sitting", 2) is None
+
+
+def test_suggest_corrects_and_completes_typed_queries(client):
+    client.post("/ingest", json={"id": "1", "title": "YouTube SEO basics", "tags": ["seo"]})
+    client.post("/ingest", json={"id": "2", "title": "YouTube search ranking"})
+    client.post("/ingest", json={"id": "3", "title": "Secret sauce", "tags": ["seo", "search"]})
+    client.post("/ingest", json={"id": "4", "title": "Thumbnail tips", "tags": ["seo"]})
+
+    body = client.get("/suggest?q=youtub%20se").get_json()
+    assert [s["text"] for s in body["suggestions"]] == [
+        "youtube seo",
+        "youtube search",
+        "youtube secret",
+    ]
+    assert body["suggestions"][0]["frequency"] == 3
+
+    body = client.get("/suggest?q=serch").get_json()
+    assert body["suggestions"][0] == {
+        "text": "search",
+        "term": "search",
+        "distance": 1,
+        "frequency": 2,
+    }
+    assert client.get("/suggest?q=%20").status_code == 400
+    assert client.get("/suggest?q=seo&limit=0").status_code == 400
@@ -18,7 +18,7 @@ from seo_generator import (
 
 from ab_testing import ABTesting
 
-ab_testing = ABTesting()
+ab_testing = ABTesting.from_env()
 
 API_KEY = os.environ.get("YOUTUBE_API_KEY")
 if not API_KEY:
@@ -98,6 +98,65 @@ def generate_seo_content():
         SEO_LATENCY.observe(latency)
 
 
+@app.route("/experiments/results", methods=["POST"])
+def experiment_results():
+    """Columnar A/B test results for a batch of experiments"""
+    try:
+        data = request.json or {}
+        experiment_ids = data.get("experiment_ids")
+        if not isinstance(experiment_ids, list):
+            return jsonify({"error": "experiment_ids must be a list"}), 400
+        confidence = float(data.get("confidence", 0.95))
+        if not 0 < confidence < 1:
+            return jsonify({"error": "confidence must be between 0 and 1"}), 400
+        include_archived = bool(data.get("include_archived", False))
+        return jsonify(
+            ab_testing.get_results_bulk(
+                experiment_ids, confidence=confidence, include_archived=include_archived
+            )
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/experiments/<experiment_id>/timeseries", methods=["GET"])
+def experiment_timeseries(experiment_id):
+    """Hourly or daily A/B test results for an experiment, read from the rollups"""
+    try:
+        granularity = request.args.get("granularity", "hour")
+        end = int(request.args.get("end", time.time()))
+        start = int(request.args.get("start", end - 7 * 86400))
+        return jsonify(ab_testing.get_timeseries(experiment_id, start, end, granularity))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/experiments/<experiment_id>/conclude", methods=["POST"])
+def conclude_experiment(experiment_id):
+    """Stop serving an experiment so it can be archived"""
+    try:
+        ab_testing.conclude_experiment(experiment_id)
+        return jsonify({"status": "success", "experiment_id": experiment_id})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/admin/experiments/archive", methods=["POST"])
+def archive_experiments():
+    """Archive concluded experiments, vacuum the hot store and report space reclaimed"""
+    try:
+        data = request.json or {}
+        older_than = float(data.get("older_than_days", 0)) * 86400
+        report = ab_testing.archive_concluded(
+            older_than=older_than, vacuum=bool(data.get("vacuum", True))
+        )
+        return jsonify({"status": "success", **report})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 def select_best_title(titles, conversation_context):
     # Logic to select best title based on conversation context
     # Use LLM to analyze conversation and pick most relevant title
@@ -126,4 +185,11 @@ def get_top_videos(api_key: str, query: str, max_results: int = 5) -> list[dict]
 
 
 if __name__ == "__main__":
+    # With the Redis backend every replica runs this; a lock in Redis lets only one of
+    # them archive at a time
+    ab_testing.start_maintenance_worker(
+        interval=int(os.environ.get("AB_ROLLUP_INTERVAL", "60")),
+        experiment_ttl=int(os.environ.get("AB_EXPERIMENT_TTL_DAYS", "30")) * 86400,
+        archive_after=int(os.environ.get("AB_ARCHIVE_AFTER_DAYS", "7")) * 86400,
+    )
     app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,72 @@
+"""Measure wall-time speedup of segmented encoding against the number of chunks.
+
+Usage:
+    python benchmarks/bench_segmented.py [--seconds 120] [--size 1280x720] \
+        [--chunks 1 2 4 8] [--threads 0]
+
+Generates a synthetic test video with ffmpeg's lavfi sources (testsrc2 and a sine tone,
+as MPEG-4 Part 2 video and PCM audio so both have to be re-encoded), then encodes it in
+one pass and in each number of chunks. Speedups are relative to the first --chunks entry.
+Needs ffmpeg and ffprobe on the PATH.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import ffmpeg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from encoding import encode, encode_segmented, plan_streams  # noqa: E402
+
+
+def make_source(path, seconds, size):
+    video = ffmpeg.input(f"testsrc2=size={size}:rate=30", f="lavfi", t=seconds)
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=48000", f="lavfi", t=seconds)
+    (
+        ffmpeg.output(video, audio, path, vcodec="mpeg4", g=60, qscale=3, acodec="pcm_s16le")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=0, help="ffmpeg threads in total")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "source.avi")
+        start = time.perf_counter()
+        make_source(source, args.seconds, args.size)
+        elapsed = time.perf_counter() - start
+        print(f"generated {args.seconds:.0f}s {args.size} source in {elapsed:.1f}s")
+
+        probe = ffmpeg.probe(source)
+        plan = plan_streams(probe)
+        duration = float(probe["format"]["duration"])
+        baseline = None
+        for chunks in args.chunks:
+            output = os.path.join(workdir, f"out-{chunks}.mp4")
+            start = time.perf_counter()
+            if chunks == 1:
+                cpu_seconds = encode(source, output, plan, args.threads)
+            else:
+                cpu_seconds = encode_segmented(source, output, plan, duration, chunks, args.threads)
+            wall = time.perf_counter() - start
+            baseline = baseline or wall
+            encoded = float(ffmpeg.probe(output)["format"]["duration"])
+            print(
+                f"{chunks:>3} chunks: {wall:7.1f}s wall  {cpu_seconds:7.1f}s cpu  "
+                f"speedup {baseline / wall:4.2f}x  output {encoded:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
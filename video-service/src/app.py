@@ -1,162 +1,613 @@
-import json
-import os
-import tempfile
-import time
-
-import ffmpeg
-from flask import Flask, Response, jsonify, request
-from flask_cors import CORS
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
-from tenacity import retry, stop_after_attempt, wait_exponential
-
-app = Flask(__name__)
-CORS(app)
-
-# Define metrics
-VIDEO_REQUESTS = Counter("video_requests_total", "Total video requests", ["endpoint"])
-VIDEO_LATENCY = Histogram("video_request_duration_seconds", "Video request latency", ["endpoint"])
-
-
-@app.route("/metrics")
-def metrics():
-    """Expose metrics for Prometheus"""
-    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
-
-
-@app.route("/process-video", methods=["POST"])
-def process_video():
-    """Process and prepare video for upload"""
-    start_time = time.time()
-    try:
-        if "video" not in request.files:
-            return jsonify({"error": "No video file provided"}), 400
-
-        video_file = request.files["video"]
-
-        # Save temporary file
-        temp_input = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
-        temp_output = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
-        video_file.save(temp_input.name)
-
-        try:
-            # Process video with ffmpeg
-            (
-                ffmpeg.input(temp_input.name)
-                .output(
-                    temp_output.name,
-                    vcodec="libx264",
-                    preset="medium",
-                    acodec="aac",
-                    audio_bitrate="128k",
-                    crf=23,
-                )
-                .run(quiet=True, overwrite_output=True)
-            )
-
-            # Get file size and duration for metrics
-            probe = ffmpeg.probe(temp_output.name)
-            duration = float(probe["format"]["duration"])
-            file_size = os.path.getsize(temp_output.name)
-
-            result = jsonify(
-                {
-                    "status": "success",
-                    "processed_file": temp_output.name,
-                    "duration": duration,
-                    "file_size": file_size,
-                }
-            )
-            VIDEO_REQUESTS.labels(endpoint="/process-video").inc()
-            return result
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-        finally:
-            # Clean up input file if processing is complete
-            if os.path.exists(temp_input.name):
-                os.unlink(temp_input.name)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        latency = time.time() - start_time
-        VIDEO_LATENCY.labels(endpoint="/process-video").observe(latency)
-
-
-@app.route("/upload-to-youtube", methods=["POST"])
-@retry(wait=wait_exponential(multiplier=1, min=4, max=60), stop=stop_after_attempt(3))
-def upload_to_youtube():
-    """Upload processed video to YouTube with generated SEO content"""
-    start_time = time.time()
-    try:
-        data = request.json
-        video_file = data.get("video_file")
-        title = data.get("title")
-        description = data.get("description")
-        tags = data.get("tags", [])
-        category_id = data.get("category_id", "22")  # Default to People & Blogs
-
-        if not all([video_file, title, description]):
-            return jsonify({"error": "Missing required parameters"}), 400
-
-        youtube_credentials_json = os.environ.get("YOUTUBE_CREDENTIALS")
-        if not youtube_credentials_json:
-            return jsonify({"error": "YOUTUBE_CREDENTIALS environment variable is not set"}), 500
-        try:
-            credentials = Credentials.from_authorized_user_info(
-                json.loads(youtube_credentials_json)
-            )
-        except Exception as e:
-            return jsonify({"error": f"Failed to load YouTube credentials: {str(e)}"}), 500
-
-        try:
-            # Initialize YouTube API client
-            youtube = build("youtube", "v3", credentials=credentials)
-
-            # Prepare upload request
-            request_body = {
-                "snippet": {
-                    "title": title,
-                    "description": description,
-                    "tags": tags,
-                    "categoryId": category_id,
-                },
-                "status": {"privacyStatus": "private"},  # Start as private, can be changed later
-            }
-
-            # Execute upload
-            media = MediaFileUpload(video_file, mimetype="video/*", resumable=True)
-
-            upload_response = (
-                youtube.videos()
-                .insert(part="snippet,status", body=request_body, media_body=media)
-                .execute()
-            )
-
-            video_id = upload_response.get("id")
-
-            # Clean up the processed file
-            if os.path.exists(video_file):
-                os.unlink(video_file)
-
-            result = jsonify(
-                {
-                    "status": "success",
-                    "video_id": video_id,
-                    "video_url": f"https://www.youtube.com/watch?v={video_id}",
-                }
-            )
-            VIDEO_REQUESTS.labels(endpoint="/upload-to-youtube").inc()
-            return result
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        latency = time.time() - start_time
-        VIDEO_LATENCY.labels(endpoint="/upload-to-youtube").observe(latency)
-
-
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5003)
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import ffmpeg
+from cache import OutputCache, content_hasher
+from encoding import (
+    AUDIO_ENCODE_OPTIONS,
+    VIDEO_ENCODE_OPTIONS,
+    encode,
+    encode_command,
+    encode_path,
+    encode_preset,
+    encode_segmented,
+    plan_streams,
+    start,
+    wait,
+)
+from flask import Flask, Request, Response, jsonify, request
+from flask_cors import CORS
+from jobs import PRIORITIES, JobQueue
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from scratch import Scratch
+from streaming import UploadSink
+from youtube import ResumableUpload, SessionStore, YouTubeClient, chunk_size
+
+app = Flask(__name__)
+CORS(app)
+
+# Define metrics
+VIDEO_REQUESTS = Counter("video_requests_total", "Total video requests", ["endpoint"])
+VIDEO_LATENCY = Histogram("video_request_duration_seconds", "Video request latency", ["endpoint"])
+VIDEO_JOBS = Counter("video_jobs_total", "Finished transcode jobs", ["priority", "status"])
+VIDEO_QUEUE_WAIT = Histogram(
+    "video_job_queue_wait_seconds",
+    "Time transcode jobs wait for a worker",
+    ["priority"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+VIDEO_QUEUE_DEPTH = Gauge("video_job_queue_depth", "Transcode jobs waiting for a worker")
+VIDEO_JOBS_RUNNING = Gauge("video_jobs_running", "Transcode jobs being encoded")
+VIDEO_ENCODE_PATHS = Counter(
+    "video_encode_paths_total", "Processed videos by how they were encoded", ["path"]
+)
+VIDEO_ENCODE_CPU = Counter(
+    "video_encode_cpu_seconds_total", "CPU seconds spent in ffmpeg per encode path", ["path"]
+)
+VIDEO_ENCODE_SPEED = Histogram(
+    "video_encode_speed_ratio",
+    "Media seconds encoded per wall-clock second, per finished encode",
+    ["preset"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+VIDEO_ENCODE_SPEED_NOW = Gauge(
+    "video_encode_speed_current",
+    "Combined speed of the running encodes, as a multiple of real time",
+    ["preset"],
+)
+VIDEO_ENCODE_FPS_NOW = Gauge(
+    "video_encode_fps_current", "Combined frames per second of the running encodes", ["preset"]
+)
+VIDEO_CPU_SAVED = Counter(
+    "video_encode_cpu_saved_seconds_total",
+    "Estimated CPU seconds saved by remuxing instead of transcoding everything",
+)
+VIDEO_INGEST = Counter(
+    "video_uploads_ingested_total", "Uploads by whether they were piped or spooled", ["mode"]
+)
+VIDEO_SPOOLED_BYTES = Counter(
+    "video_upload_spooled_bytes_total", "Upload bytes written to temporary input files"
+)
+VIDEO_CACHE = Counter(
+    "video_output_cache_lookups_total", "Processed-video cache lookups", ["result"]
+)
+VIDEO_UPLOAD_BYTES = Counter("video_youtube_upload_bytes_total", "Bytes acknowledged by YouTube")
+VIDEO_UPLOAD_THROUGHPUT = Histogram(
+    "video_youtube_upload_throughput_bytes_per_second",
+    "Throughput of each acknowledged YouTube upload chunk",
+    buckets=(1e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8),
+)
+VIDEO_UPLOAD_RESUMES = Counter(
+    "video_youtube_upload_resumes_total", "YouTube uploads resumed from an acknowledged offset"
+)
+VIDEO_TOKEN_REFRESHES = Counter(
+    "video_youtube_token_refreshes_total", "YouTube OAuth token refreshes", ["result"]
+)
+VIDEO_SCRATCH_BYTES = Gauge(
+    "video_scratch_bytes", "Bytes of temporary files under the scratch root"
+)
+VIDEO_SCRATCH_QUOTA = Gauge("video_scratch_quota_bytes", "Quota of the scratch root")
+VIDEO_SCRATCH_COLLECTED = Counter(
+    "video_scratch_collected_bytes_total", "Bytes of expired temporary files deleted"
+)
+VIDEO_SCRATCH_REJECTED = Counter(
+    "video_scratch_rejected_total", "Uploads refused because scratch space was over quota"
+)
+VIDEO_CACHE_BYTES = Gauge("video_output_cache_bytes", "Size of the processed-video cache")
+
+CPU_COUNT = os.cpu_count() or 1
+# libx264 already spreads one encode over several cores, so run a few jobs at a time and
+# split the cores between them rather than one job per core
+TRANSCODE_WORKERS = int(os.environ.get("VIDEO_TRANSCODE_WORKERS", max(1, CPU_COUNT // 4)))
+ENCODER_THREADS = max(1, CPU_COUNT // TRANSCODE_WORKERS)
+# Videos at least this long are encoded as this many chunks in parallel; 1 disables it
+SEGMENT_COUNT = int(os.environ.get("VIDEO_SEGMENTS", max(1, ENCODER_THREADS // 4)))
+SEGMENT_MIN_SECONDS = float(os.environ.get("VIDEO_SEGMENT_MIN_SECONDS", "300"))
+# Pipe uploads in containers ffmpeg can read from stdin straight into the encoder
+STREAM_UPLOADS = os.environ.get("VIDEO_STREAM_UPLOADS", "true").lower() == "true"
+STREAMING_ENDPOINTS = {"process_video", "submit_job"}
+# Uploads, processed videos and other temporary files live here; uploads are refused
+# while it holds more than the quota, and files are deleted once their TTL is up
+SCRATCH_DIR = os.environ.get(
+    "VIDEO_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "video-scratch")
+)
+SCRATCH_QUOTA_BYTES = int(float(os.environ.get("VIDEO_SCRATCH_QUOTA_GB", "50")) * 1024**3)
+SCRATCH_TTL = float(os.environ.get("VIDEO_SCRATCH_TTL_HOURS", "24")) * 3600
+SCRATCH_COLLECT_SECONDS = 60
+# Processed videos kept by the hash of their source, so resubmitting one skips the encode
+CACHE_DIR = os.environ.get(
+    "VIDEO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "video-output-cache")
+)
+CACHE_MAX_BYTES = int(float(os.environ.get("VIDEO_CACHE_MAX_GB", "20")) * 1024**3)
+# Chunk size of YouTube uploads; a failed chunk is all that is sent again
+UPLOAD_CHUNK_SIZE = chunk_size(float(os.environ.get("VIDEO_UPLOAD_CHUNK_MB", "8")))
+# Session URIs of unfinished YouTube uploads; keep on a volume to resume after a restart
+UPLOAD_SESSIONS_DIR = os.environ.get(
+    "VIDEO_UPLOAD_SESSIONS_DIR", os.path.join(tempfile.gettempdir(), "youtube-upload-sessions")
+)
+# Part of every cache key, so changing how videos are encoded misses the old entries
+ENCODER_SETTINGS = json.dumps([VIDEO_ENCODE_OPTIONS, AUDIO_ENCODE_OPTIONS], sort_keys=True)
+
+job_queue = JobQueue(TRANSCODE_WORKERS)
+# CPU per second of video of full transcodes so far, to estimate what remuxing saves
+transcode_cost = {"cpu_seconds": 0.0, "media_seconds": 0.0}
+transcode_cost_lock = threading.Lock()
+scratch = Scratch(SCRATCH_DIR, SCRATCH_QUOTA_BYTES, SCRATCH_TTL)
+VIDEO_SCRATCH_BYTES.set_function(lambda: scratch.usage())
+VIDEO_SCRATCH_QUOTA.set(SCRATCH_QUOTA_BYTES)
+output_cache = OutputCache(CACHE_DIR, CACHE_MAX_BYTES)
+VIDEO_CACHE_BYTES.set_function(lambda: output_cache.size)
+upload_sessions = SessionStore(UPLOAD_SESSIONS_DIR)
+# The YouTube client for the credentials it was built from, built on first use
+youtube_clients = {}
+youtube_clients_lock = threading.Lock()
+# job id -> (preset, latest progress report) of the encodes running now
+live_encodes = {}
+live_encodes_lock = threading.Lock()
+VIDEO_QUEUE_DEPTH.set_function(lambda: job_queue.depth)
+VIDEO_JOBS_RUNNING.set_function(lambda: job_queue.running)
+
+
+def transcode(input_path, output_path, job=None):
+    """Produce a YouTube-ready MP4, re-encoding only the streams that are not compliant.
+
+    Long videos whose video must be re-encoded are encoded in keyframe-aligned chunks
+    in parallel. Returns the path taken (remux, partial or transcode) and the CPU seconds
+    ffmpeg used. The progress of the encode is reported on `job`.
+    """
+    probe = ffmpeg.probe(input_path)
+    plan = plan_streams(probe)
+    duration = float(probe.get("format", {}).get("duration", 0))
+    on_progress = None if job is None else track_progress(job, encode_preset(plan), duration)
+    if plan["video"] == "encode" and SEGMENT_COUNT > 1 and duration >= SEGMENT_MIN_SECONDS:
+        cpu_seconds = encode_segmented(
+            input_path,
+            output_path,
+            plan,
+            duration,
+            SEGMENT_COUNT,
+            threads=ENCODER_THREADS,
+            on_progress=on_progress,
+        )
+    else:
+        cpu_seconds = encode(
+            input_path, output_path, plan, threads=ENCODER_THREADS, on_progress=on_progress
+        )
+    return encode_path(plan), cpu_seconds
+
+
+def track_progress(job, preset, duration):
+    """Callback for ffmpeg progress reports of the job's encode.
+
+    Keeps the latest report in job.details, turns out_time into job.progress when the
+    duration is known, and feeds the live speed gauges; the final report's speed goes
+    to the speed histogram.
+    """
+
+    def update(report):
+        job.details = {name: value for name, value in report.items() if name != "done"}
+        if duration and report["out_time"] is not None:
+            job.progress = min(0.99, report["out_time"] / duration)
+        with live_encodes_lock:
+            if report["done"]:
+                live_encodes.pop(job.id, None)
+            else:
+                live_encodes[job.id] = (preset, report)
+        if report["done"] and report["speed"]:
+            VIDEO_ENCODE_SPEED.labels(preset=preset).observe(report["speed"])
+
+    return update
+
+
+def live_encode_total(preset, name):
+    """Sum of one progress value over the running encodes with this preset"""
+    with live_encodes_lock:
+        return sum(report[name] or 0 for kind, report in live_encodes.values() if kind == preset)
+
+
+for preset in ("copy", VIDEO_ENCODE_OPTIONS["preset"]):
+    VIDEO_ENCODE_SPEED_NOW.labels(preset=preset).set_function(
+        lambda preset=preset: live_encode_total(preset, "speed")
+    )
+    VIDEO_ENCODE_FPS_NOW.labels(preset=preset).set_function(
+        lambda preset=preset: live_encode_total(preset, "fps")
+    )
+
+
+def record_encode(path, cpu_seconds, duration):
+    """Count the path taken and estimate the CPU a full transcode would have cost"""
+    VIDEO_ENCODE_PATHS.labels(path=path).inc()
+    VIDEO_ENCODE_CPU.labels(path=path).inc(cpu_seconds)
+    with transcode_cost_lock:
+        if path == "transcode":
+            transcode_cost["cpu_seconds"] += cpu_seconds
+            transcode_cost["media_seconds"] += duration
+        elif transcode_cost["media_seconds"] > 0:
+            ratio = transcode_cost["cpu_seconds"] / transcode_cost["media_seconds"]
+            VIDEO_CPU_SAVED.inc(max(0.0, ratio * duration - cpu_seconds))
+
+
+def youtube_client(credentials_json):
+    """The shared YouTubeClient for YOUTUBE_CREDENTIALS, refreshing its token in the background"""
+    with youtube_clients_lock:
+        client = youtube_clients.get(credentials_json)
+        if client is None:
+            client = YouTubeClient(
+                json.loads(credentials_json),
+                on_refresh=lambda succeeded: VIDEO_TOKEN_REFRESHES.labels(
+                    result="succeeded" if succeeded else "failed"
+                ).inc(),
+            ).start()
+            for stale in youtube_clients.values():
+                stale.stop()
+            youtube_clients.clear()
+            youtube_clients[credentials_json] = client
+        return client
+
+
+def record_upload_chunk(sent, seconds):
+    """Count bytes YouTube acknowledged and the throughput of the chunk that carried them"""
+    VIDEO_UPLOAD_BYTES.inc(sent)
+    if seconds > 0:
+        VIDEO_UPLOAD_THROUGHPUT.observe(sent / seconds)
+
+
+def cache_key(digest):
+    """Output cache key for an upload with this content hash"""
+    return hashlib.blake2b(
+        f"{ENCODER_SETTINGS}:{digest}".encode("utf-8"), digest_size=32
+    ).hexdigest()
+
+
+def finish_job(job, output_path, encode, digest):
+    """Run `encode()` -> (path, cpu_seconds) into output_path; returns the job result.
+
+    The output is cached under the upload's hash, `digest()`, which is only read once
+    the encode is done, after the whole upload has arrived.
+    """
+    VIDEO_QUEUE_WAIT.labels(priority=job.priority).observe(job.wait_time)
+    try:
+        try:
+            path, cpu_seconds = encode()
+        finally:
+            with live_encodes_lock:
+                live_encodes.pop(job.id, None)
+
+        # Get file size and duration for metrics
+        probe = ffmpeg.probe(output_path)
+        result = {
+            "processed_file": output_path,
+            "duration": float(probe["format"]["duration"]),
+            "file_size": os.path.getsize(output_path),
+            "encode_path": path,
+        }
+        record_encode(path, cpu_seconds, result["duration"])
+        metadata = {name: value for name, value in result.items() if name != "processed_file"}
+        output_cache.put(cache_key(digest()), output_path, metadata)
+        # The output expires from now if it is not uploaded
+        scratch.track(output_path, owner=job.id)
+    except Exception:
+        scratch.release(output_path)
+        status = "cancelled" if job.cancelled else "failed"
+        VIDEO_JOBS.labels(priority=job.priority, status=status).inc()
+        raise
+    VIDEO_JOBS.labels(priority=job.priority, status="succeeded").inc()
+    return result
+
+
+def process_job(job, input_path, digest):
+    """Transcode a saved upload; returns the processed file, its duration and size"""
+    output_path = scratch.create(".mp4", owner=job.id)
+    scratch.hold(output_path, owner=job.id)
+    try:
+        return finish_job(
+            job, output_path, lambda: transcode(input_path, output_path, job), lambda: digest
+        )
+    finally:
+        # Clean up input file once processing is complete
+        scratch.release(input_path)
+
+
+def start_streamed_job(sink, probe):
+    """Start ffmpeg on stdin for an upload whose head was probed; None to spool instead.
+
+    Only starts when a transcode worker is free, so the encode runs now and still counts
+    against the pool: the job holds the worker while it waits for ffmpeg to finish and
+    reads its progress. If another upload takes the last worker first, ffmpeg is stopped
+    again and this upload is spooled.
+    """
+    if not job_queue.idle:
+        return None
+    try:
+        plan = plan_streams(probe)
+    except ValueError:
+        # Spooled and probed again in full, which reports the error
+        return None
+    # The head of a streamable container often carries no duration; progress then
+    # stays at 0 while the job's details still show how far the encode got
+    duration = float(probe.get("format", {}).get("duration", 0))
+    output_path = scratch.create(".mp4", owner="upload")
+    command = encode_command("pipe:0", output_path, plan, threads=ENCODER_THREADS)
+    process = start(command, pipe_stdin=True, progress=True)
+    path = encode_path(plan)
+
+    def encode_streamed(job):
+        on_progress = track_progress(job, encode_preset(plan), duration)
+        return path, wait(process, on_progress)
+
+    job = job_queue.try_submit(
+        lambda job: finish_job(job, output_path, lambda: encode_streamed(job), lambda: sink.digest)
+    )
+    if job is None:
+        process.kill()
+        process.communicate()
+        scratch.release(output_path)
+        return None
+    scratch.hold(output_path, owner=job.id)
+    return process, job
+
+
+class VideoRequest(Request):
+    """Request whose video uploads are piped into ffmpeg while they arrive"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, **kwargs):
+        if not STREAM_UPLOADS or self.endpoint not in STREAMING_ENDPOINTS:
+            return super()._get_file_stream(
+                total_content_length, content_type, filename=filename, **kwargs
+            )
+        # Form fields may come after the file, so the job starts with the default
+        # priority; it only orders queued jobs, and a piped upload never waits
+        return UploadSink(start_streamed_job, spool_dir=scratch.root)
+
+
+app.request_class = VideoRequest
+
+
+def save_upload(video_file, path):
+    """Save an upload that was not streamed to a sink; returns its content hash"""
+    hasher = content_hasher()
+    with open(path, "wb") as f:
+        for chunk in iter(lambda: video_file.stream.read(1024 * 1024), b""):
+            hasher.update(chunk)
+            f.write(chunk)
+    return hasher.hexdigest()
+
+
+def cached_result(digest):
+    """Result of an earlier job on the same source, linked to a new file; None on a miss"""
+    output_path = scratch.create(".mp4", owner="cache")
+    metadata = output_cache.get(cache_key(digest), output_path)
+    VIDEO_CACHE.labels(result="miss" if metadata is None else "hit").inc()
+    if metadata is None:
+        scratch.release(output_path)
+        return None
+    return {**metadata, "processed_file": output_path, "cached": True}
+
+
+def submit_upload(video_file, priority):
+    """Queue the transcode of an uploaded video, unless it was already piped to ffmpeg.
+
+    An upload whose content was processed before is not encoded again: the returned Job
+    has already succeeded with the cached output.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    sink = video_file.stream
+    if isinstance(sink, UploadSink):
+        sink.finish()
+        digest = sink.digest
+        VIDEO_INGEST.labels(mode="streamed" if sink.streaming else "spooled").inc()
+        VIDEO_SPOOLED_BYTES.inc(sink.spooled_bytes)
+    else:
+        sink = None
+        input_path = scratch.create(".mp4", owner="upload")
+        digest = save_upload(video_file, input_path)
+        # Kept until its job is done with it, however long it waits in the queue
+        scratch.hold(input_path, owner="upload")
+        VIDEO_INGEST.labels(mode="spooled").inc()
+        VIDEO_SPOOLED_BYTES.inc(os.path.getsize(input_path))
+
+    result = cached_result(digest)
+    if result is not None:
+        # Stops a piped encode or deletes the saved input
+        if sink is not None:
+            sink.close()
+        else:
+            scratch.release(input_path)
+        job = job_queue.record(result, priority)
+        scratch.track(result["processed_file"], owner=job.id)
+        return job
+
+    if sink is not None:
+        sink.claim()
+        if sink.streaming:
+            sink.job.priority = priority
+            return sink.job
+        input_path = sink.spool_path
+        scratch.hold(input_path, owner="upload")
+    return job_queue.submit(lambda job: process_job(job, input_path, digest), priority)
+
+
+def scratch_full():
+    """Error response when scratch space cannot take this upload and its output, else None"""
+    if scratch.has_room(2 * (request.content_length or 0)):
+        return None
+    VIDEO_SCRATCH_REJECTED.inc()
+    message = "Not enough scratch space for the video, try again later"
+    return jsonify({"error": message}), 507
+
+
+@app.route("/metrics")
+def metrics():
+    """Expose metrics for Prometheus"""
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+@app.route("/process-video", methods=["POST"])
+def process_video():
+    """Process and prepare video for upload, waiting for the transcode to finish.
+
+    The encode still runs on the job queue, so concurrent requests never run more
+    encodes than there are transcode workers.
+    """
+    start_time = time.time()
+    try:
+        full = scratch_full()
+        if full is not None:
+            return full
+        if "video" not in request.files:
+            return jsonify({"error": "No video file provided"}), 400
+        priority = request.form.get("priority", "normal")
+        if priority not in PRIORITIES:
+            return jsonify({"error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+
+        job = submit_upload(request.files["video"], priority)
+        job.done.wait()
+        if job.error is not None:
+            return jsonify({"error": job.error}), 500
+
+        result = jsonify({"status": "success", **job.result})
+        VIDEO_REQUESTS.labels(endpoint="/process-video").inc()
+        return result
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        VIDEO_LATENCY.labels(endpoint="/process-video").observe(latency)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue a video for processing and return its job id at once.
+
+    `priority` (form field) is high, normal or low. Poll GET /jobs/<job_id> for the
+    status, progress and, once it succeeded, the same result /process-video returns.
+    Both answer 507 while the scratch space is too full for the upload and its output.
+    """
+    start_time = time.time()
+    try:
+        full = scratch_full()
+        if full is not None:
+            return full
+        if "video" not in request.files:
+            return jsonify({"error": "No video file provided"}), 400
+        priority = request.form.get("priority", "normal")
+        if priority not in PRIORITIES:
+            return jsonify({"error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+
+        job = submit_upload(request.files["video"], priority)
+        result = jsonify(
+            {
+                "status": "queued",
+                "job_id": job.id,
+                "status_url": f"/jobs/{job.id}",
+                "queue_depth": job_queue.depth,
+            }
+        )
+        VIDEO_REQUESTS.labels(endpoint="/jobs").inc()
+        return result, 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        VIDEO_LATENCY.labels(endpoint="/jobs").observe(latency)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Status, progress and result of a queued video job"""
+    start_time = time.time()
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": f"No job with id: {job_id}"}), 404
+        VIDEO_REQUESTS.labels(endpoint="/jobs/<id>").inc()
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        VIDEO_LATENCY.labels(endpoint="/jobs/<id>").observe(latency)
+
+
+@app.route("/upload-to-youtube", methods=["POST"])
+def upload_to_youtube():
+    """Upload processed video to YouTube with generated SEO content"""
+    start_time = time.time()
+    try:
+        data = request.json
+        video_file = data.get("video_file")
+        title = data.get("title")
+        description = data.get("description")
+        tags = data.get("tags", [])
+        category_id = data.get("category_id", "22")  # Default to People & Blogs
+
+        if not all([video_file, title, description]):
+            return jsonify({"error": "Missing required parameters"}), 400
+        # Only videos this service processed are uploaded (and deleted afterwards)
+        if not scratch.contains(video_file):
+            return jsonify({"error": "video_file is not a processed video"}), 400
+
+        youtube_credentials_json = os.environ.get("YOUTUBE_CREDENTIALS")
+        if not youtube_credentials_json:
+            return jsonify({"error": "YOUTUBE_CREDENTIALS environment variable is not set"}), 500
+        try:
+            client = youtube_client(youtube_credentials_json)
+        except Exception as e:
+            return jsonify({"error": f"Failed to load YouTube credentials: {str(e)}"}), 500
+
+        try:
+            # Prepare upload request
+            request_body = {
+                "snippet": {
+                    "title": title,
+                    "description": description,
+                    "tags": tags,
+                    "categoryId": category_id,
+                },
+                "status": {"privacyStatus": "private"},  # Start as private, can be changed later
+            }
+
+            # Upload in chunks, resuming from what YouTube acknowledged after a failure
+            uploader = ResumableUpload(
+                client.session,
+                upload_sessions,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                on_chunk=record_upload_chunk,
+                on_resume=VIDEO_UPLOAD_RESUMES.inc,
+            )
+            upload_response = uploader.upload(video_file, request_body)
+
+            video_id = upload_response.get("id")
+
+            # Clean up the processed file
+            scratch.release(video_file)
+
+            result = jsonify(
+                {
+                    "status": "success",
+                    "video_id": video_id,
+                    "video_url": f"https://www.youtube.com/watch?v={video_id}",
+                }
+            )
+            VIDEO_REQUESTS.labels(endpoint="/upload-to-youtube").inc()
+            return result
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        latency = time.time() - start_time
+        VIDEO_LATENCY.labels(endpoint="/upload-to-youtube").observe(latency)
+
+
+if __name__ == "__main__":
+    scratch.start_collector(
+        SCRATCH_COLLECT_SECONDS,
+        on_collect=lambda files, freed: VIDEO_SCRATCH_COLLECTED.inc(freed),
+    )
+    app.run(host="0.0.0.0", port=5003)
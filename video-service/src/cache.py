@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+
+def content_hasher():
+    """BLAKE2b hasher for the bytes of an upload, updated chunk by chunk as they arrive"""
+    return hashlib.blake2b(digest_size=32)
+
+
+def link(source, target):
+    """Make target a hard link to source, replacing it; copies across file systems"""
+    temp = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(source, temp)
+    except OSError:
+        shutil.copyfile(source, temp)
+    os.replace(temp, target)
+
+
+class OutputCache:
+    """Processed videos on disk keyed by a hash of their source.
+
+    Each entry is `<key>.mp4` plus its result metadata in `<key>.json`. Files go in and
+    out as hard links, so a hit is instant and a caller deleting its copy leaves the
+    entry intact. Entries beyond `max_bytes` are evicted least recently used first;
+    the use order survives restarts through the files' modification times.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = 0
+        # key -> size, least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        found = []
+        for name in os.listdir(root):
+            key, extension = os.path.splitext(name)
+            if extension == ".mp4" and os.path.exists(self._path(key, ".json")):
+                stat = os.stat(os.path.join(root, name))
+                found.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        with self._lock:
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key, extension=".mp4"):
+        return os.path.join(self.root, key + extension)
+
+    def get(self, key, target_path):
+        """Link the cached output for `key` to target_path; returns its metadata or None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            path = self._path(key)
+            os.utime(path)
+            link(path, target_path)
+            with open(self._path(key, ".json")) as f:
+                return json.load(f)
+
+    def put(self, key, path, metadata):
+        """Store a processed file and its metadata under `key`, evicting old entries"""
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            temp = f"{self._path(key, '.json')}.tmp"
+            with open(temp, "w") as f:
+                json.dump(metadata, f)
+            os.replace(temp, self._path(key, ".json"))
+            link(path, self._path(key))
+            os.utime(self._path(key))
+            self._entries[key] = size
+            self.size += size
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            for extension in (".mp4", ".json"):
+                if os.path.exists(self._path(key, extension)):
+                    os.unlink(self._path(key, extension))
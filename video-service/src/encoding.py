@@ -0,0 +1,297 @@
+import os
+import shutil
+import tempfile
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+
+# What YouTube ingests without re-encoding on our side: H.264 8-bit 4:2:0 progressive
+# video and AAC audio at a standard sample rate, in an MP4 with the index up front
+VIDEO_CODECS = {"h264"}
+PIXEL_FORMATS = {"yuv420p", "yuvj420p"}
+AUDIO_CODECS = {"aac"}
+AUDIO_SAMPLE_RATES = {44100, 48000}
+MAX_AUDIO_CHANNELS = 6
+
+VIDEO_ENCODE_OPTIONS = {"vcodec": "libx264", "preset": "medium", "crf": 23, "pix_fmt": "yuv420p"}
+AUDIO_ENCODE_OPTIONS = {"acodec": "aac", "audio_bitrate": "128k"}
+# Makes ffmpeg write key=value progress reports to stdout instead of stats to stderr
+PROGRESS_ARGS = ("-progress", "pipe:1", "-nostats")
+
+
+def _first_stream(probe, codec_type):
+    for stream in probe.get("streams", []):
+        # Cover art shows up as a single-frame video stream
+        if stream.get("codec_type") == codec_type and not stream.get("disposition", {}).get(
+            "attached_pic"
+        ):
+            return stream
+    return None
+
+
+def video_compliant(stream):
+    return (
+        stream.get("codec_name") in VIDEO_CODECS
+        and stream.get("pix_fmt") in PIXEL_FORMATS
+        and stream.get("field_order", "progressive") in ("progressive", "unknown")
+    )
+
+
+def audio_compliant(stream):
+    return (
+        stream.get("codec_name") in AUDIO_CODECS
+        and int(stream.get("sample_rate", 0)) in AUDIO_SAMPLE_RATES
+        and int(stream.get("channels", 0)) <= MAX_AUDIO_CHANNELS
+    )
+
+
+def plan_streams(probe):
+    """How to produce each stream of a YouTube-ready MP4 from an `ffmpeg.probe()` result.
+
+    Returns {"video": ..., "audio": ...} with "copy", "encode" or None for a missing stream,
+    and under "streams" the input index of each chosen stream, which the commands map so
+    that cover art is never picked up.
+    """
+    video = _first_stream(probe, "video")
+    audio = _first_stream(probe, "audio")
+    if video is None:
+        raise ValueError("The upload has no video stream")
+    return {
+        "video": "copy" if video_compliant(video) else "encode",
+        "audio": None if audio is None else "copy" if audio_compliant(audio) else "encode",
+        "streams": {"video": video["index"], "audio": None if audio is None else audio["index"]},
+    }
+
+
+def encode_path(plan):
+    """Name of the path a plan takes: remux (all copied), transcode (none) or partial"""
+    actions = {plan[kind] for kind in ("video", "audio") if plan[kind] is not None}
+    if actions == {"copy"}:
+        return "remux"
+    if actions == {"encode"}:
+        return "transcode"
+    return "partial"
+
+
+def encode_preset(plan):
+    """x264 preset the video of a plan is encoded with, or "copy" """
+    return "copy" if plan["video"] == "copy" else VIDEO_ENCODE_OPTIONS["preset"]
+
+
+def _number(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        # "N/A" until ffmpeg knows
+        return None
+
+
+def progress_blocks(lines):
+    """Parse ffmpeg `-progress` output as it arrives, yielding one dict per report.
+
+    Each report has frame, fps, speed (a multiple of real time), out_time (seconds of
+    output written) and done, the last report's flag; unknown values are None.
+    """
+    block = {}
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            continue
+        if key != "progress":
+            block[key] = value.strip()
+            continue
+        out_time_us = _number(block.get("out_time_us"), int)
+        yield {
+            "frame": _number(block.get("frame"), int),
+            "fps": _number(block.get("fps")),
+            "speed": _number(block.get("speed", "").rstrip("x")),
+            "out_time": None if out_time_us is None else max(0.0, out_time_us / 1e6),
+            "done": value.strip() == "end",
+        }
+        block = {}
+
+
+def start(stream, pipe_stdin=False, progress=False):
+    """Start an ffmpeg command with stderr piped, and progress reports on stdout if wanted"""
+    if progress:
+        stream = stream.global_args(*PROGRESS_ARGS)
+    return stream.run_async(
+        pipe_stdin=pipe_stdin,
+        pipe_stdout=progress,
+        pipe_stderr=True,
+        overwrite_output=True,
+    )
+
+
+def run(stream, on_progress=None):
+    """Run an ffmpeg command; returns the CPU seconds it used.
+
+    `on_progress(report)` gets each progress_blocks() report while it runs. Raises
+    ffmpeg.Error with ffmpeg's stderr if it fails.
+    """
+    return wait(start(stream, progress=on_progress is not None), on_progress)
+
+
+def wait(process, on_progress=None):
+    """Wait for an ffmpeg process from start(); returns the CPU seconds it used"""
+    if process.stdout is not None:
+        # Drain stderr alongside, or ffmpeg blocks once its pipe fills
+        errors = []
+        reader = threading.Thread(target=lambda: errors.append(process.stderr.read()))
+        reader.start()
+        for report in progress_blocks(process.stdout):
+            if on_progress is not None:
+                on_progress(report)
+        process.stdout.close()
+        reader.join()
+        stderr = errors[0]
+    else:
+        stderr = process.stderr.read()
+    process.stderr.close()
+    # wait4() reports this child's own CPU time, whatever other encodes are running
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise ffmpeg.Error("ffmpeg", None, stderr)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _encode_options(plan, threads):
+    options = {"movflags": "+faststart", "threads": threads}
+    if plan["video"] == "copy":
+        options["vcodec"] = "copy"
+    else:
+        options.update(VIDEO_ENCODE_OPTIONS)
+    if plan["audio"] == "copy":
+        options["acodec"] = "copy"
+    elif plan["audio"] == "encode":
+        options.update(AUDIO_ENCODE_OPTIONS)
+    return options
+
+
+def encode(input_path, output_path, plan, threads=0, on_progress=None):
+    """Write a faststart MP4, copying or encoding each stream as planned.
+
+    Returns the CPU seconds ffmpeg used.
+    """
+    return run(encode_command(input_path, output_path, plan, threads), on_progress)
+
+
+def encode_command(input_path, output_path, plan, threads=0):
+    """The ffmpeg command encode() runs; "pipe:0" reads the input from stdin"""
+    source = ffmpeg.input(input_path)
+    streams = [source[str(plan["streams"]["video"])]]
+    if plan["audio"] is not None:
+        streams.append(source[str(plan["streams"]["audio"])])
+    return ffmpeg.output(*streams, output_path, **_encode_options(plan, threads))
+
+
+def keyframe_times(input_path, stream="v:0"):
+    """Sorted timestamps of the keyframes of a video stream (a stream specifier, such as
+    its index), read from packet flags without decoding"""
+    probe = ffmpeg.probe(input_path, select_streams=stream, show_entries="packet=pts_time,flags")
+    return sorted(
+        float(packet["pts_time"])
+        for packet in probe.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+
+
+def split_points(keyframes, duration, segments):
+    """Keyframe times nearest to `segments` equal parts of `duration`, without repeats"""
+    points = []
+    for i in range(1, segments):
+        target = duration * i / segments
+        after = bisect_left(keyframes, target)
+        first = max(0, after - 1)
+        nearby = keyframes[first:][:2]
+        nearest = min(nearby, key=lambda time: abs(time - target))
+        if nearest > (points[-1] if points else 0.0) and nearest < duration:
+            points.append(nearest)
+    return points
+
+
+def combined_progress(count, on_progress):
+    """Callbacks for `count` ffmpeg processes at once, reported to on_progress as one.
+
+    Frames, fps, speed and out_time are summed over the latest report of each process,
+    so out_time is the media encoded so far and speed the combined multiple of real time.
+    """
+    latest = [None] * count
+    lock = threading.Lock()
+
+    def update(i, report):
+        with lock:
+            latest[i] = report
+            reports = [report for report in latest if report is not None]
+            combined = {
+                name: sum(report[name] or 0 for report in reports)
+                for name in ("frame", "fps", "speed", "out_time")
+            }
+            combined["done"] = len(reports) == count and all(r["done"] for r in reports)
+        on_progress(combined)
+
+    return [lambda report, i=i: update(i, report) for i in range(count)]
+
+
+def encode_segmented(
+    input_path, output_path, plan, duration, segments, threads=0, on_progress=None
+):
+    """Encode the video as `segments` keyframe-aligned chunks at once, then concatenate.
+
+    Each chunk is cut at a keyframe and encoded by its own ffmpeg process, sharing
+    `threads` between them; the audio track is encoded (or copied) whole in parallel, so
+    it has no seams. The encoded chunks are joined and muxed with the audio by stream
+    copy. Falls back to encode() when the video has too few keyframes to split.
+    Returns the CPU seconds of all the ffmpeg processes; `on_progress` gets the combined
+    progress of the chunks.
+    """
+    keyframes = keyframe_times(input_path, str(plan["streams"]["video"]))
+    points = split_points(keyframes, duration, segments) if keyframes else []
+    if not points:
+        return encode(input_path, output_path, plan, threads, on_progress)
+
+    bounds = list(zip([0.0] + points, points + [None]))
+    chunk_threads = max(1, threads // len(bounds)) if threads else 0
+    workdir = tempfile.mkdtemp(prefix="segments-", dir=os.path.dirname(output_path) or None)
+    try:
+        chunk_paths = []
+        commands = []
+        for i, (start, end) in enumerate(bounds):
+            chunk_path = os.path.join(workdir, f"chunk-{i:04d}.mp4")
+            chunk_paths.append(chunk_path)
+            cut = {"ss": start} if end is None else {"ss": start, "t": end - start}
+            video = ffmpeg.input(input_path, **cut)[str(plan["streams"]["video"])]
+            commands.append(video.output(chunk_path, threads=chunk_threads, **VIDEO_ENCODE_OPTIONS))
+        audio_path = os.path.join(workdir, "audio.m4a")
+        if plan["audio"] is not None:
+            audio_options = {"acodec": "copy"} if plan["audio"] == "copy" else AUDIO_ENCODE_OPTIONS
+            commands.append(
+                ffmpeg.input(input_path)[str(plan["streams"]["audio"])].output(
+                    audio_path, **audio_options
+                )
+            )
+        callbacks = [None] * len(commands)
+        if on_progress is not None:
+            callbacks[: len(bounds)] = combined_progress(len(bounds), on_progress)
+        with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+            # Each ffmpeg is its own process; the threads only wait on them
+            cpu_seconds = sum(pool.map(run, commands, callbacks))
+
+        list_path = os.path.join(workdir, "chunks.txt")
+        with open(list_path, "w") as f:
+            for chunk_path in chunk_paths:
+                escaped = chunk_path.replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        streams = [ffmpeg.input(list_path, f="concat", safe=0)["v:0"]]
+        if plan["audio"] is not None:
+            streams.append(ffmpeg.input(audio_path)["a:0"])
+        return cpu_seconds + run(
+            ffmpeg.output(*streams, output_path, c="copy", movflags="+faststart")
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,160 @@
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+# Finished jobs kept for status polling; the oldest are forgotten first
+MAX_FINISHED_JOBS = 1000
+
+
+class Job:
+    """One unit of background work and the state reported to pollers"""
+
+    def __init__(self, task, priority):
+        self.id = uuid.uuid4().hex
+        self.task = task
+        self.priority = priority
+        self.status = "queued"
+        self.progress = 0.0
+        # Latest progress report of the work, such as frame, fps and speed of an encode
+        self.details = {}
+        self.result = None
+        self.error = None
+        # Set when the job's work is abandoned; its failure is then reported as cancelled
+        self.cancelled = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    @property
+    def wait_time(self):
+        """Seconds spent queued, so far or in total"""
+        return (self.started_at or time.time()) - self.submitted_at
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": round(self.progress, 4),
+            "details": self.details,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """Priority queue drained by a fixed pool of worker threads.
+
+    A task is called with its Job, may update `job.progress`, and returns the job result;
+    an exception marks the job failed. Jobs of equal priority run in submission order.
+    Workers start with the first submission.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, workers)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._jobs = OrderedDict()
+        self._finished = 0
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def depth(self):
+        """Jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    @property
+    def running(self):
+        with self._lock:
+            return sum(job.status == "running" for job in self._jobs.values())
+
+    @property
+    def idle(self):
+        """Whether a job submitted now would start at once"""
+        return self.running + self.depth < self.workers
+
+    def submit(self, task, priority="normal"):
+        return self._submit(task, priority, only_if_idle=False)
+
+    def try_submit(self, task, priority="normal"):
+        """Submit a job only if a worker is free to start it at once; None otherwise.
+
+        The check and the submission happen under one lock, so two callers never both
+        take the last free worker.
+        """
+        return self._submit(task, priority, only_if_idle=True)
+
+    def _submit(self, task, priority, only_if_idle):
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        job = Job(task, priority)
+        with self._lock:
+            if only_if_idle:
+                # Queued and running jobs alike hold a worker until they are done
+                busy = sum(not other.done.is_set() for other in self._jobs.values())
+                if busy >= self.workers:
+                    return None
+            self._jobs[job.id] = job
+            if not self._started:
+                self._started = True
+                for i in range(self.workers):
+                    threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+        self._queue.put((PRIORITIES[priority], next(self._order), job))
+        return job
+
+    def record(self, result, priority="normal"):
+        """Register a job that is already done, such as one served from a cache"""
+        job = Job(None, priority)
+        job.started_at = job.finished_at = job.submitted_at
+        job.result = result
+        job.progress = 1.0
+        job.status = "succeeded"
+        job.done.set()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._forget_old()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            job.started_at = time.time()
+            job.status = "running"
+            try:
+                job.result = job.task(job)
+                job.progress = 1.0
+                job.status = "succeeded"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "cancelled" if job.cancelled else "failed"
+            finally:
+                job.finished_at = time.time()
+                job.task = None
+                job.done.set()
+                self._forget_old()
+
+    def _forget_old(self):
+        with self._lock:
+            self._finished += 1
+            if self._finished <= MAX_FINISHED_JOBS:
+                return
+            for job_id, job in list(self._jobs.items()):
+                if job.done.is_set():
+                    del self._jobs[job_id]
+                    self._finished -= 1
+                    if self._finished <= MAX_FINISHED_JOBS:
+                        return
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import threading
+import time
+
+
+class Scratch:
+    """Temporary files of video jobs under one root, with a byte quota and expiry.
+
+    Every file made with create() or handed to track() is recorded with its owner (a
+    job id, or what else holds it) and an expiry time. A file handed to hold() has no
+    expiry until it is tracked again, which is how inputs and outputs of jobs that have
+    not finished are kept. collect() deletes tracked files past their expiry, plus
+    untracked files in the root older than `ttl`, such as those left by an earlier
+    process. Callers check has_room() before taking on more work.
+
+    usage() is a running total: tracked files count with their size when last tracked,
+    and each collect() pass recounts everything under the root.
+    """
+
+    def __init__(self, root, quota_bytes, ttl):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        # path -> (owner, expires_at or None while held, size)
+        self._artifacts = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def create(self, suffix, owner, ttl=None):
+        """Path of a new empty file in the scratch root, tracked for `owner`"""
+        handle, path = tempfile.mkstemp(suffix=suffix, dir=self.root)
+        os.close(handle)
+        self.track(path, owner, ttl)
+        return path
+
+    def track(self, path, owner, ttl=None):
+        """Record (or re-record) who holds a file and for how long"""
+        self._record(path, owner, time.time() + (self.ttl if ttl is None else ttl))
+
+    def hold(self, path, owner):
+        """Record a file that must not expire, such as the input of a queued job"""
+        self._record(path, owner, None)
+
+    def _record(self, path, owner, expires_at):
+        try:
+            size = os.lstat(path).st_size
+        except FileNotFoundError:
+            size = 0
+        with self._lock:
+            previous = self._artifacts.get(path)
+            self._bytes += size - (previous[2] if previous is not None else 0)
+            self._artifacts[path] = (owner, expires_at, size)
+
+    def contains(self, path):
+        """Whether path, with symlinks resolved, is under the root"""
+        root = os.path.realpath(self.root)
+        return os.path.realpath(path).startswith(root + os.sep)
+
+    def release(self, path):
+        """Delete a file and forget it; untracked files outside the root are left alone"""
+        with self._lock:
+            artifact = self._artifacts.pop(path, None)
+            if artifact is not None:
+                self._bytes = max(0, self._bytes - artifact[2])
+        if (artifact is not None or self.contains(path)) and os.path.exists(path):
+            os.unlink(path)
+
+    def usage(self):
+        """Bytes used under the root, as of the last change made through this object"""
+        with self._lock:
+            return self._bytes
+
+    def has_room(self, needed=0):
+        return self.usage() + needed <= self.quota_bytes
+
+    def collect(self):
+        """Delete expired files and recount usage; returns the files and bytes reclaimed"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                path
+                for path, (_, expires_at, _) in self._artifacts.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for path in expired:
+                del self._artifacts[path]
+            tracked = set(self._artifacts)
+        for entry in os.scandir(self.root):
+            if entry.is_file(follow_symlinks=False) and entry.path not in tracked:
+                if entry.path not in expired and entry.stat().st_mtime + self.ttl <= now:
+                    expired.append(entry.path)
+        files = freed = 0
+        for path in expired:
+            try:
+                size = os.lstat(path).st_size
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            files += 1
+            freed += size
+
+        sizes = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    sizes[path] = os.lstat(path).st_size
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            # Files tracked since the walk keep the size they were tracked with
+            for path, (owner, expires_at, size) in list(self._artifacts.items()):
+                self._artifacts[path] = (owner, expires_at, sizes.setdefault(path, size))
+            self._bytes = sum(sizes.values())
+        return files, freed
+
+    def start_collector(self, interval=60.0, on_collect=None):
+        """Run collect() every `interval` seconds in a daemon thread.
+
+        `on_collect(files, bytes)` reports each pass. Returns an Event that stops the
+        collector when set.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    files, freed = self.collect()
+                except Exception as e:
+                    print(f"Error collecting video scratch space: {e}")
+                    continue
+                if on_collect is not None:
+                    on_collect(files, freed)
+
+        threading.Thread(target=run, name="scratch-collector", daemon=True).start()
+        return stop
@@ -0,0 +1,177 @@
+import json
+import os
+import struct
+import subprocess
+import tempfile
+
+from cache import content_hasher
+
+# Bytes of an upload held back and probed before deciding whether to stream it
+PROBE_BYTES = 4 * 1024 * 1024
+# Demuxers that read a container front to back, so ffmpeg can take it on stdin
+STREAMABLE_FORMATS = {"matroska,webm", "mpegts", "flv", "avi", "mpeg", "ogg", "nut"}
+# MP4 and MOV stream only when the moov index comes before the media data
+MP4_FORMAT = "mov,mp4,m4a,3gp,3g2,mj2"
+
+
+def probe_bytes(head):
+    """ffprobe the first bytes of an upload from stdin; None if ffprobe cannot read them"""
+    try:
+        completed = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", "pipe:0"],
+            input=head,
+            capture_output=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if completed.returncode:
+        return None
+    return json.loads(completed.stdout.decode("utf-8"))
+
+
+def mp4_index_first(head):
+    """Whether the top-level moov box of an MP4 starts before its mdat box"""
+    offset = 0
+    while offset + 8 <= len(head):
+        size, kind = struct.unpack_from(">I4s", head, offset)
+        if kind == b"moov":
+            return True
+        if kind == b"mdat":
+            return False
+        if size == 1:
+            if offset + 16 > len(head):
+                return False
+            size = struct.unpack_from(">Q", head, offset + 8)[0]
+        if size < 8:
+            # 0 means the box runs to the end of the file
+            return False
+        offset += size
+    return False
+
+
+def streamable(probe, head):
+    """Whether ffmpeg can demux the upload from a pipe, without seeking back"""
+    format_name = probe.get("format", {}).get("format_name")
+    if format_name == MP4_FORMAT:
+        return mp4_index_first(head)
+    return format_name in STREAMABLE_FORMATS
+
+
+class UploadSink:
+    """Writable stream for werkzeug's form parser that feeds an upload to an encoder.
+
+    The upload is hashed as it arrives (`digest`). The first PROBE_BYTES are held back
+    and probed. If the container can be demuxed from a pipe and `start(sink, probe)`
+    returns a (process, job) pair, the head and then the
+    rest of the upload go to the process's stdin as they arrive, so encoding overlaps
+    the upload. Otherwise, or when `start` returns None, the upload is spooled to a
+    temporary file (`spool_path`) to be processed as before.
+
+    Whoever takes over the job or the spooled file calls claim(). Closing an unclaimed
+    sink, as Flask does at the end of a request that rejected or broke off the upload,
+    cancels the job and kills its encoder, or deletes the spooled file.
+    """
+
+    def __init__(self, start, suffix=".mp4", spool_dir=None):
+        self._start = start
+        self._suffix = suffix
+        self._spool_dir = spool_dir
+        self._head = bytearray()
+        self._spool = None
+        self._finished = False
+        self._closed = False
+        self._hasher = content_hasher()
+        self.process = None
+        self.job = None
+        self.spool_path = None
+        self.spooled_bytes = 0
+        self.claimed = False
+
+    @property
+    def streaming(self):
+        return self.process is not None
+
+    @property
+    def digest(self):
+        """Hex BLAKE2b of the bytes written so far"""
+        return self._hasher.hexdigest()
+
+    def write(self, data):
+        self._hasher.update(data)
+        if self._head is not None:
+            self._head += data
+            if len(self._head) >= PROBE_BYTES:
+                self._decide()
+        elif self.process is not None:
+            self._feed(data)
+        else:
+            self._spool.write(data)
+            self.spooled_bytes += len(data)
+        return len(data)
+
+    def _decide(self):
+        head = bytes(self._head)
+        self._head = None
+        probe = probe_bytes(head)
+        started = (
+            self._start(self, probe) if probe is not None and streamable(probe, head) else None
+        )
+        if started is not None:
+            self.process, self.job = started
+            self._feed(head)
+        else:
+            self._spool = tempfile.NamedTemporaryFile(
+                suffix=self._suffix, dir=self._spool_dir, delete=False
+            )
+            self.spool_path = self._spool.name
+            self._spool.write(head)
+            self.spooled_bytes += len(head)
+
+    def _feed(self, data):
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg gave up on the input; its job reports why, the rest is dropped
+            pass
+
+    def seek(self, offset, whence=0):
+        # The form parser rewinds the stream once the part is complete
+        self.finish()
+        return 0
+
+    def finish(self):
+        """End of the upload: decide for an upload shorter than the head, close the spool"""
+        if self._finished:
+            return
+        self._finished = True
+        if self._head is not None:
+            self._decide()
+        if self._spool is not None:
+            self._spool.close()
+
+    def claim(self):
+        """Take over the finished upload; only now does the encoder see the end of its input"""
+        self.finish()
+        self.claimed = True
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def close(self):
+        if self.claimed or self._closed:
+            return
+        self._closed = self._finished = True
+        if self.process is not None:
+            self.job.cancelled = True
+            self.process.kill()
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        elif self._spool is not None:
+            self._spool.close()
+            if os.path.exists(self.spool_path):
+                os.unlink(self.spool_path)
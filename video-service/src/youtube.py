@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.credentials import Credentials
+
+YOUTUBE_UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+# Every chunk but the last must be a multiple of this
+CHUNK_GRANULARITY = 256 * 1024
+# YouTube keeps an upload session for about a week; older ones are not tried
+SESSION_MAX_AGE = 6 * 24 * 3600
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses of a session URI that has expired or was never known
+GONE_STATUSES = {404, 410}
+MAX_BACKOFF = 60
+# The access token is refreshed this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+# Wait before trying again after a failed token refresh
+TOKEN_RETRY_SECONDS = 30
+
+
+class UploadError(Exception):
+    """An upload the server refused, or that failed too many times in a row"""
+
+
+class _Retry(Exception):
+    pass
+
+
+def chunk_size(megabytes):
+    """Bytes per chunk for a size in MB, rounded down to the granularity YouTube requires"""
+    return max(1, int(megabytes * 1024 * 1024) // CHUNK_GRANULARITY) * CHUNK_GRANULARITY
+
+
+def upload_key(path, metadata):
+    """Identifies an upload of one file version with one set of metadata"""
+    stat = os.stat(path)
+    described = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, metadata])
+    return hashlib.blake2b(described.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def acknowledged(response):
+    """Bytes the server holds, from the Range header of a 308 Resume Incomplete"""
+    match = re.match(r"bytes=0-(\d+)", response.headers.get("Range", ""))
+    return int(match.group(1)) + 1 if match else 0
+
+
+class SessionStore:
+    """Session URIs of unfinished uploads, one JSON file per upload under `root`.
+
+    Kept on disk, so an upload interrupted by a restart resumes where it stopped the
+    next time it is requested.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - saved["created_at"] > SESSION_MAX_AGE:
+            self.delete(key)
+            return None
+        return saved["uri"]
+
+    def save(self, key, uri):
+        temp = f"{self._path(key)}.tmp"
+        with open(temp, "w") as f:
+            json.dump({"uri": uri, "created_at": time.time()}, f)
+        os.replace(temp, self._path(key))
+
+    def delete(self, key):
+        if os.path.exists(self._path(key)):
+            os.unlink(self._path(key))
+
+
+class YouTubeClient:
+    """YouTube credentials parsed once and HTTP sessions reused across uploads.
+
+    Each thread gets its own AuthorizedSession, so its connections stay open between
+    uploads, and all of them share the credentials. Once start()ed, a daemon thread
+    refreshes the access token TOKEN_REFRESH_MARGIN seconds before it expires, so an
+    upload never waits on the token endpoint. `on_refresh(succeeded)` reports each
+    refresh.
+    """
+
+    def __init__(self, info, refresh_margin=TOKEN_REFRESH_MARGIN, request=None, on_refresh=None):
+        self.credentials = Credentials.from_authorized_user_info(info)
+        self.refresh_margin = refresh_margin
+        self.on_refresh = on_refresh or (lambda succeeded: None)
+        self._request = request or Request()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stop = threading.Event()
+
+    @property
+    def session(self):
+        """This thread's AuthorizedSession"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = AuthorizedSession(
+                self.credentials, auth_request=self._request
+            )
+        return session
+
+    def seconds_left(self):
+        """Seconds until the access token expires; 0 if there is none yet"""
+        if not self.credentials.token or self.credentials.expiry is None:
+            return 0.0
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return (self.credentials.expiry - now).total_seconds()
+
+    def refresh(self):
+        with self._lock:
+            try:
+                self.credentials.refresh(self._request)
+            except Exception:
+                self.on_refresh(False)
+                raise
+        self.on_refresh(True)
+
+    def start(self):
+        threading.Thread(target=self._keep_fresh, name="youtube-token", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _keep_fresh(self):
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+            except Exception:
+                delay = TOKEN_RETRY_SECONDS
+                continue
+            delay = max(0.0, self.seconds_left() - self.refresh_margin)
+
+
+class ResumableUpload:
+    """Chunked upload over the YouTube resumable upload protocol.
+
+    Starts a session with the video metadata, then PUTs the file `chunk_size` bytes at
+    a time, each with its Content-Range. After a network error or a 5xx the server is
+    asked how many bytes it holds, and the upload carries on from there after a backoff;
+    an expired session starts over. `session` is a requests.Session, normally a
+    google.auth AuthorizedSession. `on_chunk(bytes, seconds)` reports each acknowledged
+    chunk, with 0 seconds for bytes only found acknowledged on resuming, and
+    `on_resume()` each time the upload resumes from a queried offset.
+    """
+
+    def __init__(
+        self,
+        session,
+        sessions,
+        chunk_size=8 * 1024 * 1024,
+        upload_url=YOUTUBE_UPLOAD_URL,
+        max_retries=8,
+        timeout=120,
+        on_chunk=None,
+        on_resume=None,
+        sleep=time.sleep,
+    ):
+        self.session = session
+        self.sessions = sessions
+        self.chunk_size = chunk_size
+        self.upload_url = upload_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.on_chunk = on_chunk or (lambda sent, seconds: None)
+        self.on_resume = on_resume or (lambda: None)
+        self.sleep = sleep
+
+    def upload(self, path, metadata, part="snippet,status", content_type="video/*"):
+        """Upload the file at path; returns the API's response, the created video resource"""
+        size = os.path.getsize(path)
+        key = upload_key(path, metadata)
+        uri = self.sessions.get(key)
+        # None until the server said how much of the file it has
+        offset = None if uri is not None else 0
+        # Bytes known to be acknowledged, reported through on_chunk; None for a session
+        # another process started
+        reported = offset
+        failures = 0
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    if uri is None:
+                        uri = self._start(metadata, size, part, content_type)
+                        self.sessions.save(key, uri)
+                        offset = reported = 0
+                    if offset is None:
+                        offset, video = self._query(uri, size)
+                        if video is not None:
+                            self.sessions.delete(key)
+                            return video
+                        if offset is None:
+                            self.sessions.delete(key)
+                            uri = None
+                            continue
+                        if reported is not None and offset > reported:
+                            # Part of a failed chunk arrived after all
+                            self.on_chunk(offset - reported, 0.0)
+                        reported = offset
+                        self.on_resume()
+                    f.seek(offset)
+                    chunk = f.read(self.chunk_size)
+                    end = offset + len(chunk)
+                    started = time.monotonic()
+                    response = self.session.put(
+                        uri,
+                        data=chunk,
+                        headers={"Content-Range": f"bytes {offset}-{end - 1}/{size}"},
+                        timeout=self.timeout,
+                    )
+                    if response.status_code in (200, 201):
+                        self.on_chunk(size - offset, time.monotonic() - started)
+                        self.sessions.delete(key)
+                        return response.json()
+                    if response.status_code == 308:
+                        held = acknowledged(response)
+                        if held > offset:
+                            self.on_chunk(held - offset, time.monotonic() - started)
+                            offset = reported = held
+                            failures = 0
+                            continue
+                        raise _Retry(f"no bytes of the chunk at {offset} were acknowledged")
+                    self._check(response)
+                except (requests.RequestException, _Retry) as e:
+                    failures += 1
+                    if failures > self.max_retries:
+                        raise UploadError(f"Upload failed {failures} times in a row: {e}")
+                    self.sleep(min(MAX_BACKOFF, 2 ** (failures - 1)))
+                    if uri is not None:
+                        offset = None
+
+    def _start(self, metadata, size, part, content_type):
+        response = self.session.post(
+            self.upload_url,
+            params={"uploadType": "resumable", "part": part},
+            json=metadata,
+            headers={"X-Upload-Content-Length": str(size), "X-Upload-Content-Type": content_type},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200 or "Location" not in response.headers:
+            self._check(response)
+        return response.headers["Location"]
+
+    def _query(self, uri, size):
+        """(offset, None) while unfinished, (size, video) once done, (None, None) if gone"""
+        response = self.session.put(
+            uri, headers={"Content-Range": f"bytes */{size}"}, timeout=self.timeout
+        )
+        if response.status_code in (200, 201):
+            return size, response.json()
+        if response.status_code == 308:
+            return acknowledged(response), None
+        if response.status_code in GONE_STATUSES:
+            return None, None
+        self._check(response)
+
+    def _check(self, response):
+        """Raise _Retry for a transient error status, UploadError for any other"""
+        if response.status_code in RETRY_STATUSES or response.status_code in GONE_STATUSES:
+            raise _Retry(f"{response.status_code} from {response.url}")
+        raise UploadError(f"Upload rejected with {response.status_code}: {response.text[:500]}")
@@ -1,2 +1,711 @@
-def test_video_service_basic():
-    assert True
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from prometheus_client import REGISTRY
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import app as video_app  # noqa: E402
+import encoding  # noqa: E402
+import streaming  # noqa: E402
+import youtube  # noqa: E402
+from cache import OutputCache  # noqa: E402
+from encoding import encode_path, plan_streams  # noqa: E402
+from jobs import JobQueue  # noqa: E402
+from scratch import Scratch  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(video_app, "job_queue", JobQueue(1))
+    monkeypatch.setattr(video_app, "output_cache", OutputCache(str(tmp_path / "cache"), 2**20))
+    monkeypatch.setattr(video_app, "scratch", Scratch(str(tmp_path / "scratch"), 2**20, 3600))
+    return video_app.app.test_client()
+
+
+@pytest.fixture
+def fake_transcode(monkeypatch):
+    """Replace the encoder with a copy so the job plumbing runs without ffmpeg"""
+
+    def transcode(source, target, job=None):
+        shutil.copy(source, target)
+        return "remux", 0.1
+
+    monkeypatch.setattr(video_app, "transcode", transcode)
+    monkeypatch.setattr(video_app.ffmpeg, "probe", lambda path: {"format": {"duration": "1.5"}})
+
+
+def test_video_service_basic():
+    assert True
+
+
+def test_job_queue_runs_higher_priorities_first():
+    jobs = JobQueue(1)
+    release = threading.Event()
+    order = []
+    blocker = jobs.submit(lambda job: release.wait(5))
+    while blocker.status == "queued":
+        time.sleep(0.01)
+    for priority in ("low", "normal", "high", "normal"):
+        jobs.submit(lambda job, priority=priority: order.append(priority), priority)
+    assert jobs.depth == 4
+    failing = jobs.submit(lambda job: 1 / 0, "low")
+    release.set()
+    failing.done.wait(5)
+    assert order == ["high", "normal", "normal", "low"]
+    assert failing.status == "failed" and "division" in failing.error
+    with pytest.raises(ValueError):
+        jobs.submit(lambda job: None, "urgent")
+
+
+def test_jobs_endpoint_returns_at_once_and_reports_status(client, fake_transcode):
+    response = client.post(
+        "/jobs",
+        data={"video": (io.BytesIO(b"video bytes"), "clip.mp4"), "priority": "high"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    video_app.job_queue.get(job_id).done.wait(5)
+
+    status = client.get(f"/jobs/{job_id}").get_json()
+    assert status["status"] == "succeeded" and status["progress"] == 1.0
+    processed = status["result"]["processed_file"]
+    with open(processed, "rb") as f:
+        assert f.read() == b"video bytes"
+    os.unlink(processed)
+    assert client.get("/jobs/missing").status_code == 404
+    response = client.post(
+        "/jobs",
+        data={"video": (io.BytesIO(b"x"), "clip.mp4"), "priority": "urgent"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+
+def test_process_video_waits_for_its_job(client, fake_transcode):
+    response = client.post(
+        "/process-video",
+        data={"video": (io.BytesIO(b"video bytes"), "clip.mp4")},
+        content_type="multipart/form-data",
+    )
+    body = response.get_json()
+    assert body["status"] == "success" and body["duration"] == 1.5 and body["file_size"] == 11
+    assert body["encode_path"] == "remux"
+    os.unlink(body["processed_file"])
+
+
+def test_resubmitted_videos_are_served_from_the_cache(client, fake_transcode, monkeypatch):
+    def post():
+        response = client.post(
+            "/process-video",
+            data={"video": (io.BytesIO(b"same source"), "clip.mp4")},
+            content_type="multipart/form-data",
+        )
+        return response.get_json()
+
+    first = post()
+    assert first["encode_path"] == "remux" and "cached" not in first
+    monkeypatch.setattr(video_app, "transcode", None)
+    second = post()
+    assert second["cached"] and second["processed_file"] != first["processed_file"]
+    assert second["duration"] == first["duration"] and second["file_size"] == 11
+    # Deleting a copy, as an upload to YouTube does, keeps the cache entry
+    os.unlink(first["processed_file"])
+    os.unlink(second["processed_file"])
+    third = post()
+    with open(third["processed_file"], "rb") as f:
+        assert f.read() == b"same source"
+    os.unlink(third["processed_file"])
+
+
+def test_output_cache_evicts_least_recently_used(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_bytes=25)
+    for key in ("a", "b"):
+        source = tmp_path / key
+        source.write_bytes(key.encode() * 10)
+        cache.put(key, str(source), {"duration": 1.0})
+    assert cache.get("a", str(tmp_path / "out")) == {"duration": 1.0}
+    source = tmp_path / "c"
+    source.write_bytes(b"c" * 10)
+    cache.put("c", str(source), {"duration": 2.0})
+    assert cache.get("b", str(tmp_path / "out")) is None
+    assert len(cache) == 2 and cache.size == 20
+    # Reopening picks the entries up again
+    assert len(OutputCache(str(tmp_path / "cache"), max_bytes=25)) == 2
+
+
+def test_scratch_collects_expired_files_and_enforces_the_quota(tmp_path):
+    scratch = Scratch(str(tmp_path), quota_bytes=100, ttl=3600)
+    kept = scratch.create(".mp4", owner="job-1")
+    expired = scratch.create(".mp4", owner="job-2", ttl=0)
+    for path in (kept, expired):
+        with open(path, "wb") as f:
+            f.write(b"x" * 40)
+    # Sizes are counted when a file is tracked, not on every usage() call
+    assert scratch.usage() == 0
+    scratch.track(kept, owner="job-1")
+    scratch.track(expired, owner="job-2", ttl=0)
+    # An untracked file left by an earlier process expires by its age
+    leftover = tmp_path / "tmpold.mp4"
+    leftover.write_bytes(b"x" * 10)
+    os.utime(leftover, (time.time() - 7200, time.time() - 7200))
+
+    assert scratch.usage() == 80 and scratch.has_room(20) and not scratch.has_room(21)
+    assert scratch.collect() == (2, 50)
+    assert os.listdir(tmp_path) == [os.path.basename(kept)] and scratch.usage() == 40
+    scratch.release(kept)
+    assert scratch.usage() == 0 and scratch.collect() == (0, 0)
+
+    # The input of a queued job is held past the TTL until the job is done with it
+    queued = scratch.create(".mp4", owner="upload", ttl=0)
+    with open(queued, "wb") as f:
+        f.write(b"x" * 30)
+    scratch.hold(queued, owner="upload")
+    os.utime(queued, (time.time() - 7200, time.time() - 7200))
+    assert scratch.usage() == 30 and scratch.collect() == (0, 0)
+    scratch.track(queued, owner="job-3", ttl=0)
+    assert scratch.collect() == (1, 30) and scratch.usage() == 0
+
+
+def test_scratch_releases_only_files_it_holds(tmp_path):
+    scratch = Scratch(str(tmp_path / "scratch"), quota_bytes=100, ttl=3600)
+    outside = tmp_path / "outside.mp4"
+    outside.write_bytes(b"x")
+    linked = os.path.join(scratch.root, "linked.mp4")
+    os.symlink(outside, linked)
+
+    assert not scratch.contains(str(outside)) and not scratch.contains(linked)
+    assert not scratch.contains(os.path.join(scratch.root, "..", "outside.mp4"))
+    scratch.release(str(outside))
+    scratch.release(os.path.join(scratch.root, "..", "outside.mp4"))
+    assert outside.exists()
+
+    tracked = scratch.create(".mp4", owner="job")
+    assert scratch.contains(tracked)
+    scratch.release(tracked)
+    assert not os.path.exists(tracked)
+
+
+def test_youtube_upload_refuses_files_outside_the_scratch_space(client, tmp_path, monkeypatch):
+    outside = tmp_path / "secret.mp4"
+    outside.write_bytes(b"x")
+    monkeypatch.setenv("YOUTUBE_CREDENTIALS", "{}")
+    monkeypatch.setattr(
+        video_app, "youtube_client", lambda credentials: pytest.fail("upload was attempted")
+    )
+
+    response = client.post(
+        "/upload-to-youtube",
+        json={"video_file": str(outside), "title": "Title", "description": "Description"},
+    )
+    assert response.status_code == 400
+    assert outside.exists()
+
+
+def test_uploads_are_refused_while_scratch_space_is_full(client, fake_transcode, monkeypatch):
+    full = Scratch(video_app.scratch.root, quota_bytes=10, ttl=3600)
+    monkeypatch.setattr(video_app, "scratch", full)
+    response = client.post(
+        "/jobs",
+        data={"video": (io.BytesIO(b"video bytes"), "clip.mp4")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 507 and os.listdir(full.root) == []
+
+
+def _probe(video, audio=None):
+    streams = [{"index": 0, "codec_type": "video", **video}]
+    if audio is not None:
+        streams.append({"index": 1, "codec_type": "audio", **audio})
+    return {"streams": streams}
+
+
+def test_plan_copies_compliant_streams_and_encodes_the_rest():
+    h264 = {"codec_name": "h264", "pix_fmt": "yuv420p", "field_order": "progressive"}
+    aac = {"codec_name": "aac", "sample_rate": "48000", "channels": 2}
+    plan = plan_streams(_probe(h264, aac))
+    assert plan == {"video": "copy", "audio": "copy", "streams": {"video": 0, "audio": 1}}
+    assert encode_path(plan) == "remux"
+
+    plan = plan_streams(_probe(h264, {**aac, "codec_name": "opus"}))
+    assert (plan["video"], plan["audio"]) == ("copy", "encode")
+    assert encode_path(plan) == "partial"
+
+    plan = plan_streams(_probe({**h264, "pix_fmt": "yuv420p10le"}))
+    assert plan == {"video": "encode", "audio": None, "streams": {"video": 0, "audio": None}}
+    assert encode_path(plan) == "transcode"
+    assert plan_streams(_probe({"codec_name": "vp9", "pix_fmt": "yuv420p"}))["video"] == "encode"
+    assert plan_streams(_probe({**h264, "field_order": "tt"}))["video"] == "encode"
+
+    cover = {"codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}}
+    with pytest.raises(ValueError):
+        plan_streams(
+            {"streams": [{"index": 0, **cover}, {"index": 1, "codec_type": "audio", **aac}]}
+        )
+
+    # Cover art first: the commands map the chosen streams by index, not "v:0"
+    plan = plan_streams(
+        {
+            "streams": [
+                {"index": 0, **cover},
+                {"index": 1, "codec_type": "audio", **aac},
+                {"index": 2, "codec_type": "video", **h264},
+            ]
+        }
+    )
+    assert plan["streams"] == {"video": 2, "audio": 1}
+    args = encoding.encode_command("in.mp3", "out.mp4", plan).compile()
+    maps = [args[i + 1] for i, arg in enumerate(args) if arg == "-map"]
+    assert maps == ["0:2", "0:1"]
+
+
+class _Command:
+    """Stands in for an ffmpeg-python command, running a Python snippet instead"""
+
+    def __init__(self, code):
+        self.code = code
+
+    def global_args(self, *args):
+        return self
+
+    def run_async(self, pipe_stdin=False, pipe_stdout=False, pipe_stderr=False, **kwargs):
+        return subprocess.Popen(
+            [sys.executable, "-c", self.code],
+            stdin=subprocess.PIPE if pipe_stdin else None,
+            stdout=subprocess.PIPE if pipe_stdout else None,
+            stderr=subprocess.PIPE if pipe_stderr else None,
+        )
+
+
+def test_run_reports_child_cpu_time_and_errors():
+    cpu_seconds = encoding.run(_Command("sum(range(3_000_000))"))
+    assert 0 < cpu_seconds < 30
+    with pytest.raises(encoding.ffmpeg.Error) as error:
+        encoding.run(_Command("import sys; sys.stderr.write('bad input'); sys.exit(1)"))
+    assert error.value.stderr == b"bad input"
+
+
+PROGRESS = """frame=48
+fps=24.00
+out_time_us=2000000
+speed=N/A
+progress=continue
+frame=96
+fps=23.50
+out_time_us=4000000
+out_time=00:00:04.000000
+speed=1.96x
+progress=end
+"""
+
+
+def test_progress_reports_are_parsed_as_they_arrive():
+    reports = list(encoding.progress_blocks(PROGRESS.encode().splitlines(keepends=True)))
+    assert reports == [
+        {"frame": 48, "fps": 24.0, "speed": None, "out_time": 2.0, "done": False},
+        {"frame": 96, "fps": 23.5, "speed": 1.96, "out_time": 4.0, "done": True},
+    ]
+
+    # Lots of stderr alongside the reports must not block ffmpeg
+    code = f"import sys; sys.stderr.write('x' * 200000); sys.stdout.write({PROGRESS!r})"
+    received = []
+    assert encoding.run(_Command(code), received.append) >= 0
+    assert received == reports
+
+
+def test_parallel_encodes_report_combined_progress():
+    combined = []
+    first, second = encoding.combined_progress(2, combined.append)
+    first({"frame": 10, "fps": 5.0, "speed": 1.0, "out_time": 2.0, "done": True})
+    second({"frame": 20, "fps": None, "speed": 2.0, "out_time": 4.0, "done": False})
+    assert combined[-1] == {"frame": 30, "fps": 5.0, "speed": 3.0, "out_time": 6.0, "done": False}
+    second({"frame": 30, "fps": 6.0, "speed": 2.0, "out_time": 5.0, "done": True})
+    assert combined[-1]["done"] and combined[-1]["out_time"] == 7.0
+
+
+def test_encode_progress_feeds_the_job_and_the_speed_metrics():
+    job = JobQueue(1).record(None)
+    update = video_app.track_progress(job, "medium", duration=8.0)
+
+    def speed_now():
+        return REGISTRY.get_sample_value("video_encode_speed_current", {"preset": "medium"})
+
+    update({"frame": 48, "fps": 24.0, "speed": 1.5, "out_time": 2.0, "done": False})
+    assert job.progress == 0.25 and job.details["fps"] == 24.0
+    assert job.to_dict()["details"]["frame"] == 48 and speed_now() == 1.5
+
+    speeds = video_app.VIDEO_ENCODE_SPEED.labels(preset="medium")
+    observed = speeds._sum.get()
+    update({"frame": 192, "fps": 24.0, "speed": 2.0, "out_time": 8.0, "done": True})
+    assert job.progress == 0.99 and speed_now() == 0
+    assert speeds._sum.get() == observed + 2.0
+
+
+def test_split_points_snap_to_keyframes():
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    assert encoding.split_points(keyframes, 11.0, 4) == [2.0, 6.0, 8.0]
+    # Sparse keyframes leave fewer, never repeated, chunks
+    assert encoding.split_points([0.0, 9.0], 10.0, 4) == [9.0]
+    assert encoding.split_points([0.0], 10.0, 4) == []
+
+
+def test_encode_segmented_encodes_chunks_and_audio_then_concatenates(monkeypatch, tmp_path):
+    commands, listed = [], []
+
+    def run(command, on_progress=None):
+        args = command.compile()
+        commands.append(args)
+        if "concat" in args:
+            with open(args[args.index("-i") + 1]) as f:
+                listed.extend(line.split("/")[-1].strip("'\n") for line in f)
+        return 2.0
+
+    monkeypatch.setattr(encoding, "run", run)
+    probed = []
+
+    def keyframe_times(path, stream):
+        probed.append(stream)
+        return [0.0, 5.0, 10.0, 15.0]
+
+    monkeypatch.setattr(encoding, "keyframe_times", keyframe_times)
+    # Cover art is stream 0
+    plan = {"video": "encode", "audio": "copy", "streams": {"video": 1, "audio": 2}}
+    output = str(tmp_path / "out.mp4")
+    cpu_seconds = encoding.encode_segmented("in.mkv", output, plan, 20.0, 4, threads=8)
+
+    assert probed == ["1"]
+    chunks = [args for args in commands if "-ss" in args]
+    assert [args[args.index("-ss") + 1] for args in chunks] == ["0.0", "5.0", "10.0", "15.0"]
+    assert all(args[args.index("-threads") + 1] == "2" for args in chunks)
+    assert all(args[args.index("-map") + 1] == "0:1" for args in chunks)
+    assert "-t" not in chunks[-1]
+    audio = next(args for args in commands if "-acodec" in args and "concat" not in args)
+    assert audio[audio.index("-map") + 1] == "0:2"
+    assert audio[audio.index("-acodec") + 1] == "copy"
+    assert listed == [f"chunk-{i:04d}.mp4" for i in range(4)]
+    assert commands[-1][-1] == output and "copy" in commands[-1]
+    assert cpu_seconds == 12.0 and os.listdir(tmp_path) == []
+
+
+def _box(kind, payload=b""):
+    return (8 + len(payload)).to_bytes(4, "big") + kind + payload
+
+
+def test_only_containers_readable_from_a_pipe_stream():
+    mp4 = {"format": {"format_name": streaming.MP4_FORMAT}}
+    faststart = _box(b"ftyp", b"isom") + _box(b"moov", b"index") + _box(b"mdat", b"media")
+    assert streaming.streamable(mp4, faststart)
+    assert not streaming.streamable(mp4, _box(b"ftyp") + _box(b"mdat", b"media") + _box(b"moov"))
+    # moov beyond the probed head means it is at the end
+    assert not streaming.streamable(mp4, _box(b"ftyp") + b"\x00\x10\x00\x00wide")
+    assert streaming.streamable({"format": {"format_name": "matroska,webm"}}, b"")
+    assert not streaming.streamable({"format": {"format_name": "image2"}}, b"")
+
+
+MKV_PROBE = {
+    "format": {"format_name": "matroska,webm"},
+    "streams": [{"index": 0, "codec_type": "video", "codec_name": "vp9", "pix_fmt": "yuv420p"}],
+}
+
+
+def _copy_stdin_command(input_path, output_path, plan, threads=0):
+    assert input_path == "pipe:0" and (plan["video"], plan["audio"]) == ("encode", None)
+    return _Command(
+        "import shutil, sys\n"
+        f"with open({output_path!r}, 'wb') as f: shutil.copyfileobj(sys.stdin.buffer, f)"
+    )
+
+
+def test_uploads_in_streamable_containers_are_piped_into_ffmpeg(
+    client, fake_transcode, monkeypatch
+):
+    monkeypatch.setattr(streaming, "PROBE_BYTES", 1024)
+    monkeypatch.setattr(streaming, "probe_bytes", lambda head: MKV_PROBE)
+    monkeypatch.setattr(video_app, "encode_command", _copy_stdin_command)
+    streamed = video_app.VIDEO_INGEST.labels(mode="streamed")
+    before = streamed._value.get()
+    upload = bytes(range(256)) * 40
+
+    response = client.post(
+        "/process-video",
+        data={"video": (io.BytesIO(upload), "clip.mkv")},
+        content_type="multipart/form-data",
+    )
+    body = response.get_json()
+    assert body["status"] == "success" and body["encode_path"] == "transcode"
+    with open(body["processed_file"], "rb") as f:
+        assert f.read() == upload
+    os.unlink(body["processed_file"])
+    assert streamed._value.get() == before + 1
+
+    # A piped upload the request then rejects stops its encode
+    response = client.post(
+        "/jobs",
+        data={"video": (io.BytesIO(upload), "clip.mkv"), "priority": "urgent"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+    (rejected,) = [job for job in video_app.job_queue._jobs.values() if job.result is None]
+    assert rejected.done.wait(5) and rejected.status == "cancelled"
+
+
+def test_concurrent_streamed_uploads_do_not_share_one_worker(client, fake_transcode, monkeypatch):
+    monkeypatch.setattr(streaming, "PROBE_BYTES", 1024)
+    monkeypatch.setattr(streaming, "probe_bytes", lambda head: MKV_PROBE)
+    monkeypatch.setattr(video_app, "encode_command", _copy_stdin_command)
+    # Both uploads find the worker free and start ffmpeg before either job is submitted
+    both_started = threading.Barrier(2, timeout=5)
+    start = video_app.start
+
+    def start_together(*args, **kwargs):
+        process = start(*args, **kwargs)
+        both_started.wait()
+        return process
+
+    monkeypatch.setattr(video_app, "start", start_together)
+    streamed = video_app.VIDEO_INGEST.labels(mode="streamed")
+    spooled = video_app.VIDEO_INGEST.labels(mode="spooled")
+    before = streamed._value.get(), spooled._value.get()
+    upload = bytes(range(256)) * 40
+    responses = []
+
+    def post():
+        responses.append(
+            video_app.app.test_client().post(
+                "/jobs",
+                data={"video": (io.BytesIO(upload), "clip.mkv")},
+                content_type="multipart/form-data",
+            )
+        )
+
+    threads = [threading.Thread(target=post) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert [response.status_code for response in responses] == [202, 202]
+    assert (streamed._value.get(), spooled._value.get()) == (before[0] + 1, before[1] + 1)
+    for response in responses:
+        job = video_app.job_queue.get(response.get_json()["job_id"])
+        assert job.done.wait(5) and job.status == "succeeded"
+        with open(job.result["processed_file"], "rb") as f:
+            assert f.read() == upload
+
+
+def test_uploads_that_need_seeking_are_spooled(client, fake_transcode, monkeypatch):
+    probe = {"format": {"format_name": streaming.MP4_FORMAT}, "streams": MKV_PROBE["streams"]}
+    monkeypatch.setattr(streaming, "probe_bytes", lambda head: probe)
+    monkeypatch.setattr(video_app, "encode_command", None)
+    upload = _box(b"ftyp") + _box(b"mdat", b"media") + _box(b"moov")
+    spooled = video_app.VIDEO_SPOOLED_BYTES._value.get()
+
+    response = client.post(
+        "/process-video",
+        data={"video": (io.BytesIO(upload), "clip.mp4")},
+        content_type="multipart/form-data",
+    )
+    body = response.get_json()
+    with open(body["processed_file"], "rb") as f:
+        assert f.read() == upload
+    os.unlink(body["processed_file"])
+    assert video_app.VIDEO_SPOOLED_BYTES._value.get() == spooled + len(upload)
+
+
+class _FakeUploadServer(ThreadingHTTPServer):
+    """The resumable upload protocol in miniature: POST opens a session, PUTs fill it.
+
+    `failures` is a list of chunk PUT outcomes to inject: "partial" keeps half the chunk
+    and answers 503, "drop" keeps nothing and answers 503.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeUploadHandler)
+        self.sessions = {}
+        self.failures = []
+        self.received = 0
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _FakeUploadHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, headers=(), body=b""):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        session_id = str(len(self.server.sessions))
+        self.server.sessions[session_id] = {
+            "size": int(self.headers["X-Upload-Content-Length"]),
+            "data": b"",
+        }
+        self._reply(200, [("Location", f"{self.server.url}/session/{session_id}")])
+
+    def do_PUT(self):
+        session = self.server.sessions.get(self.path.rsplit("/", 1)[-1])
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if session is None:
+            return self._reply(404)
+        if body:
+            self.server.received += len(body)
+            start = int(self.headers["Content-Range"].split()[1].split("-")[0])
+            assert start == len(session["data"])
+            failure = self.server.failures.pop(0) if self.server.failures else None
+            if failure == "partial":
+                session["data"] += body[: len(body) // 2]
+            elif failure is None:
+                session["data"] += body
+            if failure is not None:
+                return self._reply(503)
+        if len(session["data"]) == session["size"]:
+            return self._reply(201, body=b'{"id": "video-1"}')
+        held = [("Range", f"bytes=0-{len(session['data']) - 1}")] if session["data"] else []
+        self._reply(308, held)
+
+
+@pytest.fixture
+def upload_server():
+    server = _FakeUploadServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_resumable_upload_resends_only_what_was_not_acknowledged(upload_server, tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(os.urandom(1000))
+    chunks, resumes = [], []
+    upload_server.failures = [None, "partial"]
+    uploader = youtube.ResumableUpload(
+        requests.Session(),
+        youtube.SessionStore(str(tmp_path / "sessions")),
+        chunk_size=300,
+        upload_url=f"{upload_server.url}/upload",
+        on_chunk=lambda sent, seconds: chunks.append(sent),
+        on_resume=lambda: resumes.append(1),
+        sleep=lambda seconds: None,
+    )
+    assert uploader.upload(str(video), {"snippet": {"title": "t"}}) == {"id": "video-1"}
+    assert upload_server.sessions["0"]["data"] == video.read_bytes()
+    # The second chunk's acknowledged half is not sent again
+    assert upload_server.received == 1000 + 150 and sum(chunks) == 1000 and resumes == [1]
+    assert os.listdir(tmp_path / "sessions") == []
+
+
+def test_resumable_upload_continues_a_persisted_session(upload_server, tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(os.urandom(1000))
+    sessions = youtube.SessionStore(str(tmp_path / "sessions"))
+
+    def uploader(max_retries):
+        return youtube.ResumableUpload(
+            requests.Session(),
+            sessions,
+            chunk_size=400,
+            upload_url=f"{upload_server.url}/upload",
+            max_retries=max_retries,
+            sleep=lambda seconds: None,
+        )
+
+    upload_server.failures = [None, "drop"]
+    with pytest.raises(youtube.UploadError):
+        uploader(max_retries=0).upload(str(video), {})
+    assert len(os.listdir(tmp_path / "sessions")) == 1
+
+    # A new process picks the session up and sends only the rest
+    assert uploader(max_retries=3).upload(str(video), {}) == {"id": "video-1"}
+    assert list(upload_server.sessions) == ["0"] and upload_server.received == 400 + 400 + 600
+    assert upload_server.sessions["0"]["data"] == video.read_bytes()
+
+    # An expired session starts over
+    sessions.save(youtube.upload_key(str(video), {"again": True}), f"{upload_server.url}/gone")
+    assert uploader(max_retries=3).upload(str(video), {"again": True}) == {"id": "video-1"}
+    assert len(upload_server.sessions) == 2
+
+
+def test_upload_chunks_are_multiples_of_256_kib():
+    assert youtube.chunk_size(8) == 8 * 1024 * 1024
+    assert youtube.chunk_size(1.1) == 4 * youtube.CHUNK_GRANULARITY
+    assert youtube.chunk_size(0) == youtube.CHUNK_GRANULARITY
+
+
+class _TokenEndpoint:
+    """Stands in for google.auth's transport, issuing numbered access tokens"""
+
+    def __init__(self, expires_in):
+        self.expires_in = expires_in
+        self.issued = 0
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        self.issued += 1
+        token = {"access_token": f"token-{self.issued}", "expires_in": self.expires_in}
+        return type("Response", (), {"status": 200, "headers": {}, "data": json.dumps(token)})
+
+
+CREDENTIALS = {"client_id": "id", "client_secret": "secret", "refresh_token": "refresh"}
+
+
+def test_youtube_client_refreshes_the_token_before_it_expires():
+    endpoint = _TokenEndpoint(expires_in=3600)
+    refreshes = []
+    client = youtube.YouTubeClient(
+        CREDENTIALS, refresh_margin=3599, request=endpoint, on_refresh=refreshes.append
+    )
+    assert client.seconds_left() == 0
+    client.start()
+    try:
+        deadline = time.time() + 10
+        while endpoint.issued < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        assert endpoint.issued >= 2 and all(refreshes)
+        assert client.credentials.token.startswith("token-") and client.seconds_left() > 3500
+    finally:
+        client.stop()
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(client.session))
+    thread.start()
+    thread.join()
+    assert client.session is client.session and sessions[0] is not client.session
+    assert sessions[0].credentials is client.credentials
+
+
+def test_youtube_client_is_built_once_per_credentials(monkeypatch):
+    built = []
+
+    class Client:
+        def __init__(self, info, on_refresh=None):
+            built.append(info)
+            self.stopped = False
+
+        def start(self):
+            return self
+
+        def stop(self):
+            self.stopped = True
+
+    monkeypatch.setattr(video_app, "YouTubeClient", Client)
+    monkeypatch.setattr(video_app, "youtube_clients", {})
+    first = video_app.youtube_client(json.dumps(CREDENTIALS))
+    assert video_app.youtube_client(json.dumps(CREDENTIALS)) is first and len(built) == 1
+    rotated = video_app.youtube_client(json.dumps({**CREDENTIALS, "refresh_token": "new"}))
+    assert rotated is not first and first.stopped and len(built) == 2